@@ -0,0 +1,178 @@
+"""
+In-process stand-in for the S3 client, used by the benchmark harness.
+
+A synthetic account of N buckets is generated deterministically from a seed:
+bucket configuration is derived from the bucket index on demand, so the fake
+itself holds no per-bucket state and does not inflate the measured memory.
+Every call sleeps for the configured latency and may fail with a throttling
+or other error according to the configured rates.
+"""
+import collections
+import hashlib
+import random
+import threading
+import time
+import typing
+
+from botocore.exceptions import ClientError
+
+BUCKET_NAME_PREFIX = "bench-bucket-"
+REGIONS = ("eu-central-1", "us-east-1", "eu-west-1")
+ENCRYPTION_ALGORITHMS = (None, "AES256", "aws:kms", "aws:kms:dsse")
+
+
+class SyntheticAccount(typing.NamedTuple):
+    buckets: int
+    seed: int = 0
+    latency: float = 0.0
+    throttle_rate: float = 0.0
+    access_denied_rate: float = 0.0
+    internal_error_rate: float = 0.0
+
+
+class BucketConfig(typing.NamedTuple):
+    region: str
+    encryption: typing.Optional[str]
+    versioning: bool
+    mfa_delete: bool
+    object_lock: bool
+    logging: bool
+
+
+def bucket_name(index: int) -> str:
+    return f"{BUCKET_NAME_PREFIX}{index:06d}"
+
+
+def bucket_config(seed: int, name: str) -> BucketConfig:
+    digest = hashlib.blake2b(f"{seed}:{name}".encode(), digest_size=8).digest()
+    return BucketConfig(
+        region=REGIONS[digest[0] % len(REGIONS)],
+        encryption=ENCRYPTION_ALGORITHMS[digest[1] % len(ENCRYPTION_ALGORITHMS)],
+        versioning=digest[2] % 2 == 0,
+        mfa_delete=digest[3] % 5 == 0,
+        object_lock=digest[4] % 4 == 0,
+        logging=digest[5] % 2 == 0,
+    )
+
+
+class FakeS3Client:
+    """
+    Implements the S3 operations used by the collector against a
+    ``SyntheticAccount``. Thread-safe; counts every call per operation.
+    """
+
+    def __init__(self, account: SyntheticAccount):
+        self.account = account
+        self.calls: typing.Counter[str] = collections.Counter()
+        self.errors: typing.Counter[str] = collections.Counter()
+        self._random = random.Random(account.seed)
+        self._lock = threading.Lock()
+
+    def _call(self, operation: str, bucket: typing.Optional[str] = None) -> None:
+        with self._lock:
+            self.calls[operation] += 1
+            roll = self._random.random()
+        if self.account.latency:
+            time.sleep(self.account.latency)
+        account = self.account
+        code = None
+        if roll < account.throttle_rate:
+            code = "SlowDown"
+        elif roll < account.throttle_rate + account.access_denied_rate:
+            code = "AccessDenied"
+        elif roll < account.throttle_rate + account.access_denied_rate \
+                + account.internal_error_rate:
+            code = "InternalError"
+        if code is not None:
+            with self._lock:
+                self.errors[code] += 1
+            raise ClientError({"Error": {"Code": code, "Message": code}}, operation)
+        if bucket is not None and not self._exists(bucket):
+            raise ClientError({"Error": {"Code": "NoSuchBucket"}}, operation)
+
+    def _exists(self, bucket: str) -> bool:
+        if not bucket.startswith(BUCKET_NAME_PREFIX):
+            return False
+        suffix = bucket[len(BUCKET_NAME_PREFIX):]
+        return suffix.isdigit() and int(suffix) < self.account.buckets
+
+    def _config(self, bucket: str) -> BucketConfig:
+        return bucket_config(self.account.seed, bucket)
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    def list_buckets(self, MaxBuckets: typing.Optional[int] = None,
+                     ContinuationToken: typing.Optional[str] = None,
+                     Prefix: str = "", BucketRegion: typing.Optional[str] = None):
+        self._call("list_buckets")
+        start = int(ContinuationToken) if ContinuationToken else 0
+        page_size = MaxBuckets or self.account.buckets
+        buckets = []
+        index = start
+        while index < self.account.buckets and len(buckets) < page_size:
+            name = bucket_name(index)
+            index += 1
+            config = self._config(name)
+            if not name.startswith(Prefix) or (BucketRegion and config.region != BucketRegion):
+                continue
+            buckets.append({"Name": name, "BucketArn": f"arn:aws:s3:::{name}",
+                            "BucketRegion": config.region})
+        response = {"Buckets": buckets}
+        if MaxBuckets and index < self.account.buckets:
+            response["ContinuationToken"] = str(index)
+        return response
+
+    def get_bucket_location(self, Bucket: str):
+        self._call("get_bucket_location", Bucket)
+        region = self._config(Bucket).region
+        return {"LocationConstraint": None if region == "us-east-1" else region}
+
+    def get_bucket_versioning(self, Bucket: str):
+        self._call("get_bucket_versioning", Bucket)
+        config = self._config(Bucket)
+        response = {}
+        if config.versioning:
+            response["Status"] = "Enabled"
+        if config.mfa_delete:
+            response["MFADelete"] = "Enabled"
+        return response
+
+    def get_bucket_encryption(self, Bucket: str):
+        self._call("get_bucket_encryption", Bucket)
+        algorithm = self._config(Bucket).encryption
+        if algorithm is None:
+            raise ClientError(
+                {"Error": {"Code": "ServerSideEncryptionConfigurationNotFoundError"}},
+                "get_bucket_encryption")
+        return {"ServerSideEncryptionConfiguration": {"Rules": [
+            {"ApplyServerSideEncryptionByDefault": {"SSEAlgorithm": algorithm}}]}}
+
+    def get_bucket_logging(self, Bucket: str):
+        self._call("get_bucket_logging", Bucket)
+        if not self._config(Bucket).logging:
+            return {}
+        return {"LoggingEnabled": {"TargetBucket": f"{Bucket}-logs", "TargetPrefix": ""}}
+
+    def get_object_lock_configuration(self, Bucket: str):
+        self._call("get_object_lock_configuration", Bucket)
+        if not self._config(Bucket).object_lock:
+            raise ClientError({"Error": {"Code": "ObjectLockConfigurationNotFoundError"}},
+                              "get_object_lock_configuration")
+        return {"ObjectLockConfiguration": {"ObjectLockEnabled": "Enabled"}}
+
+    def close(self) -> None:
+        pass
+
+
+def fake_client_factory(client: FakeS3Client):
+    """
+    Returns a ``RegionalClientPool`` client factory serving ``client`` for
+    every region.
+    """
+
+    def create(service_name: str, region_name: str, **kwargs):
+        return client
+
+    return create
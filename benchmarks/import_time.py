@@ -0,0 +1,126 @@
+"""
+Cold-start benchmark of the CLI.
+
+Every scenario runs in a fresh interpreter, several times, and reports the
+median and fastest wall time and the cumulative import time of the modules
+it loaded (from ``python -X importtime``), and whether the AWS SDK was
+imported. Results are written as JSON and can be compared against an
+earlier run:
+
+    python benchmarks/import_time.py --output startup.json
+    python benchmarks/import_time.py --compare startup.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import typing
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SDK_MODULES = ("boto3", "botocore")
+
+SCENARIOS: typing.Dict[str, typing.List[str]] = {
+    "interpreter": ["-c", "pass"],
+    "help": ["main.py", "--help"],
+    "import-main": ["-c", "import main"],
+    "select-one-check": ["-c", "import main; "
+                               "main.select_misconfigurations(['s3_bucket_default_encryption'])"],
+    "select-all-checks": ["-c", "import main; main.select_misconfigurations()"],
+}
+
+parser = argparse.ArgumentParser(description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+
+
+def run_once(arguments: typing.List[str], *options: str) -> typing.Tuple[float, str]:
+    started = time.perf_counter()
+    completed = subprocess.run([sys.executable, *options, *arguments], cwd=REPO_ROOT,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                               text=True, check=True)
+    return time.perf_counter() - started, completed.stderr
+
+
+def imported_modules(importtime_log: str) -> typing.Dict[str, int]:
+    """
+    Returns the cumulative import time, in microseconds, of every module in
+    a ``-X importtime`` log. Nested imports keep their indentation.
+    """
+    modules = {}
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            modules[name.rstrip()] = int(cumulative)
+    return modules
+
+
+def run_scenario(name: str, arguments: typing.List[str], runs: int) -> typing.Dict[str, typing.Any]:
+    timings = [run_once(arguments)[0] for _ in range(runs)]
+    _, importtime_log = run_once(arguments, "-X", "importtime")
+    modules = imported_modules(importtime_log)
+    return {
+        "name": name,
+        "median_ms": round(statistics.median(timings) * 1000, 1),
+        "min_ms": round(min(timings) * 1000, 1),
+        "import_ms": round(sum(cumulative for module, cumulative in modules.items()
+                               if not module.startswith("  ")) / 1000, 1),
+        "imports_sdk": any(module.strip().split(".")[0] in SDK_MODULES for module in modules),
+    }
+
+
+def compare(previous: typing.Dict, current: typing.Dict) -> None:
+    previous_results = {result["name"]: result for result in previous["results"]}
+    print(f"{'Scenario':<20} {'Median (ms)':>20} {'Imports (ms)':>20} {'SDK':>14}")
+    for result in current["results"]:
+        old = previous_results.get(result["name"])
+        if old is None:
+            continue
+        print(f"{result['name']:<20} "
+              f"{old['median_ms']:>8.1f} -> {result['median_ms']:<8.1f} "
+              f"{old['import_ms']:>8.1f} -> {result['import_ms']:<8.1f} "
+              f"{str(old['imports_sdk']):>5} -> {str(result['imports_sdk']):<5}")
+
+
+def get_sys_args():
+    parser.add_argument('--runs', type=int, default=10,
+                        help='Runs per scenario')
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS),
+                        default=list(SCENARIOS), help='Scenarios to benchmark')
+    parser.add_argument('--output', default=None,
+                        help='Write the results as JSON to this file')
+    parser.add_argument('--compare', default=None, metavar='RESULTS_JSON',
+                        help='Print the change against an earlier results file')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = get_sys_args()
+    report = {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "runs": args.runs,
+        "results": [],
+    }
+    for name in args.scenarios:
+        result = run_scenario(name, SCENARIOS[name], max(1, args.runs))
+        report["results"].append(result)
+        print(f"{name:<20} median={result['median_ms']:.1f}ms "
+              f"imports={result['import_ms']:.1f}ms sdk={result['imports_sdk']}",
+              file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    if args.compare:
+        with open(args.compare) as previous:
+            compare(json.load(previous), report)
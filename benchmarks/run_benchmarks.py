@@ -0,0 +1,263 @@
+"""
+Benchmark harness for the full scan pipeline against a local S3 stand-in.
+
+Every scenario (account size x scan mode) runs in a fresh process so peak
+RSS is measured per scenario. Results are written as JSON and can be
+compared against an earlier run to spot regressions:
+
+    python benchmarks/run_benchmarks.py --sizes 100 1000 --output results.json
+    python benchmarks/run_benchmarks.py --compare results.json
+
+With ``--replay`` the scans are served from a capture recorded with
+``main.py --record`` instead of synthetic accounts, so benchmarks run
+deterministically against real account data:
+
+    python benchmarks/run_benchmarks.py --replay capture.jsonl.gz --output results.json
+"""
+import argparse
+import collections
+import contextlib
+import datetime
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+import typing
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from fake_s3 import FakeS3Client, SyntheticAccount, fake_client_factory  # noqa: E402
+
+DEFAULT_SIZES = (100, 1000, 10000, 50000)
+DEFAULT_MODES = ("batch", "stream")
+BENCHMARK_ACCOUNT_ID = "000000000000"
+
+parser = argparse.ArgumentParser(description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+
+
+def peak_rss_kb() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux.
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+class CallCounter:
+    """
+    Wraps a client factory, counting the calls and error codes of every
+    client it creates. Thread-safe.
+    """
+
+    def __init__(self, client_factory: typing.Callable[..., typing.Any]):
+        self.client_factory = client_factory
+        self.calls: typing.Counter[str] = collections.Counter()
+        self.errors: typing.Counter[str] = collections.Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    def __call__(self, service_name: str, region_name: str, **kwargs):
+        client = self.client_factory(service_name, region_name=region_name, **kwargs)
+        counter = self
+
+        class CountingClient:
+            def __getattr__(self, name: str):
+                attribute = getattr(client, name)
+                if name.startswith("_") or name == "close" or not callable(attribute):
+                    return attribute
+
+                def call(**call_kwargs):
+                    with counter._lock:
+                        counter.calls[name] += 1
+                    try:
+                        return attribute(**call_kwargs)
+                    except Exception as error:
+                        code = getattr(error, "response", {}).get("Error", {}).get("Code")
+                        with counter._lock:
+                            counter.errors[code or type(error).__name__] += 1
+                        raise
+
+                return call
+
+        return CountingClient()
+
+
+def run_scenario(scenario: typing.Dict[str, typing.Any]) -> typing.Dict[str, typing.Any]:
+    """
+    Runs one scan against a synthetic account or a replayed capture.
+    Executed in a fresh process.
+    """
+    import main
+    from misconfiguration_detector import rules
+    from misconfiguration_detector.utils.rate_limiter import AdaptiveRateLimiter, \
+        UnlimitedRateLimiter
+
+    logging.basicConfig(level=scenario["log_level"])
+    logging.getLogger().setLevel(scenario["log_level"])
+    if scenario["replay"]:
+        from misconfiguration_detector.providers.aws import recording
+        api = CallCounter(recording.replay_client_factory(
+            recording.Capture(scenario["replay"])))
+        client_factory = api
+        source = "replay"
+    else:
+        account = SyntheticAccount(**scenario["account"])
+        api = FakeS3Client(account)
+        client_factory = fake_client_factory(api)
+        source = str(account.buckets)
+    if scenario["max_rate"]:
+        rate_limiter = AdaptiveRateLimiter(max_rate=scenario["max_rate"],
+                                           rate=scenario["max_rate"])
+    else:
+        rate_limiter = UnlimitedRateLimiter()
+    client_kwargs = dict(client_factory=client_factory, rate_limiter=rate_limiter)
+    for rules_path in scenario["rules"]:
+        rules.register_rules(rules_path)
+    check_uids = scenario["checks"]
+    checks = sum(len(misconfigs)
+                 for misconfigs in main.select_misconfigurations(check_uids).values())
+
+    rss_before = peak_rss_kb()
+    started = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        if scenario["mode"] == "stream":
+            summaries = main.stream_misconfigurations(
+                account_id=BENCHMARK_ACCOUNT_ID, region=main.DEFAULT_REGION,
+                max_workers=scenario["max_workers"], check_uids=check_uids,
+                **client_kwargs)
+        else:
+            main.setup_misconfigurations(
+                account_id=BENCHMARK_ACCOUNT_ID, region=main.DEFAULT_REGION,
+                max_workers=scenario["max_workers"], check_uids=check_uids,
+                **client_kwargs)
+            summaries = main.evaluate_misconfigurations(
+                account_id=BENCHMARK_ACCOUNT_ID, region=main.DEFAULT_REGION,
+                check_uids=check_uids)
+    wall_time = time.perf_counter() - started
+
+    # Findings (PASSED/FAILED/UNKNOWN) as reported by the scan, per check.
+    counts = [summary.failed + summary.passed + summary.unknown for summary in summaries]
+    findings = sum(counts)
+    return {
+        "name": f"{scenario['mode']}-{source}",
+        "mode": scenario["mode"],
+        "source": scenario["replay"] or "synthetic",
+        "buckets": max(counts, default=0),
+        "checks": checks,
+        "wall_time_s": round(wall_time, 4),
+        "api_calls": api.total_calls,
+        "api_calls_by_operation": dict(api.calls),
+        "api_errors": dict(api.errors),
+        "findings": findings,
+        "findings_per_s": round(findings / wall_time, 1) if wall_time else None,
+        "peak_rss_kb": peak_rss_kb(),
+        "rss_before_scan_kb": rss_before,
+    }
+
+
+def git_commit() -> typing.Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous: typing.Dict, current: typing.Dict) -> None:
+    previous_results = {result["name"]: result for result in previous["results"]}
+    print(f"{'Scenario':<16} {'Wall (s)':>18} {'Findings/s':>22} {'Peak RSS (MB)':>20}")
+    for result in current["results"]:
+        old = previous_results.get(result["name"])
+        if old is None:
+            continue
+        print(f"{result['name']:<16} "
+              f"{old['wall_time_s']:>8.2f} -> {result['wall_time_s']:<7.2f} "
+              f"{old['findings_per_s'] or 0:>10.0f} -> {result['findings_per_s'] or 0:<9.0f} "
+              f"{old['peak_rss_kb'] / 1024:>8.1f} -> {result['peak_rss_kb'] / 1024:<8.1f}")
+
+
+def get_sys_args():
+    parser.add_argument('--sizes', nargs='+', type=int, default=list(DEFAULT_SIZES),
+                        help='Number of buckets of each synthetic account')
+    parser.add_argument('--modes', nargs='+', choices=DEFAULT_MODES,
+                        default=list(DEFAULT_MODES), help='Scan modes to benchmark')
+    parser.add_argument('--latency-ms', type=float, default=5.0,
+                        help='Latency injected into every API call')
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                        help='Fraction of calls failing with SlowDown')
+    parser.add_argument('--access-denied-rate', type=float, default=0.0,
+                        help='Fraction of calls failing with AccessDenied')
+    parser.add_argument('--internal-error-rate', type=float, default=0.0,
+                        help='Fraction of calls failing with InternalError')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-workers', type=int, default=64)
+    parser.add_argument('--max-rate', type=float, default=0.0,
+                        help='Rate limiter ceiling in calls/s (0 = unlimited)')
+    parser.add_argument('--checks', nargs='+', default=None, metavar='CHECK_UID')
+    parser.add_argument('--replay', default=None, metavar='CAPTURE_FILE',
+                        help='Replay this capture (main.py --record) instead of '
+                             'synthetic accounts; --sizes and the fault rates are ignored')
+    parser.add_argument('--rules', nargs='+', default=[], metavar='RULES_PATH',
+                        help='Also run the declarative rules of these files or directories')
+    parser.add_argument('--log-level', default="ERROR")
+    parser.add_argument('--output', default=None,
+                        help='Write the results as JSON to this file')
+    parser.add_argument('--compare', default=None, metavar='RESULTS_JSON',
+                        help='Print the change against an earlier results file')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = get_sys_args()
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {key: value for key, value in vars(args).items()
+                   if key not in ("output", "compare")},
+        "results": [],
+    }
+    context = multiprocessing.get_context("spawn")
+    for size in [None] if args.replay else args.sizes:
+        for mode in args.modes:
+            scenario = {
+                "mode": mode,
+                "replay": args.replay,
+                "account": None if args.replay else SyntheticAccount(
+                    buckets=size, seed=args.seed, latency=args.latency_ms / 1000,
+                    throttle_rate=args.throttle_rate,
+                    access_denied_rate=args.access_denied_rate,
+                    internal_error_rate=args.internal_error_rate)._asdict(),
+                "max_workers": args.max_workers,
+                "max_rate": args.max_rate,
+                "checks": args.checks,
+                "rules": args.rules,
+                "log_level": args.log_level.upper(),
+            }
+            with context.Pool(1) as pool:
+                result = pool.apply(run_scenario, (scenario,))
+            report["results"].append(result)
+            print(f"{result['name']:<16} wall={result['wall_time_s']:.2f}s "
+                  f"calls={result['api_calls']} "
+                  f"findings/s={result['findings_per_s']} "
+                  f"peak_rss={result['peak_rss_kb'] / 1024:.1f}MB", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    if args.compare:
+        with open(args.compare) as previous:
+            compare(json.load(previous), report)
@@ -1,44 +1,97 @@
 import argparse
+import contextlib
+import sys
 import typing
 
+from misconfiguration_detector import diff, evaluation, output, pipeline, rules, \
+    scheduling
 from misconfiguration_detector.models import SupportedProviders, BaseClient, \
     Misconfiguration
-from misconfiguration_detector.providers.aws.services.s3.s3_bucket_default_encryption import \
-    S3BucketDefaultEncryption
-from misconfiguration_detector.providers.aws.services.s3.s3_bucket_enable_mfa import \
-    S3BucketEnableMfaDelete
-from misconfiguration_detector.providers.aws.services.s3.s3_bucket_object_lock import \
-    S3BucketS3BucketObjectLock
-from misconfiguration_detector.providers.aws.services.s3.s3_bucket_object_versioning import \
-    S3BucketObjectVersioning
-from misconfiguration_detector.providers.aws.services.s3.s3_client import \
-    S3BucketClient
+from misconfiguration_detector.providers.aws.services.s3 import cloudtrail
+from misconfiguration_detector.registry import get_registry
+from misconfiguration_detector.session import ScanSession, get_default_session
+from misconfiguration_detector.snapshot import DEFAULT_SNAPSHOT_PATH, SnapshotStore
+from misconfiguration_detector.utils.concurrency import DEFAULT_MAX_WORKERS
 from misconfiguration_detector.utils.logging import logger, set_logging_config
+from misconfiguration_detector.utils.metrics import METRICS_FORMATS, enable_metrics, \
+    get_metrics
+from misconfiguration_detector.utils.rate_limiter import UnlimitedRateLimiter
 
 parser = argparse.ArgumentParser()
 
 DEFAULT_REGION = "eu-central-1"
-PROVIDER_TO_CLIENT_MAP: typing.Dict[
-    SupportedProviders, typing.List[typing.Type[BaseClient]]] = {
-    SupportedProviders.AWS: [S3BucketClient]
-}
-
-PROVIDER_TO_MISCONFIG_MAP: typing.Dict[
-    SupportedProviders, typing.List[typing.Type[Misconfiguration]]] = {
-    SupportedProviders.AWS: [
-        S3BucketDefaultEncryption,
-        S3BucketObjectVersioning,
-        S3BucketEnableMfaDelete,
-        S3BucketS3BucketObjectLock
-    ]
-}
-
-
-def setup_misconfigurations(account_id: str, region: str):
+# Snapshot source of the CloudTrail log files already applied.
+CLOUDTRAIL_SOURCE = "cloudtrail"
+
+
+def select_misconfigurations(
+        check_uids: typing.Optional[typing.Iterable[str]] = None
+) -> typing.Dict[SupportedProviders, typing.List[typing.Type[Misconfiguration]]]:
+    """
+    Returns the registered misconfigurations whose uid is in ``check_uids``,
+    or every registered misconfiguration when no filter is given. Only the
+    selected checks are imported.
+    """
+    registry = get_registry()
+    return {
+        provider: [registry.load_check(spec) for spec in specs]
+        for provider, specs in registry.select(check_uids).items()
+    }
+
+
+def select_clients(provider: SupportedProviders,
+                   misconfigs: typing.Iterable[typing.Type[Misconfiguration]]
+                   ) -> typing.List[typing.Type[BaseClient]]:
+    """
+    Returns the ``provider`` clients collecting the attributes ``misconfigs`` read.
+    """
+    required_attributes = frozenset().union(
+        *(cls_misconfig.required_attributes for cls_misconfig in misconfigs))
+    return get_registry().load_clients(provider, required_attributes)
+
+
+def client_attributes(client_cls: typing.Type[BaseClient],
+                      misconfigs: typing.Iterable[typing.Type[Misconfiguration]],
+                      all_attributes: bool = False) -> typing.FrozenSet[str]:
+    """
+    Returns the attributes ``client_cls`` collects for ``misconfigs``: those
+    the checks read, or every attribute the client supports with
+    ``all_attributes`` (when recording, so a capture can replay any check).
+    """
+    if all_attributes:
+        return client_cls.supported_attributes
+    return frozenset().union(
+        *(cls_misconfig.required_attributes for cls_misconfig in misconfigs)
+    ) & client_cls.supported_attributes
+
+
+def setup_misconfigurations(account_id: str, region: str,
+                            max_workers: int = DEFAULT_MAX_WORKERS,
+                            max_in_flight: typing.Optional[int] = None,
+                            check_uids: typing.Optional[typing.Iterable[str]] = None,
+                            session: typing.Optional[ScanSession] = None,
+                            all_attributes: bool = False,
+                            **client_kwargs: typing.Any):
+    """
+    Collects, into ``session``, the inventory every selected check reads
+    (every supported attribute with ``all_attributes``).
+    """
     try:
+        session = session or get_default_session()
+        misconfigs = select_misconfigurations(check_uids)
         for provider in SupportedProviders:
-            for client_cls in PROVIDER_TO_CLIENT_MAP[provider]:
-                client_cls(account_id=account_id, region_name=region)
+            for client_cls in select_clients(provider, misconfigs[provider]):
+                attributes = client_attributes(client_cls, misconfigs[provider], all_attributes)
+                if not attributes:
+                    continue
+                session.get_client(client_cls, account_id=account_id,
+                                   region_name=region,
+                                   max_workers=max_workers,
+                                   max_in_flight=max_in_flight,
+                                   attributes=attributes,
+                                   attribute_priority=scheduling.attribute_priorities(
+                                       misconfigs[provider]),
+                                   **client_kwargs)
 
     except Exception as error:
         logger.error(
@@ -46,17 +99,143 @@ def setup_misconfigurations(account_id: str, region: str):
         raise
 
 
-def evaluate_misconfigurations(account_id: str, region: str):
+def evaluate_misconfigurations(account_id: str, region: str,
+                               check_uids: typing.Optional[typing.Iterable[str]] = None,
+                               writer: typing.Optional[output.FindingWriter] = None,
+                               session: typing.Optional[ScanSession] = None):
+    """
+    Evaluates the selected checks against the inventory collected in
+    ``session`` and prints the per-check report, or writes the findings to
+    ``writer`` when given. Returns the per-check summaries.
+    """
     try:
-        for provider in SupportedProviders:
-            for cls_misconfig in PROVIDER_TO_MISCONFIG_MAP[provider]:
-                misconfig = cls_misconfig(account_id=account_id,
-                                          region=region)
-                misconfig.evaluate()
-                misconfig.print()
+        misconfigs = [
+            cls_misconfig(account_id=account_id, region=region, session=session)
+            for provider in SupportedProviders
+            for cls_misconfig in select_misconfigurations(check_uids)[provider]
+        ]
+        metrics = get_metrics()
+        with metrics.phase("evaluation"):
+            evaluation.evaluate_misconfigurations(misconfigs)
+        summaries = [output.summarize(misconfig) for misconfig in misconfigs]
+        with metrics.phase("output"):
+            if writer is None:
+                for misconfig in misconfigs:
+                    misconfig.print()
+            else:
+                writer.write_header()
+                for misconfig in misconfigs:
+                    for finding in output.iter_findings(misconfig):
+                        writer.write(finding)
+                writer.write_summary(summaries)
+        return summaries
     except Exception as error:
         logger.error(
             f"Error during misconfiguration evaluation: {error}, account_id={account_id}")
+        return []
+
+
+def stream_misconfigurations(account_id: str, region: str,
+                             max_workers: int = DEFAULT_MAX_WORKERS,
+                             max_in_flight: typing.Optional[int] = None,
+                             check_uids: typing.Optional[typing.Iterable[str]] = None,
+                             writer: typing.Optional[output.FindingWriter] = None,
+                             all_attributes: bool = False,
+                             **client_kwargs: typing.Any):
+    """
+    Streams the scan: buckets are listed, collected, evaluated against every
+    selected check and written out one at a time, without keeping an inventory.
+    Findings go to ``writer`` (a text ``FindingPrinter`` on stdout by default).
+    With ``all_attributes`` every supported attribute is collected. Returns
+    the per-check summaries.
+    """
+    summaries: typing.Dict[str, pipeline.CheckSummary] = {}
+    try:
+        metrics = get_metrics()
+        misconfigs = select_misconfigurations(check_uids)
+        printer = writer or pipeline.FindingPrinter()
+        printer.write_header()
+        for provider in SupportedProviders:
+            checks = [cls_misconfig(account_id=account_id, region=region)
+                      for cls_misconfig in misconfigs[provider]]
+            for client_cls in select_clients(provider, misconfigs[provider]):
+                client_checks = [
+                    misconfig for misconfig in checks
+                    if misconfig.required_attributes <= client_cls.supported_attributes
+                ]
+                if not client_checks:
+                    continue
+                with metrics.phase("setup"):
+                    client = client_cls(
+                        account_id=account_id, region_name=region,
+                        max_workers=max_workers, max_in_flight=max_in_flight,
+                        attributes=client_attributes(client_cls, client_checks, all_attributes),
+                        collect=False,
+                        attribute_priority=scheduling.attribute_priorities(client_checks),
+                        **client_kwargs)
+                # Collection, evaluation and output are interleaved per bucket.
+                try:
+                    with metrics.phase("scan"):
+                        for finding in pipeline.stream_findings(
+                                client_checks, client.iter_resources(), summaries):
+                            printer.write(finding)
+                finally:
+                    client.close()
+        with metrics.phase("output"):
+            printer.write_summary(summaries.values())
+    except Exception as error:
+        logger.error(
+            f"Error during streaming scan: {error}, account_id={account_id}, region={region}")
+    return list(summaries.values())
+
+
+def incremental_misconfigurations(account_id: str, region: str, cloudtrail_dir: str,
+                                  snapshot: SnapshotStore,
+                                  max_workers: int = DEFAULT_MAX_WORKERS,
+                                  max_in_flight: typing.Optional[int] = None,
+                                  check_uids: typing.Optional[typing.Iterable[str]] = None,
+                                  output_format: str = "text",
+                                  stream: typing.Optional[typing.TextIO] = None,
+                                  all_attributes: bool = False,
+                                  **client_kwargs: typing.Any) -> typing.List[diff.FindingChange]:
+    """
+    Applies the S3 changes recorded in the CloudTrail files under
+    ``cloudtrail_dir`` since the last run: only the changed buckets and
+    attributes are refetched, the rest is kept in ``snapshot``. Writes and
+    returns the findings that appeared or were resolved. With
+    ``all_attributes`` every supported attribute is collected.
+    """
+    bucket_changes = cloudtrail.read_bucket_changes(
+        cloudtrail_dir, account_id, snapshot.processed_files(account_id, CLOUDTRAIL_SOURCE))
+    changes: typing.List[diff.FindingChange] = []
+    try:
+        misconfigs = select_misconfigurations(check_uids)
+        for provider in SupportedProviders:
+            for client_cls in select_clients(provider, misconfigs[provider]):
+                client_checks = [
+                    cls_misconfig for cls_misconfig in misconfigs[provider]
+                    if cls_misconfig.required_attributes <= client_cls.supported_attributes
+                ]
+                if not client_checks:
+                    continue
+                client = client_cls(
+                    account_id=account_id, region_name=region,
+                    max_workers=max_workers, max_in_flight=max_in_flight,
+                    attributes=client_attributes(client_cls, client_checks, all_attributes),
+                    collect=False, snapshot=snapshot, **client_kwargs)
+                try:
+                    before, after = client.collect_changes(bucket_changes)
+                finally:
+                    client.close()
+                changes.extend(diff.diff_findings(client_checks, account_id, region,
+                                                  before, after))
+    except Exception as error:
+        logger.error(
+            f"Error during incremental scan: {error}, account_id={account_id}, region={region}")
+        raise
+    snapshot.mark_processed(account_id, CLOUDTRAIL_SOURCE, bucket_changes.files)
+    diff.write_changes(changes, output_format, stream)
+    return changes
 
 
 def get_sys_args():
@@ -64,6 +243,54 @@ def get_sys_args():
                         help='AWS Account ID to evaluate')
     parser.add_argument('--region', required=False,
                         help='AWS Region to evaluate', default=DEFAULT_REGION)
+    parser.add_argument('--max-workers', type=int, default=DEFAULT_MAX_WORKERS,
+                        help='Number of concurrent API workers (1 = serial)')
+    parser.add_argument('--max-in-flight', type=int, default=None,
+                        help='Maximum number of queued API calls '
+                             '(default: 4 per worker)')
+    parser.add_argument('--checks', nargs='+', default=None, metavar='CHECK_UID',
+                        help='Only run the given checks (default: all checks)')
+    parser.add_argument('--rules', nargs='+', default=[], metavar='RULES_PATH',
+                        help='Also run the declarative rules of these JSON/YAML files '
+                             'or directories')
+    parser.add_argument('--bucket-prefix', default=None,
+                        help='Only scan buckets whose name starts with this prefix')
+    parser.add_argument('--stream', action='store_true',
+                        help='Emit findings per bucket while the scan is running '
+                             'instead of collecting the full inventory first')
+    parser.add_argument('--max-age', type=float, default=None, metavar='SECONDS',
+                        help='Serve bucket attributes fetched less than SECONDS ago '
+                             'from the local snapshot (default: always refetch)')
+    parser.add_argument('--snapshot-db', default=None,
+                        help='Snapshot database path (default: '
+                             f'{DEFAULT_SNAPSHOT_PATH} when --max-age is set)')
+    capture_group = parser.add_mutually_exclusive_group()
+    capture_group.add_argument('--record', default=None, metavar='CAPTURE_FILE',
+                               help='Append every raw S3 API response to this '
+                                    'gzip-compressed capture file')
+    capture_group.add_argument('--replay', default=None, metavar='CAPTURE_FILE',
+                               help='Serve S3 API responses from this capture file '
+                                    'instead of calling AWS')
+    parser.add_argument('--cloudtrail-dir', default=None, metavar='DIRECTORY',
+                        help='Incremental scan: only refetch the buckets and attributes '
+                             'changed by the S3 events in the CloudTrail files under '
+                             'DIRECTORY and print the findings that appeared or were '
+                             'resolved since the last run (uses the snapshot)')
+    parser.add_argument('--deadline', type=float, default=None, metavar='SECONDS',
+                        help='Stop issuing API calls SECONDS after the scan starts; '
+                             'attributes of the most severe checks are fetched first '
+                             'and unfetched ones are reported UNKNOWN')
+    parser.add_argument('--output-format', choices=list(output.OUTPUT_FORMATS),
+                        default=output.DEFAULT_OUTPUT_FORMAT,
+                        help='Findings format (default: text)')
+    parser.add_argument('--output-file', default=None,
+                        help='Write findings to this file instead of stdout '
+                             '(gzip-compressed when it ends in .gz)')
+    parser.add_argument('--metrics-file', default=None,
+                        help='Write API call, check and phase metrics to this file '
+                             'at the end of the run')
+    parser.add_argument('--metrics-format', choices=METRICS_FORMATS, default="json",
+                        help='Format of --metrics-file (default: json)')
     return parser.parse_args()
 
 
@@ -71,7 +298,99 @@ if __name__ == '__main__':
     set_logging_config()
     logger.info("Logger initialized")
     args = get_sys_args()
-    logger.info("Starting misconfiguration setup")
-    setup_misconfigurations(account_id=args.account_id, region=args.region)
-    logger.info("Starting misconfiguration evaluation")
-    evaluate_misconfigurations(account_id=args.account_id, region=args.region)
+    try:
+        for rules_path in args.rules:
+            rules.register_rules(rules_path)
+        get_registry().select(args.checks)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+    if args.cloudtrail_dir and args.stream:
+        parser.error("--cloudtrail-dir cannot be combined with --stream")
+    if args.cloudtrail_dir and args.output_format not in diff.DIFF_FORMATS:
+        parser.error(f"--cloudtrail-dir writes {' or '.join(diff.DIFF_FORMATS)} output")
+    metrics = enable_metrics() if args.metrics_file else get_metrics()
+    output_file = output.open_output(args.output_file) if args.output_file else None
+    writer = None
+    if (args.stream or args.output_format != "text") and not args.cloudtrail_dir:
+        writer = output.create_writer(args.output_format, output_file or sys.stdout)
+    session = ScanSession()
+    client_kwargs = {}
+    if args.bucket_prefix:
+        client_kwargs.update(bucket_prefix=args.bucket_prefix)
+    snapshot = None
+    capture_writer = None
+    if args.record or args.replay:
+        # The capture module needs botocore; it is only imported when used.
+        from misconfiguration_detector.providers.aws import recording
+    # A capture holds every attribute so that any check can be evaluated on replay.
+    record_all = bool(args.record)
+    if args.record:
+        capture_writer = recording.CaptureWriter(args.record)
+        client_kwargs.update(client_factory=recording.recording_client_factory(capture_writer))
+    elif args.replay:
+        client_kwargs.update(
+            client_factory=recording.replay_client_factory(recording.Capture(args.replay)),
+            rate_limiter=UnlimitedRateLimiter())
+    if args.max_age is not None or args.snapshot_db or args.cloudtrail_dir:
+        snapshot = SnapshotStore(args.snapshot_db or DEFAULT_SNAPSHOT_PATH)
+        client_kwargs.update(snapshot=snapshot, max_age=args.max_age)
+    deadline = None
+    if args.deadline is not None:
+        deadline = scheduling.Deadline(args.deadline)
+        client_kwargs.update(deadline=deadline)
+    summaries = []
+    try:
+        if args.cloudtrail_dir:
+            logger.info("Starting incremental misconfiguration scan")
+            incremental_misconfigurations(account_id=args.account_id, region=args.region,
+                                          cloudtrail_dir=args.cloudtrail_dir,
+                                          max_workers=args.max_workers,
+                                          max_in_flight=args.max_in_flight,
+                                          check_uids=args.checks,
+                                          output_format=args.output_format,
+                                          stream=output_file,
+                                          all_attributes=record_all,
+                                          **client_kwargs)
+        elif args.stream:
+            logger.info("Starting streaming misconfiguration scan")
+            summaries = stream_misconfigurations(account_id=args.account_id,
+                                                 region=args.region,
+                                                 max_workers=args.max_workers,
+                                                 max_in_flight=args.max_in_flight,
+                                                 check_uids=args.checks,
+                                                 writer=writer,
+                                                 all_attributes=record_all,
+                                                 **client_kwargs)
+        else:
+            logger.info("Starting misconfiguration setup")
+            with metrics.phase("setup"):
+                setup_misconfigurations(account_id=args.account_id, region=args.region,
+                                        max_workers=args.max_workers,
+                                        max_in_flight=args.max_in_flight,
+                                        check_uids=args.checks,
+                                        session=session,
+                                        all_attributes=record_all,
+                                        **client_kwargs)
+            logger.info("Starting misconfiguration evaluation")
+            # The text report is printed; send it to --output-file when given.
+            with contextlib.redirect_stdout(output_file) if output_file \
+                    else contextlib.nullcontext():
+                summaries = evaluate_misconfigurations(account_id=args.account_id,
+                                                       region=args.region,
+                                                       check_uids=args.checks, writer=writer,
+                                                       session=session)
+        if deadline is not None:
+            scheduling.write_coverage(summaries, deadline)
+    finally:
+        session.close()
+        if writer is not None:
+            writer.close()
+        if output_file is not None:
+            output_file.close()
+        if snapshot is not None:
+            snapshot.close()
+        if capture_writer is not None:
+            capture_writer.close()
+        if args.metrics_file:
+            metrics.export(args.metrics_file, args.metrics_format)
+            logger.info(f"Metrics written to {args.metrics_file}")
@@ -1,15 +1,29 @@
+import typing
+
+from misconfiguration_detector.models import BaseClient
 from misconfiguration_detector.providers.aws.services.s3.s3_client import \
     S3BucketClient
+from misconfiguration_detector.session import get_default_session
 
 
 class ClientFactory:
-    _initialized_clients = {}
+    """
+    Access to the clients of the process-wide default ``ScanSession``.
+    Prefer passing an explicit session, which can be closed.
+    """
+
+    @staticmethod
+    def get_client(client_cls: typing.Type[BaseClient], account_id: str,
+                   region_name: str = "eu-central-1", **client_kwargs: typing.Any):
+        """
+        Returns the client of ``client_cls`` for the account and region,
+        creating it with ``client_kwargs`` on first use.
+        """
+        return get_default_session().get_client(client_cls, account_id=account_id,
+                                                region_name=region_name, **client_kwargs)
+
     @staticmethod
-    def get_s3_client(account_id: str, region_name: str = "eu-central-1"):
-        key = f"s3_{account_id}_{region_name}"
-        if key not in ClientFactory._initialized_clients:
-            ClientFactory._initialized_clients[key] = S3BucketClient(
-                account_id=account_id,
-                region_name=region_name
-            )
-        return ClientFactory._initialized_clients[key]
+    def get_s3_client(account_id: str, region_name: str = "eu-central-1",
+                      **client_kwargs: typing.Any) -> S3BucketClient:
+        return ClientFactory.get_client(S3BucketClient, account_id=account_id,
+                                        region_name=region_name, **client_kwargs)
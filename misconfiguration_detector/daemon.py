@@ -0,0 +1,438 @@
+"""
+Long-running scanner service.
+
+``ScannerDaemon`` keeps one ``ScanSession`` per account open for the life of
+the process, so clients and their connection pools stay warm between scans.
+Every account is rescanned on its own schedule, with jitter so the accounts
+do not all hit the API at the same moment. The findings of the latest scan
+of each account are kept in a ``FindingsIndex`` and served over a local
+HTTP/JSON endpoint (``FindingsServer``); queries never trigger a scan.
+
+Endpoints (GET):
+
+    /findings   findings of the latest scans, filtered by the ``check``,
+                ``severity``, ``account``, ``region``, ``resource`` (name or
+                ARN) and ``status`` query parameters; a parameter may be
+                repeated to match any of its values. ``limit`` caps the
+                number of findings returned.
+    /summary    per-check counters of the latest scan of every account.
+    /health     scan schedule and outcome of every account.
+"""
+import datetime
+import heapq
+import json
+import random
+import threading
+import time
+import typing
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from misconfiguration_detector import evaluation, output
+from misconfiguration_detector.models import BaseClient, Misconfiguration
+from misconfiguration_detector.providers.aws.credentials import \
+    AssumeRoleSessionCache
+from misconfiguration_detector.session import ScanSession
+from misconfiguration_detector.utils.concurrency import DEFAULT_MAX_WORKERS
+from misconfiguration_detector.utils.logging import logger
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+DEFAULT_INTERVAL = 3600.0
+# Each rescan is scheduled interval * (1 +/- jitter) after the previous one ends.
+DEFAULT_JITTER = 0.1
+DEFAULT_CONCURRENT_SCANS = 2
+QUERY_CACHE_SIZE = 256
+
+# Query parameter -> finding field it filters on.
+FILTER_FIELDS = {
+    "check": "check",
+    "severity": "severity",
+    "account": "account_id",
+    "region": "region",
+    "resource": "resource",
+    "status": "status",
+}
+
+ScanKey = typing.Tuple[str, str]
+Filters = typing.Dict[str, typing.FrozenSet[str]]
+
+
+def _utc_iso(timestamp: typing.Optional[float]) -> typing.Optional[str]:
+    if timestamp is None:
+        return None
+    return datetime.datetime.fromtimestamp(
+        timestamp, datetime.timezone.utc).isoformat(timespec="seconds")
+
+
+class _ScanShard:
+    """
+    Findings of one (account, region) scan with an inverted index per filter field.
+    """
+    __slots__ = ("records", "summaries", "scanned_at", "postings")
+
+    def __init__(self, records: typing.List[typing.Dict[str, typing.Any]],
+                 summaries: typing.List[typing.Dict[str, typing.Any]], scanned_at: float):
+        self.records = records
+        self.summaries = summaries
+        self.scanned_at = scanned_at
+        self.postings: typing.Dict[str, typing.Dict[str, typing.Set[int]]] = {
+            field: {} for field in FILTER_FIELDS.values()}
+        for position, record in enumerate(records):
+            for field in FILTER_FIELDS.values():
+                if field == "resource":
+                    values = (record["resource_name"], record["resource_id"])
+                else:
+                    values = (record[field],)
+                for value in values:
+                    self.postings[field].setdefault(value, set()).add(position)
+
+    def match(self, filters: Filters) -> typing.Iterator[typing.Dict[str, typing.Any]]:
+        positions: typing.Optional[typing.Set[int]] = None
+        for field, values in filters.items():
+            matching: typing.Set[int] = set()
+            for value in values:
+                matching |= self.postings[field].get(value, set())
+            positions = matching if positions is None else positions & matching
+            if not positions:
+                return
+        if positions is None:
+            yield from self.records
+        else:
+            for position in sorted(positions):
+                yield self.records[position]
+
+
+class FindingsIndex:
+    """
+    In-memory index of the findings of the latest scan of every account and region.
+
+    A scan replaces its shard in one step, so readers always see either the
+    previous or the new findings of an account, never a mix. Serialized query
+    results are cached until the next update.
+    """
+
+    def __init__(self, query_cache_size: int = QUERY_CACHE_SIZE):
+        self.generation = 0
+        self.query_cache_size = query_cache_size
+        self._shards: typing.Dict[ScanKey, _ScanShard] = {}
+        self._query_cache: typing.Dict[typing.Tuple, bytes] = {}
+        self._lock = threading.Lock()
+
+    def update(self, account_id: str, region: str,
+               misconfigs: typing.Sequence[Misconfiguration]) -> None:
+        """
+        Replaces the findings of (account, region) with those of ``misconfigs``.
+        """
+        records = []
+        for misconfig in misconfigs:
+            severity = misconfig.severity.name
+            for finding in output.iter_findings(misconfig):
+                records.append({**output.finding_record(finding), "severity": severity})
+        summaries = []
+        for misconfig in misconfigs:
+            summary = output.summarize(misconfig)
+            summaries.append({
+                "check": misconfig.uid,
+                "severity": misconfig.severity.name,
+                "status": summary.status.name,
+                "failed": summary.failed,
+                "passed": summary.passed,
+                "unknown": summary.unknown,
+            })
+        shard = _ScanShard(records, summaries, time.time())
+        with self._lock:
+            self._shards[(account_id, region)] = shard
+            self.generation += 1
+            self._query_cache.clear()
+
+    def query(self, filters: typing.Optional[Filters] = None,
+              limit: typing.Optional[int] = None) -> typing.List[typing.Dict[str, typing.Any]]:
+        """
+        Returns the findings matching every filter (any of the values of each).
+        """
+        filters = filters or {}
+        accounts = filters.get("account_id")
+        with self._lock:
+            shards = [shard for (account_id, _), shard in sorted(self._shards.items())
+                      if accounts is None or account_id in accounts]
+        findings = []
+        for shard in shards:
+            for record in shard.match(filters):
+                if limit is not None and len(findings) >= limit:
+                    return findings
+                findings.append(record)
+        return findings
+
+    def query_json(self, filters: typing.Optional[Filters] = None,
+                   limit: typing.Optional[int] = None) -> bytes:
+        """
+        Returns the serialized ``/findings`` response, from the cache when the
+        same query was answered since the last update.
+        """
+        filters = filters or {}
+        key = (tuple(sorted((field, tuple(sorted(values))) for field, values in filters.items())),
+               limit)
+        with self._lock:
+            cached = self._query_cache.get(key)
+            generation = self.generation
+        if cached is not None:
+            return cached
+        findings = self.query(filters, limit)
+        body = json.dumps({"generation": generation, "count": len(findings),
+                           "findings": findings}).encode()
+        with self._lock:
+            # A response computed before a concurrent update is not cached.
+            if self.generation == generation:
+                if len(self._query_cache) >= self.query_cache_size:
+                    self._query_cache.clear()
+                self._query_cache[key] = body
+        return body
+
+    def summary(self) -> typing.Dict[str, typing.Any]:
+        with self._lock:
+            shards = sorted(self._shards.items())
+            generation = self.generation
+        report: typing.Dict[str, typing.Any] = {}
+        for (account_id, region), shard in shards:
+            report.setdefault(account_id, {})[region] = {
+                "scanned_at": _utc_iso(shard.scanned_at),
+                "checks": shard.summaries,
+            }
+        return {"generation": generation, "accounts": report}
+
+
+class AccountStatus:
+    __slots__ = ("scans", "last_started", "last_finished", "last_duration",
+                 "last_error", "next_scan")
+
+    def __init__(self):
+        self.scans = 0
+        self.last_started: typing.Optional[float] = None
+        self.last_finished: typing.Optional[float] = None
+        self.last_duration: typing.Optional[float] = None
+        self.last_error: typing.Optional[str] = None
+        self.next_scan: typing.Optional[float] = None
+
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "scans": self.scans,
+            "last_started": _utc_iso(self.last_started),
+            "last_finished": _utc_iso(self.last_finished),
+            "last_duration_seconds": None if self.last_duration is None
+            else round(self.last_duration, 3),
+            "last_error": self.last_error,
+            "next_scan": _utc_iso(self.next_scan),
+        }
+
+
+class ScannerDaemon:
+    """
+    Rescans every account on a jittered schedule into a ``FindingsIndex``.
+
+    At most ``concurrent_scans`` accounts are scanned at a time. An account is
+    rescheduled only once its scan has finished, so scans of the same account
+    never overlap. A failed scan keeps the previous findings of the account.
+    """
+
+    def __init__(self, account_ids: typing.Iterable[str],
+                 client_classes: typing.Sequence[typing.Type[BaseClient]],
+                 misconfig_classes: typing.Sequence[typing.Type[Misconfiguration]],
+                 region: str = "eu-central-1",
+                 interval: float = DEFAULT_INTERVAL,
+                 jitter: float = DEFAULT_JITTER,
+                 role_name: typing.Optional[str] = None,
+                 max_workers: int = DEFAULT_MAX_WORKERS,
+                 concurrent_scans: int = DEFAULT_CONCURRENT_SCANS,
+                 index: typing.Optional[FindingsIndex] = None,
+                 **client_kwargs: typing.Any):
+        self.account_ids = list(dict.fromkeys(account_ids))
+        self.client_classes = client_classes
+        self.misconfig_classes = misconfig_classes
+        self.region = region
+        self.interval = interval
+        self.jitter = min(max(jitter, 0.0), 1.0)
+        self.max_workers = max_workers
+        self.concurrent_scans = max(1, concurrent_scans)
+        self.index = index or FindingsIndex()
+        self.client_kwargs = client_kwargs
+        self.status = {account_id: AccountStatus() for account_id in self.account_ids}
+        # Without a role, clients use the process credentials.
+        self._session_cache = AssumeRoleSessionCache(role_name) if role_name else None
+        self._sessions: typing.Dict[str, ScanSession] = {}
+        self._schedule: typing.List[typing.Tuple[float, str]] = []
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._thread: typing.Optional[threading.Thread] = None
+
+    def _delay(self) -> float:
+        return self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _schedule_scan(self, account_id: str, delay: float) -> None:
+        due = time.monotonic() + delay
+        with self._condition:
+            self.status[account_id].next_scan = time.time() + delay
+            heapq.heappush(self._schedule, (due, account_id))
+            self._condition.notify()
+
+    def _session_for(self, account_id: str) -> ScanSession:
+        session = self._sessions.get(account_id)
+        if session is None:
+            session_kwargs = dict(self.client_kwargs, max_workers=self.max_workers)
+            if self._session_cache is not None:
+                session_kwargs.update(session=self._session_cache.session_for(account_id))
+            session = self._sessions[account_id] = ScanSession(**session_kwargs)
+        return session
+
+    def scan_account(self, account_id: str) -> None:
+        """
+        Collects and evaluates one account and publishes its findings.
+        """
+        status = self.status[account_id]
+        status.last_started = time.time()
+        started = time.monotonic()
+        try:
+            session = self._session_for(account_id)
+            misconfigs = [cls_misconfig(account_id=account_id, region=self.region,
+                                        session=session)
+                          for cls_misconfig in self.misconfig_classes]
+            required_attributes = frozenset().union(
+                *(misconfig.required_attributes for misconfig in misconfigs))
+            for client_cls in self.client_classes:
+                attributes = required_attributes & client_cls.supported_attributes
+                if attributes:
+                    session.refresh(client_cls, account_id=account_id,
+                                    region_name=self.region, attributes=attributes)
+            evaluation.evaluate_misconfigurations(misconfigs)
+            self.index.update(account_id, self.region, misconfigs)
+            status.last_error = None
+        except Exception as error:
+            logger.error(f"Daemon - scan of account {account_id} failed: {error}")
+            status.last_error = str(error)
+        finally:
+            status.scans += 1
+            status.last_duration = time.monotonic() - started
+            status.last_finished = time.time()
+        logger.info(f"Daemon - scanned account {account_id} "
+                    f"in {status.last_duration:.1f}s")
+
+    def _scan_and_reschedule(self, account_id: str) -> None:
+        self.scan_account(account_id)
+        if not self._stopping:
+            self._schedule_scan(account_id, self._delay())
+
+    def _run(self) -> None:
+        with ThreadPoolExecutor(max_workers=self.concurrent_scans,
+                                thread_name_prefix="scan") as executor:
+            while True:
+                with self._condition:
+                    while not self._stopping and (
+                            not self._schedule or self._schedule[0][0] > time.monotonic()):
+                        timeout = self._schedule[0][0] - time.monotonic() \
+                            if self._schedule else None
+                        self._condition.wait(timeout)
+                    if self._stopping:
+                        return
+                    _, account_id = heapq.heappop(self._schedule)
+                    self.status[account_id].next_scan = None
+                executor.submit(self._scan_and_reschedule, account_id)
+
+    def start(self) -> None:
+        """
+        Starts the scheduler. First scans are spread over the jitter window.
+        """
+        logger.info(f"Daemon - scanning {len(self.account_ids)} accounts every "
+                    f"{self.interval:g}s (jitter {self.jitter:.0%})")
+        for account_id in self.account_ids:
+            self._schedule_scan(account_id, self.interval * random.uniform(0, self.jitter))
+        self._thread = threading.Thread(target=self._run, name="scan-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops scheduling, waits for the running scans and closes every session.
+        """
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        for session in self._sessions.values():
+            session.close()
+        self._sessions.clear()
+
+    def health(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "status": "ok",
+            "generation": self.index.generation,
+            "accounts": {account_id: status.to_dict()
+                         for account_id, status in self.status.items()},
+        }
+
+
+class FindingsRequestHandler(BaseHTTPRequestHandler):
+    server: "FindingsServer"
+
+    def do_GET(self) -> None:
+        url = urllib.parse.urlsplit(self.path)
+        params = urllib.parse.parse_qs(url.query)
+        path = url.path.rstrip("/")
+        if path == "/findings":
+            try:
+                filters, limit = self._parse_query(params)
+            except ValueError as error:
+                self._send_json(400, json.dumps({"error": str(error)}).encode())
+                return
+            self._send_json(200, self.server.index.query_json(filters, limit))
+        elif path == "/summary":
+            self._send_json(200, json.dumps(self.server.index.summary()).encode())
+        elif path == "/health":
+            health = self.server.daemon.health() if self.server.daemon is not None \
+                else {"status": "ok", "generation": self.server.index.generation}
+            self._send_json(200, json.dumps(health).encode())
+        else:
+            self._send_json(404, json.dumps({"error": f"Unknown path: {url.path}"}).encode())
+
+    @staticmethod
+    def _parse_query(params: typing.Dict[str, typing.List[str]]
+                     ) -> typing.Tuple[Filters, typing.Optional[int]]:
+        unknown = set(params) - set(FILTER_FIELDS) - {"limit"}
+        if unknown:
+            raise ValueError(f"Unknown query parameters: {', '.join(sorted(unknown))}")
+        filters = {}
+        for param, field in FILTER_FIELDS.items():
+            if param in params:
+                values = params[param]
+                if param in ("severity", "status"):
+                    values = [value.upper() for value in values]
+                filters[field] = frozenset(values)
+        limit = None
+        if "limit" in params:
+            limit = int(params["limit"][-1])
+            if limit < 0:
+                raise ValueError("limit must not be negative")
+        return filters, limit
+
+    def _send_json(self, status: int, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: typing.Any) -> None:
+        logger.debug(f"Daemon - {self.address_string()} {format % args}")
+
+
+class FindingsServer(ThreadingHTTPServer):
+    """
+    HTTP server answering findings queries from ``index``.
+    """
+    daemon_threads = True
+
+    def __init__(self, index: FindingsIndex, daemon: typing.Optional[ScannerDaemon] = None,
+                 host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        super().__init__((host, port), FindingsRequestHandler)
+        self.index = index
+        self.daemon = daemon
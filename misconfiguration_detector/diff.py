@@ -0,0 +1,98 @@
+"""
+Findings diff between two states of the same resources.
+
+Incremental scans evaluate the checks against the changed resources as they
+were and as they are now; a finding has appeared when a resource fails a
+check it did not fail before, and is resolved when it no longer fails it.
+A resource that now reads UNKNOWN for a check is not reported as resolved.
+"""
+import json
+import sys
+import typing
+
+from misconfiguration_detector import evaluation, output
+from misconfiguration_detector.models import Misconfiguration, MisconfigurationStatus, \
+    Resource
+from misconfiguration_detector.pipeline import Finding
+
+APPEARED = "appeared"
+RESOLVED = "resolved"
+DIFF_FORMATS = ("text", "jsonl")
+
+FindingKey = typing.Tuple[str, str]
+
+
+class FindingChange(typing.NamedTuple):
+    change: str
+    finding: Finding
+
+
+def _evaluate(misconfig_classes: typing.Sequence[typing.Type[Misconfiguration]],
+              account_id: str, region: str, resources: typing.Sequence[Resource]
+              ) -> typing.Tuple[typing.Dict[FindingKey, Finding], typing.Set[FindingKey]]:
+    """
+    Returns the failed findings and the keys of the unknown ones.
+    """
+    misconfigs = [cls_misconfig(account_id=account_id, region=region)
+                  for cls_misconfig in misconfig_classes]
+    evaluation.evaluate_resources(misconfigs, resources)
+    failed = {}
+    unknown = set()
+    for misconfig in misconfigs:
+        for resource in misconfig.misconfigured_resources:
+            failed[(misconfig.uid, resource.resource_id)] = Finding(
+                misconfig, resource, MisconfigurationStatus.FAILED)
+        for resource in misconfig.unknown_resources:
+            unknown.add((misconfig.uid, resource.resource_id))
+    return failed, unknown
+
+
+def diff_findings(misconfig_classes: typing.Sequence[typing.Type[Misconfiguration]],
+                  account_id: str, region: str,
+                  before: typing.Sequence[Resource],
+                  after: typing.Sequence[Resource]) -> typing.List[FindingChange]:
+    """
+    Returns the findings that appeared or were resolved between ``before``
+    and ``after``: appeared first, then resolved, each in evaluation order.
+    """
+    previous, _ = _evaluate(misconfig_classes, account_id, region, before)
+    current, unknown = _evaluate(misconfig_classes, account_id, region, after)
+    changes = [FindingChange(APPEARED, finding)
+               for key, finding in current.items() if key not in previous]
+    changes.extend(FindingChange(RESOLVED, finding) for key, finding in previous.items()
+                   if key not in current and key not in unknown)
+    return changes
+
+
+def write_changes(changes: typing.Sequence[FindingChange], output_format: str = "text",
+                  stream: typing.Optional[typing.TextIO] = None) -> None:
+    """
+    Writes the findings diff as a text table or as JSON lines.
+    """
+    stream = stream or sys.stdout
+    if output_format == "jsonl":
+        for change in changes:
+            finding = change.finding
+            stream.write(json.dumps({
+                "type": "change",
+                "change": change.change,
+                "severity": finding.misconfiguration.severity.name,
+                **output.finding_record(finding),
+            }, separators=(",", ":")) + "\n")
+    elif output_format == "text":
+        stream.write("-" * 120 + "\n")
+        stream.write(f"{'Change':<10} {'Check':<32} {'Severity':<9} {'Name':<30} "
+                     f"{'Resource ID':<40}\n")
+        stream.write("-" * 120 + "\n")
+        for change in changes:
+            finding = change.finding
+            stream.write(f"{change.change.upper():<10} {finding.misconfiguration.uid:<32} "
+                         f"{finding.misconfiguration.severity.name:<9} "
+                         f"{finding.resource.name:<30} {finding.resource.resource_id:<40}\n")
+        stream.write("-" * 120 + "\n")
+        appeared = sum(change.change == APPEARED for change in changes)
+        stream.write(f"{appeared} findings appeared, {len(changes) - appeared} resolved "
+                     f"since the last run\n")
+    else:
+        raise ValueError(f"Unknown diff format: {output_format}")
+    stream.flush()
@@ -0,0 +1,128 @@
+"""
+Single-pass evaluation engine.
+
+Walks each resource table once and runs the predicate of every selected
+misconfiguration against each resource. Findings are recorded as per-check
+bitsets of indices into the shared resource table rather than per-check
+lists of resource objects.
+
+Checks providing a ``column_predicate`` (declarative rules) are evaluated
+in bulk instead when the table is columnar, from whole attribute columns,
+without materializing a record per resource.
+"""
+import time
+import typing
+
+from misconfiguration_detector.models import Misconfiguration, \
+    MisconfigurationStatus, Resource, ResourceBitset
+from misconfiguration_detector.utils.logging import logger
+from misconfiguration_detector.utils.metrics import get_metrics
+
+
+def _evaluate_columns(misconfig: Misconfiguration, resources: typing.Sequence[Resource],
+                      columns: typing.Dict[str, typing.List[typing.Any]],
+                      unknown_columns: typing.Dict[str, ResourceBitset]) -> None:
+    """
+    Evaluates a check over a columnar table with its column predicate.
+    ``columns`` and ``unknown_columns`` cache the columns read by earlier checks.
+    """
+    started = time.perf_counter()
+    unknown = ResourceBitset(len(resources))
+    try:
+        for attribute in misconfig.column_attributes:
+            if attribute not in columns:
+                columns[attribute] = resources.column(attribute)
+        for attribute in misconfig.required_attributes:
+            if attribute not in unknown_columns:
+                unknown_columns[attribute] = resources.unknown_indices(attribute)
+            unknown.update(unknown_columns[attribute])
+        failed = ResourceBitset.from_flags(misconfig.column_predicate(
+            [columns[attribute] for attribute in misconfig.column_attributes]))
+        failed.difference_update(unknown)
+    except Exception as error:
+        misconfig.bind_results(resources, ResourceBitset(len(resources)), unknown)
+        logger.error(
+            f"Error evaluating misconfiguration [{misconfig.title}] "
+            f"[{misconfig.account_id}]: {error}")
+        misconfig.status = MisconfigurationStatus.FAILED
+        return
+    misconfig.bind_results(resources, failed, unknown)
+    get_metrics().observe_check(misconfig.uid, len(resources), time.perf_counter() - started)
+    misconfig.set_status()
+
+
+def evaluate_resources(misconfigs: typing.Sequence[Misconfiguration],
+                       resources: typing.Sequence[Resource]) -> None:
+    """
+    Evaluates every misconfiguration against ``resources`` in one pass and
+    binds the resulting bitsets to the misconfigurations. Resources missing
+    an attribute a check reads are recorded as unknown for that check.
+
+    A check whose predicate raises is marked FAILED and dropped from the
+    remaining iterations, matching ``Misconfiguration.evaluate``.
+    """
+    metrics = get_metrics()
+    if hasattr(resources, "column"):
+        columns, unknown_columns = {}, {}
+        for misconfig in misconfigs:
+            if misconfig.column_predicate is not None:
+                _evaluate_columns(misconfig, resources, columns, unknown_columns)
+        misconfigs = [misconfig for misconfig in misconfigs
+                      if misconfig.column_predicate is None]
+        if not misconfigs:
+            return
+
+    active = []
+    for misconfig in misconfigs:
+        failed = ResourceBitset(len(resources))
+        unknown = ResourceBitset(len(resources))
+        misconfig.bind_results(resources, failed, unknown)
+        active.append((misconfig, misconfig.required_attributes,
+                       metrics.time_check(misconfig.uid, misconfig.is_misconfigured),
+                       failed, unknown))
+
+    for index, resource in enumerate(resources):
+        errored = None
+        unknown_attributes = resource.unknown_attributes
+        for check in active:
+            misconfig, required_attributes, is_misconfigured, failed, unknown = check
+            try:
+                if unknown_attributes and not required_attributes.isdisjoint(unknown_attributes):
+                    unknown.add(index)
+                elif is_misconfigured(resource):
+                    failed.add(index)
+            except Exception as error:
+                logger.error(
+                    f"Error evaluating misconfiguration [{misconfig.title}] "
+                    f"[{misconfig.account_id}]: {error}")
+                misconfig.status = MisconfigurationStatus.FAILED
+                errored = errored or []
+                errored.append(check)
+        if errored:
+            active = [check for check in active if check not in errored]
+
+    for check in active:
+        check[0].set_status()
+
+
+def evaluate_misconfigurations(misconfigs: typing.Sequence[Misconfiguration]) -> None:
+    """
+    Evaluates the misconfigurations, walking each distinct resource table once.
+    """
+    tables: typing.Dict[int, typing.Tuple[typing.Sequence[Resource],
+                                          typing.List[Misconfiguration]]] = {}
+    for misconfig in misconfigs:
+        try:
+            resources = misconfig.get_resources()
+        except Exception as error:
+            logger.error(
+                f"Error evaluating misconfiguration [{misconfig.title}] "
+                f"[{misconfig.account_id}]: {error}")
+            misconfig.status = MisconfigurationStatus.FAILED
+            continue
+        tables.setdefault(id(resources), (resources, []))[1].append(misconfig)
+
+    for resources, group in tables.values():
+        logger.info(
+            f"Evaluating {len(group)} misconfigurations over {len(resources)} resources")
+        evaluate_resources(group, resources)
@@ -1,8 +1,16 @@
 import abc
+import sys
+import time
 import typing
 import enum
 
+if typing.TYPE_CHECKING:
+    from misconfiguration_detector.session import ScanSession
+
 from misconfiguration_detector.utils.logging import logger
+from misconfiguration_detector.utils.metrics import get_metrics
+
+PRINT_CHUNK_ROWS = 1000
 
 
 class MisconfigurationSeverity(enum.Enum):
@@ -21,11 +29,67 @@ class MisconfigurationStatus(enum.Enum):
     PASSED = "PASSED"
     FAILED = "FAILED"
     PENDING = "PENDING"
+    # The resource attributes the check reads could not be collected.
+    UNKNOWN = "UNKNOWN"
 
 
 class Resource(abc.ABC):
+    __slots__ = ()
     name: str
     resource_id: str
+    unknown_attributes: typing.AbstractSet[str] = frozenset()
+
+
+class ResourceBitset:
+    """
+    Compact set of indices into a resource table, one bit per resource.
+    """
+    __slots__ = ("_bits",)
+
+    def __init__(self, size: int = 0):
+        self._bits = bytearray((size + 7) // 8)
+
+    @classmethod
+    def from_flags(cls, flags: typing.Sequence[bool]) -> "ResourceBitset":
+        """
+        Returns the indices of the true flags.
+        """
+        bitset = cls(len(flags))
+        if flags:
+            value = int("".join("1" if flag else "0" for flag in reversed(flags)), 2)
+            bitset._bits[:] = value.to_bytes(len(bitset._bits), "little")
+        return bitset
+
+    def update(self, other: "ResourceBitset") -> None:
+        self._assign(int.from_bytes(self._bits, "little") | int.from_bytes(other._bits, "little"),
+                     len(other._bits))
+
+    def difference_update(self, other: "ResourceBitset") -> None:
+        self._assign(int.from_bytes(self._bits, "little") & ~int.from_bytes(other._bits, "little"),
+                     len(other._bits))
+
+    def _assign(self, value: int, size: int) -> None:
+        self._bits[:] = value.to_bytes(max(len(self._bits), size), "little")
+
+    def add(self, index: int) -> None:
+        byte = index >> 3
+        if byte >= len(self._bits):
+            self._bits.extend(bytes(byte - len(self._bits) + 1))
+        self._bits[byte] |= 1 << (index & 7)
+
+    def __contains__(self, index: int) -> bool:
+        byte = index >> 3
+        return byte < len(self._bits) and bool(self._bits[byte] & (1 << (index & 7)))
+
+    def __iter__(self) -> typing.Iterator[int]:
+        for byte, value in enumerate(self._bits):
+            if value:
+                for bit in range(8):
+                    if value & (1 << bit):
+                        yield (byte << 3) | bit
+
+    def __len__(self) -> int:
+        return bin(int.from_bytes(self._bits, "little")).count("1")
 
 
 class Misconfiguration(abc.ABC):
@@ -34,27 +98,114 @@ class Misconfiguration(abc.ABC):
     description: str
     severity: MisconfigurationSeverity
     remediation_steps: str
-    misconfigured_resources: list[typing.Type[Resource]]
-    not_misconfigured_resources: list[typing.Type[Resource]]
+    # Resource attributes read by the check; collection fetches only these.
+    required_attributes: typing.FrozenSet[str] = frozenset()
+    # Optional bulk form of ``is_misconfigured`` over resource tables providing
+    # ``column``: maps the columns of ``column_attributes`` to a flag per resource.
+    column_attributes: typing.Tuple[str, ...] = ()
+    column_predicate: typing.Optional[
+        typing.Callable[[typing.Sequence[typing.Sequence]], typing.List[bool]]] = None
     account_id: str
     status: MisconfigurationStatus = MisconfigurationStatus.PENDING
 
-    def __init__(self, account_id: str, region:str, **data: typing.Any):
+    def __init__(self, account_id: str, region:str,
+                 session: typing.Optional["ScanSession"] = None, **data: typing.Any):
         super().__init__(**data)
         self.account_id = account_id
         self.region = region
-        self.misconfigured_resources = []
-        self.not_misconfigured_resources = []
+        # Registry the resources are read from (the default session when None).
+        self.session = session
+        self._resources: typing.Sequence[Resource] = ()
+        self._failed = ResourceBitset()
+        self._unknown = ResourceBitset()
 
     @abc.abstractmethod
-    def _evaluate(self) -> None:
+    def get_resources(self) -> typing.Sequence[Resource]:
+        """
+        Returns the resource table the misconfiguration is evaluated against.
+        """
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def is_misconfigured(self, resource: Resource) -> bool:
         raise NotImplementedError()
 
+    def is_unknown(self, resource: Resource) -> bool:
+        """
+        Whether an attribute the check reads could not be collected for the
+        resource, in which case it is reported UNKNOWN instead of evaluated.
+        """
+        return not self.required_attributes.isdisjoint(resource.unknown_attributes)
+
+    def bind_results(self, resources: typing.Sequence[Resource],
+                     failed: ResourceBitset,
+                     unknown: typing.Optional[ResourceBitset] = None) -> None:
+        """
+        Attaches the resource table and the indices of misconfigured and
+        unknown resources.
+        """
+        self._resources = resources
+        self._failed = failed
+        self._unknown = unknown if unknown is not None else ResourceBitset()
+
+    @property
+    def failed_count(self) -> int:
+        return len(self._failed)
+
+    @property
+    def unknown_count(self) -> int:
+        return len(self._unknown)
+
+    @property
+    def passed_count(self) -> int:
+        return len(self._resources) - len(self._failed) - len(self._unknown)
+
+    def iter_results(self) -> typing.Iterator[typing.Tuple[Resource, MisconfigurationStatus]]:
+        """
+        Yields every resource with its status in report order (failed,
+        passed, then unknown), materializing one resource at a time.
+        """
+        resources, failed, unknown = self._resources, self._failed, self._unknown
+        for index in failed:
+            yield resources[index], MisconfigurationStatus.FAILED
+        for index in range(len(resources)):
+            if index not in failed and index not in unknown:
+                yield resources[index], MisconfigurationStatus.PASSED
+        for index in unknown:
+            yield resources[index], MisconfigurationStatus.UNKNOWN
+
+    @property
+    def misconfigured_resources(self) -> typing.List[Resource]:
+        return [self._resources[index] for index in self._failed]
+
+    @property
+    def unknown_resources(self) -> typing.List[Resource]:
+        return [self._resources[index] for index in self._unknown]
+
+    @property
+    def not_misconfigured_resources(self) -> typing.List[Resource]:
+        return [resource for index, resource in enumerate(self._resources)
+                if index not in self._failed and index not in self._unknown]
+
+    def _evaluate(self) -> None:
+        resources = self.get_resources()
+        failed = ResourceBitset(len(resources))
+        unknown = ResourceBitset(len(resources))
+        for index, resource in enumerate(resources):
+            if self.is_unknown(resource):
+                unknown.add(index)
+            elif self.is_misconfigured(resource):
+                failed.add(index)
+        self.bind_results(resources, failed, unknown)
+
     def evaluate(self) -> None:
         try:
             logger.info(
                 f"Evaluating misconfiguration: {self.title}, Account ID: {self.account_id}")
+            started = time.perf_counter()
             self._evaluate()
+            get_metrics().observe_check(self.uid, len(self._resources),
+                                        time.perf_counter() - started)
             logger.info(
                 f"Setting status for misconfiguration: {self.title}, Account ID: {self.account_id}")
             self.set_status()
@@ -64,11 +215,29 @@ class Misconfiguration(abc.ABC):
             self.status = MisconfigurationStatus.FAILED
 
     def set_status(self) -> None:
-        if self.misconfigured_resources:
+        if len(self._failed):
             self.status = MisconfigurationStatus.FAILED
+        elif len(self._unknown):
+            self.status = MisconfigurationStatus.UNKNOWN
         else:
             self.status = MisconfigurationStatus.PASSED
 
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        """
+        Returns the evaluation result as plain data, e.g. for JSON reports
+        or for returning it from a worker process.
+        """
+        return {
+            "uid": self.uid,
+            "title": self.title,
+            "severity": self.severity.name,
+            "status": self.status.name,
+            "misconfigured_resources": [r.resource_id or r.name for r in self.misconfigured_resources],
+            "not_misconfigured_resources": [r.resource_id or r.name
+                                            for r in self.not_misconfigured_resources],
+            "unknown_resources": [r.resource_id or r.name for r in self.unknown_resources],
+        }
+
     def print(self):
         print("=" * 80)
         print(f"Misconfiguration: {self.title}")
@@ -87,19 +256,16 @@ class Misconfiguration(abc.ABC):
         print(f"{'Name':<30} {'Resource ID':<40} {'Status':<10}")
         print("-" * 80)
 
-        for resource in self.misconfigured_resources:
-            print(
-                f"{resource.name:<30} "
-                f"{resource.resource_id:<40} "
-                f"{MisconfigurationStatus.FAILED.name:<10}"
-            )
-
-        for resource in self.not_misconfigured_resources:
-            print(
-                f"{resource.name:<30} "
-                f"{resource.resource_id:<40} "
-                f"{MisconfigurationStatus.PASSED.name:<10}"
-            )
+        # Rows are written in chunks rather than with one print() per resource.
+        rows = []
+        for resource, status in self.iter_results():
+            rows.append(f"{resource.name:<30} "
+                        f"{resource.resource_id:<40} "
+                        f"{status.name:<10}\n")
+            if len(rows) >= PRINT_CHUNK_ROWS:
+                sys.stdout.write("".join(rows))
+                rows.clear()
+        sys.stdout.write("".join(rows))
 
         print("-" * 80)
         print("\n")
@@ -108,7 +274,42 @@ class Misconfiguration(abc.ABC):
 class BaseClient(abc.ABC):
     provider_name: str
     region_name: str
+    # Resource attributes this client knows how to collect.
+    supported_attributes: typing.FrozenSet[str] = frozenset()
 
     def __init__(self, *, account_id: str, region_name: str = "eu-central-1"):
         self.account_id = account_id
         self.region_name = region_name
+
+    def get_resources(self) -> typing.Sequence[Resource]:
+        """
+        Returns the client's collected inventory.
+        """
+        raise NotImplementedError()
+
+    def iter_resources(self) -> typing.Iterator[Resource]:
+        """
+        Yields the client's resources one by one as they are collected.
+        """
+        raise NotImplementedError()
+
+    def collect_changes(self, changes: typing.Any) -> typing.Tuple[
+            typing.Sequence[Resource], typing.Sequence[Resource]]:
+        """
+        Refetches only the resources and attributes affected by ``changes``,
+        keeping the rest of the previous state, and returns the affected
+        resources as they were before and as they are now.
+        """
+        raise NotImplementedError()
+
+    def refresh(self) -> None:
+        """
+        Collects the inventory again, reusing the client's connections.
+        Raises when the collection fails; the previous inventory is kept.
+        """
+        raise NotImplementedError()
+
+    def close(self) -> None:
+        """
+        Releases network resources held by the client.
+        """
@@ -0,0 +1,117 @@
+"""
+Multi-account / multi-region scan orchestrator.
+
+Every (account, region) pair is scanned in its own task on a process pool.
+Worker processes cache one assumed-role session per account, and the
+global concurrency budget is split evenly across processes so a single
+large account cannot take the API capacity needed by the others.
+"""
+import typing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from misconfiguration_detector import evaluation
+from misconfiguration_detector.models import BaseClient, Misconfiguration
+from misconfiguration_detector.providers.aws.credentials import \
+    AssumeRoleSessionCache
+from misconfiguration_detector.session import ScanSession
+from misconfiguration_detector.utils.logging import logger, set_logging_config
+
+DEFAULT_PROCESSES = 4
+DEFAULT_MAX_CONCURRENCY = 64
+
+# One cache per worker process, created on the first task it runs.
+_session_cache: typing.Optional[AssumeRoleSessionCache] = None
+
+
+class ScanTask(typing.NamedTuple):
+    account_id: str
+    # None scans every bucket of the account from the default region.
+    region: typing.Optional[str]
+
+
+def _init_worker(role_name: typing.Optional[str], log_level: str) -> None:
+    global _session_cache
+    set_logging_config(log_level)
+    _session_cache = AssumeRoleSessionCache(role_name)
+
+
+def scan_account_region(task: ScanTask,
+                        client_classes: typing.Sequence[typing.Type[BaseClient]],
+                        misconfig_classes: typing.Sequence[typing.Type[Misconfiguration]],
+                        default_region: str,
+                        max_workers: int) -> typing.Dict[str, typing.Any]:
+    """
+    Collects and evaluates one (account, region) pair. Runs in a worker
+    process and returns plain data so the result can be pickled back.
+    """
+    region = task.region or default_region
+    report = {"account_id": task.account_id, "region": region, "checks": {}, "error": None}
+    try:
+        boto_session = _session_cache.session_for(task.account_id)
+        with ScanSession(session=boto_session, bucket_region=task.region,
+                         max_workers=max_workers) as session:
+            misconfigs = [cls_misconfig(account_id=task.account_id, region=region,
+                                        session=session)
+                          for cls_misconfig in misconfig_classes]
+            for client_cls in client_classes:
+                checks = [misconfig for misconfig in misconfigs
+                          if misconfig.required_attributes <= client_cls.supported_attributes]
+                if not checks:
+                    continue
+                session.get_client(
+                    client_cls, account_id=task.account_id, region_name=region,
+                    attributes=frozenset().union(*(m.required_attributes for m in checks)))
+                evaluation.evaluate_resources(
+                    checks, session.get_resources(client_cls, account_id=task.account_id,
+                                                  region_name=region))
+        report["checks"] = {misconfig.uid: misconfig.to_dict() for misconfig in misconfigs}
+    except Exception as error:
+        logger.error(
+            f"Error scanning account_id={task.account_id}, region={region}: {error}")
+        report["error"] = str(error)
+    return report
+
+
+def orchestrate(account_ids: typing.Iterable[str],
+                client_classes: typing.Sequence[typing.Type[BaseClient]],
+                misconfig_classes: typing.Sequence[typing.Type[Misconfiguration]],
+                regions: typing.Optional[typing.Iterable[str]] = None,
+                role_name: typing.Optional[str] = None,
+                default_region: str = "eu-central-1",
+                processes: int = DEFAULT_PROCESSES,
+                max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                log_level: str = "INFO") -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+    """
+    Scans every account (in every region, when given) in parallel and merges
+    the results into one report keyed by account id and region.
+    """
+    regions = list(regions) if regions else [None]
+    tasks = [ScanTask(account_id, region) for account_id in account_ids for region in regions]
+    processes = max(1, min(processes, len(tasks)))
+    max_workers = max(1, max_concurrency // processes)
+    logger.info(
+        f"Scanning {len(tasks)} account/region pairs on {processes} processes, "
+        f"{max_workers} API workers each")
+
+    report: typing.Dict[str, typing.Dict[str, typing.Any]] = {}
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(role_name, log_level)) as executor:
+        futures = {
+            executor.submit(scan_account_region, task, client_classes,
+                            misconfig_classes, default_region, max_workers): task
+            for task in tasks
+        }
+        for future in as_completed(futures):
+            task = futures[future]
+            try:
+                result = future.result()
+            except Exception as error:
+                logger.error(f"Scan task {task} failed: {error}")
+                result = {"account_id": task.account_id,
+                          "region": task.region or default_region,
+                          "checks": {}, "error": str(error)}
+            report.setdefault(result["account_id"], {})[result["region"]] = {
+                "checks": result["checks"],
+                "error": result["error"],
+            }
+    return report
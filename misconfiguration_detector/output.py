@@ -0,0 +1,286 @@
+"""
+Structured findings writers.
+
+Every writer consumes ``Finding`` objects one at a time, buffers the
+serialized lines and writes them out in chunks, so memory stays flat
+however many findings are written. Static check metadata (title,
+description, remediation) is written once per check, not per finding.
+
+Writers share the ``FindingPrinter`` interface: ``write_header()``,
+``write(finding)``, ``write_summary(summaries)``, ``flush()`` and
+``close()``.
+"""
+import csv
+import gzip
+import io
+import json
+import sys
+import typing
+
+from misconfiguration_detector.models import Misconfiguration, \
+    MisconfigurationSeverity, MisconfigurationStatus
+from misconfiguration_detector.pipeline import CheckSummary, Finding, FindingPrinter
+
+DEFAULT_OUTPUT_FORMAT = "text"
+BUFFER_LINES = 1000
+SARIF_VERSION = "2.1.0"
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+TOOL_NAME = "cloud_posture_system"
+
+SEVERITY_TO_SARIF_LEVEL = {
+    MisconfigurationSeverity.CRITICAL: "error",
+    MisconfigurationSeverity.HIGH: "error",
+    MisconfigurationSeverity.MEDIUM: "warning",
+    MisconfigurationSeverity.LOW: "note",
+    MisconfigurationSeverity.INFO: "note",
+}
+STATUS_TO_SARIF_KIND = {
+    MisconfigurationStatus.FAILED: "fail",
+    MisconfigurationStatus.PASSED: "pass",
+    MisconfigurationStatus.UNKNOWN: "review",
+}
+
+
+def open_output(path: str) -> typing.TextIO:
+    """
+    Opens ``path`` for writing findings, gzip-compressed when it ends in ``.gz``.
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, "wt", encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+def check_metadata(misconfig: Misconfiguration) -> typing.Dict[str, typing.Any]:
+    return {
+        "uid": misconfig.uid,
+        "title": misconfig.title,
+        "severity": misconfig.severity.name,
+        "description": misconfig.description,
+        "remediation_steps": misconfig.remediation_steps,
+    }
+
+
+def finding_record(finding: Finding) -> typing.Dict[str, typing.Any]:
+    misconfig, resource = finding.misconfiguration, finding.resource
+    return {
+        "check": misconfig.uid,
+        "account_id": misconfig.account_id,
+        "region": misconfig.region,
+        "resource_name": resource.name,
+        "resource_id": resource.resource_id,
+        "status": finding.status.name,
+    }
+
+
+def iter_findings(misconfig: Misconfiguration) -> typing.Iterator[Finding]:
+    """
+    Yields the findings of an evaluated misconfiguration, in report order.
+    """
+    for resource, status in misconfig.iter_results():
+        yield Finding(misconfig, resource, status)
+
+
+def summarize(misconfig: Misconfiguration) -> CheckSummary:
+    """
+    Returns the per-check counters of an evaluated misconfiguration, counted
+    from its result bitsets without materializing any resource.
+    """
+    summary = CheckSummary(misconfig)
+    summary.failed = misconfig.failed_count
+    summary.unknown = misconfig.unknown_count
+    summary.passed = misconfig.passed_count
+    # A check whose evaluation raised is FAILED without failing resources.
+    summary.errored = misconfig.status == MisconfigurationStatus.FAILED and not summary.failed
+    return summary
+
+
+class FindingWriter:
+    """
+    Base class of the structured writers: buffers serialized lines and
+    writes check metadata the first time a check is seen.
+    """
+
+    def __init__(self, stream: typing.Optional[typing.TextIO] = None,
+                 buffer_lines: int = BUFFER_LINES):
+        self.stream = stream or sys.stdout
+        self.buffer_lines = buffer_lines
+        self._buffer: typing.List[str] = []
+        self._checks: typing.Dict[str, Misconfiguration] = {}
+
+    def _emit(self, line: str) -> None:
+        self._buffer.append(line)
+        if len(self._buffer) >= self.buffer_lines:
+            self.flush()
+
+    def _see_check(self, misconfig: Misconfiguration) -> None:
+        if misconfig.uid not in self._checks:
+            self._checks[misconfig.uid] = misconfig
+            self.write_check(misconfig)
+
+    def write_header(self) -> None:
+        pass
+
+    def write_check(self, misconfig: Misconfiguration) -> None:
+        pass
+
+    def write(self, finding: Finding) -> None:
+        self._see_check(finding.misconfiguration)
+        self.write_finding(finding)
+
+    def write_finding(self, finding: Finding) -> None:
+        raise NotImplementedError()
+
+    def write_summary(self, summaries: typing.Iterable[CheckSummary]) -> None:
+        for summary in summaries:
+            self._see_check(summary.misconfiguration)
+        self.flush()
+
+    def flush(self) -> None:
+        if self._buffer:
+            self.stream.write("".join(self._buffer))
+            self._buffer.clear()
+        self.stream.flush()
+
+    def close(self) -> None:
+        self.flush()
+
+
+class JsonLinesWriter(FindingWriter):
+    """
+    One JSON object per line: a ``check`` record per check, a ``finding``
+    record per (check, resource) and a ``summary`` record per check.
+    """
+
+    def _json(self, record: typing.Dict[str, typing.Any]) -> None:
+        self._emit(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def write_check(self, misconfig: Misconfiguration) -> None:
+        self._json({"type": "check", **check_metadata(misconfig)})
+
+    def write_finding(self, finding: Finding) -> None:
+        self._json({"type": "finding", **finding_record(finding)})
+
+    def write_summary(self, summaries: typing.Iterable[CheckSummary]) -> None:
+        for summary in summaries:
+            self._see_check(summary.misconfiguration)
+            self._json({
+                "type": "summary",
+                "check": summary.misconfiguration.uid,
+                "status": summary.status.name,
+                "failed": summary.failed,
+                "passed": summary.passed,
+                "unknown": summary.unknown,
+            })
+        self.flush()
+
+
+class CsvWriter(FindingWriter):
+    """
+    One row per finding. Check metadata beyond uid and severity is left
+    out of the rows; it is the same for every row of a check.
+    """
+    COLUMNS = ("check", "severity", "account_id", "region",
+               "resource_name", "resource_id", "status")
+
+    def __init__(self, stream: typing.Optional[typing.TextIO] = None,
+                 buffer_lines: int = BUFFER_LINES):
+        super().__init__(stream, buffer_lines)
+        self._line = io.StringIO()
+        self._csv = csv.writer(self._line, lineterminator="\n")
+
+    def _row(self, row: typing.Sequence[typing.Any]) -> None:
+        self._csv.writerow(row)
+        self._emit(self._line.getvalue())
+        self._line.seek(0)
+        self._line.truncate()
+
+    def write_header(self) -> None:
+        self._row(self.COLUMNS)
+
+    def write_finding(self, finding: Finding) -> None:
+        misconfig, resource = finding.misconfiguration, finding.resource
+        self._row((misconfig.uid, misconfig.severity.name, misconfig.account_id,
+                   misconfig.region, resource.name, resource.resource_id,
+                   finding.status.name))
+
+
+class SarifWriter(FindingWriter):
+    """
+    SARIF 2.1.0 log with a single run. Results are streamed into the run as
+    they arrive; the rule descriptors are written after them on close, since
+    JSON member order is not significant.
+    """
+
+    def __init__(self, stream: typing.Optional[typing.TextIO] = None,
+                 buffer_lines: int = BUFFER_LINES):
+        super().__init__(stream, buffer_lines)
+        self._rule_index: typing.Dict[str, int] = {}
+        self._results = 0
+        self._closed = False
+
+    def write_header(self) -> None:
+        self._emit(f'{{"version":"{SARIF_VERSION}","$schema":"{SARIF_SCHEMA}",'
+                   f'"runs":[{{"results":[')
+
+    def write_check(self, misconfig: Misconfiguration) -> None:
+        self._rule_index[misconfig.uid] = len(self._rule_index)
+
+    def write_finding(self, finding: Finding) -> None:
+        misconfig, resource = finding.misconfiguration, finding.resource
+        failed = finding.status == MisconfigurationStatus.FAILED
+        result = {
+            "ruleId": misconfig.uid,
+            "ruleIndex": self._rule_index[misconfig.uid],
+            "kind": STATUS_TO_SARIF_KIND[finding.status],
+            "level": SEVERITY_TO_SARIF_LEVEL[misconfig.severity] if failed else "none",
+            "message": {"text": f"{misconfig.title}: {resource.name} "
+                                f"({finding.status.name})"},
+            "locations": [{"logicalLocations": [{
+                "name": resource.name,
+                "fullyQualifiedName": resource.resource_id or resource.name,
+                "kind": "resource",
+            }]}],
+            "properties": {"accountId": misconfig.account_id, "region": misconfig.region},
+        }
+        separator = "," if self._results else ""
+        self._results += 1
+        self._emit(separator + json.dumps(result, separators=(",", ":")))
+
+    def _rule(self, misconfig: Misconfiguration) -> typing.Dict[str, typing.Any]:
+        return {
+            "id": misconfig.uid,
+            "name": misconfig.title,
+            "shortDescription": {"text": misconfig.title},
+            "fullDescription": {"text": misconfig.description},
+            "help": {"text": misconfig.remediation_steps},
+            "defaultConfiguration": {"level": SEVERITY_TO_SARIF_LEVEL[misconfig.severity]},
+            "properties": {"severity": misconfig.severity.name},
+        }
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            rules = [self._rule(misconfig) for misconfig in self._checks.values()]
+            tool = {"driver": {"name": TOOL_NAME, "rules": rules}}
+            self._emit(f'],"tool":{json.dumps(tool, separators=(",", ":"))}}}]}}\n')
+        self.flush()
+
+
+OUTPUT_FORMATS: typing.Dict[str, typing.Callable[..., typing.Any]] = {
+    "text": FindingPrinter,
+    "jsonl": JsonLinesWriter,
+    "csv": CsvWriter,
+    "sarif": SarifWriter,
+}
+
+
+def create_writer(output_format: str, stream: typing.Optional[typing.TextIO] = None):
+    """
+    Returns the findings writer of ``output_format`` writing to ``stream``
+    (stdout by default).
+    """
+    try:
+        writer_cls = OUTPUT_FORMATS[output_format]
+    except KeyError:
+        raise ValueError(f"Unknown output format: {output_format}") from None
+    return writer_cls(stream)
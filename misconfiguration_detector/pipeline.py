@@ -0,0 +1,149 @@
+"""
+Streaming scan pipeline.
+
+Resources flow through generators - list, fetch attributes, evaluate every
+selected check, write the finding - so findings are emitted while buckets
+are still being collected and no inventory is kept in memory.
+"""
+import sys
+import time
+import typing
+
+from misconfiguration_detector.models import Misconfiguration, \
+    MisconfigurationStatus, Resource
+from misconfiguration_detector.utils.logging import logger
+from misconfiguration_detector.utils.metrics import get_metrics
+
+
+class Finding(typing.NamedTuple):
+    misconfiguration: Misconfiguration
+    resource: Resource
+    status: MisconfigurationStatus
+
+
+class CheckSummary:
+    """
+    Running per-check counters; the only state kept across resources.
+    """
+    __slots__ = ("misconfiguration", "failed", "passed", "unknown", "errored")
+
+    def __init__(self, misconfiguration: Misconfiguration):
+        self.misconfiguration = misconfiguration
+        self.failed = 0
+        self.passed = 0
+        self.unknown = 0
+        self.errored = False
+
+    @property
+    def status(self) -> MisconfigurationStatus:
+        if self.errored or self.failed:
+            return MisconfigurationStatus.FAILED
+        if self.unknown:
+            return MisconfigurationStatus.UNKNOWN
+        return MisconfigurationStatus.PASSED
+
+
+def stream_findings(misconfigs: typing.Sequence[Misconfiguration],
+                    resources: typing.Iterable[Resource],
+                    summaries: typing.Optional[typing.Dict[str, CheckSummary]] = None
+                    ) -> typing.Iterator[Finding]:
+    """
+    Evaluates every misconfiguration against each resource as it arrives and
+    yields one finding per (check, resource).
+
+    ``summaries`` is filled with the per-check counters, keyed by uid. A check
+    whose predicate raises is counted as FAILED and skipped from then on.
+    """
+    if summaries is None:
+        summaries = {}
+    metrics = get_metrics()
+    active = []
+    for misconfig in misconfigs:
+        summaries[misconfig.uid] = CheckSummary(misconfig)
+        active.append((misconfig, misconfig.required_attributes,
+                       metrics.time_check(misconfig.uid, misconfig.is_misconfigured),
+                       summaries[misconfig.uid]))
+
+    for resource in resources:
+        errored = None
+        unknown_attributes = resource.unknown_attributes
+        for check in active:
+            misconfig, required_attributes, is_misconfigured, summary = check
+            if unknown_attributes and not required_attributes.isdisjoint(unknown_attributes):
+                summary.unknown += 1
+                yield Finding(misconfig, resource, MisconfigurationStatus.UNKNOWN)
+                continue
+            try:
+                misconfigured = is_misconfigured(resource)
+            except Exception as error:
+                logger.error(
+                    f"Error evaluating misconfiguration [{misconfig.title}] "
+                    f"[{misconfig.account_id}]: {error}")
+                summary.errored = True
+                errored = errored or []
+                errored.append(check)
+                continue
+            if misconfigured:
+                summary.failed += 1
+                yield Finding(misconfig, resource, MisconfigurationStatus.FAILED)
+            else:
+                summary.passed += 1
+                yield Finding(misconfig, resource, MisconfigurationStatus.PASSED)
+        if errored:
+            active = [check for check in active if check not in errored]
+
+
+class FindingPrinter:
+    """
+    Writes one line per finding and flushes periodically so findings show
+    up while the scan is still running.
+    """
+
+    def __init__(self, stream: typing.Optional[typing.TextIO] = None,
+                 flush_every: int = 100, flush_interval: float = 1.0):
+        self.stream = stream or sys.stdout
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._pending = 0
+        # The first finding is flushed immediately.
+        self._last_flush = float("-inf")
+
+    def write_header(self) -> None:
+        self.stream.write("-" * 120 + "\n")
+        self.stream.write(
+            f"{'Check':<32} {'Name':<30} {'Resource ID':<40} {'Status':<10}\n")
+        self.stream.write("-" * 120 + "\n")
+        self.stream.flush()
+
+    def write(self, finding: Finding) -> None:
+        self.stream.write(
+            f"{finding.misconfiguration.uid:<32} "
+            f"{finding.resource.name:<30} "
+            f"{finding.resource.resource_id:<40} "
+            f"{finding.status.name:<10}\n")
+        self._pending += 1
+        if (self._pending >= self.flush_every
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def write_summary(self, summaries: typing.Iterable[CheckSummary]) -> None:
+        self.stream.write("-" * 120 + "\n\n")
+        self.stream.write("=" * 80 + "\n")
+        self.stream.write("Summary\n")
+        self.stream.write("=" * 80 + "\n")
+        for summary in summaries:
+            misconfig = summary.misconfiguration
+            self.stream.write(
+                f"{misconfig.title:<40} Severity: {misconfig.severity.name:<8} "
+                f"Status: {summary.status.name:<6} "
+                f"Failed: {summary.failed} Passed: {summary.passed} "
+                f"Unknown: {summary.unknown}\n")
+        self.flush()
+
+    def flush(self) -> None:
+        self.stream.flush()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        self.flush()
@@ -0,0 +1,76 @@
+"""
+Per-account AWS sessions for multi-account scans.
+
+Sessions are built on assumed-role credentials that botocore refreshes on
+its own shortly before they expire, so long scans never run with stale
+credentials. One session is cached per account for the life of the process.
+"""
+import threading
+import typing
+
+import boto3
+import botocore.session
+from botocore.credentials import RefreshableCredentials
+
+from misconfiguration_detector.utils.logging import logger
+
+DEFAULT_SESSION_NAME = "misconfiguration-detector"
+DEFAULT_DURATION_SECONDS = 3600
+
+
+class AssumeRoleSessionCache:
+    """
+    Caches one boto3 session per account, assuming ``role_name`` in it.
+
+    Without a role name the base session (the process credentials) is
+    returned for every account.
+    """
+
+    def __init__(self, role_name: typing.Optional[str] = None, *,
+                 session_name: str = DEFAULT_SESSION_NAME,
+                 duration_seconds: int = DEFAULT_DURATION_SECONDS,
+                 base_session: typing.Optional[boto3.session.Session] = None):
+        self.role_name = role_name
+        self.session_name = session_name
+        self.duration_seconds = duration_seconds
+        self.base_session = base_session or boto3.session.Session()
+        self._sessions: typing.Dict[str, boto3.session.Session] = {}
+        self._sts_client = None
+        self._lock = threading.Lock()
+
+    def session_for(self, account_id: str) -> boto3.session.Session:
+        if not self.role_name:
+            return self.base_session
+        with self._lock:
+            session = self._sessions.get(account_id)
+            if session is None:
+                session = self._sessions[account_id] = self._assume_role_session(account_id)
+            return session
+
+    def _assume_role_session(self, account_id: str) -> boto3.session.Session:
+        credentials = RefreshableCredentials.create_from_metadata(
+            metadata=self._assume_role(account_id),
+            refresh_using=lambda: self._assume_role(account_id),
+            method="sts-assume-role",
+        )
+        core_session = botocore.session.get_session()
+        core_session._credentials = credentials
+        return boto3.session.Session(botocore_session=core_session)
+
+    def _assume_role(self, account_id: str) -> typing.Dict[str, str]:
+        role_arn = f"arn:aws:iam::{account_id}:role/{self.role_name}"
+        logger.info(f"STS - assuming role {role_arn}")
+        if self._sts_client is None:
+            self._sts_client = self.base_session.client("sts")
+        response = self._sts_client.assume_role(
+            RoleArn=role_arn,
+            RoleSessionName=self.session_name,
+            DurationSeconds=self.duration_seconds,
+        )
+        credentials = response["Credentials"]
+        return {
+            "access_key": credentials["AccessKeyId"],
+            "secret_key": credentials["SecretAccessKey"],
+            "token": credentials["SessionToken"],
+            "expiry_time": credentials["Expiration"].isoformat(),
+        }
@@ -0,0 +1,48 @@
+"""
+Manifest of the built-in AWS checks and clients.
+
+Kept free of SDK imports: the registry reads it to list and select checks,
+and the modules named here are imported only when a selected check is loaded.
+"""
+from misconfiguration_detector.models import MisconfigurationSeverity, SupportedProviders
+from misconfiguration_detector.registry import CheckSpec, ClientSpec
+
+S3_PACKAGE = "misconfiguration_detector.providers.aws.services.s3"
+
+MANIFEST = (
+    ClientSpec(
+        name="s3_bucket",
+        provider=SupportedProviders.AWS,
+        supported_attributes=frozenset({"encryption", "versioning", "mfa_delete",
+                                        "object_lock", "logging", "logging_target_bucket"}),
+        target=f"{S3_PACKAGE}.s3_client:S3BucketClient",
+    ),
+    CheckSpec(
+        uid="s3_bucket_default_encryption",
+        provider=SupportedProviders.AWS,
+        severity=MisconfigurationSeverity.HIGH,
+        required_attributes=frozenset({"encryption"}),
+        target=f"{S3_PACKAGE}.s3_bucket_default_encryption:S3BucketDefaultEncryption",
+    ),
+    CheckSpec(
+        uid="s3_bucket_object_versioning",
+        provider=SupportedProviders.AWS,
+        severity=MisconfigurationSeverity.HIGH,
+        required_attributes=frozenset({"versioning"}),
+        target=f"{S3_PACKAGE}.s3_bucket_object_versioning:S3BucketObjectVersioning",
+    ),
+    CheckSpec(
+        uid="s3_bucket_enable_mfa_delete",
+        provider=SupportedProviders.AWS,
+        severity=MisconfigurationSeverity.MEDIUM,
+        required_attributes=frozenset({"mfa_delete"}),
+        target=f"{S3_PACKAGE}.s3_bucket_enable_mfa:S3BucketEnableMfaDelete",
+    ),
+    CheckSpec(
+        uid="s3_bucket_object_lock",
+        provider=SupportedProviders.AWS,
+        severity=MisconfigurationSeverity.MEDIUM,
+        required_attributes=frozenset({"object_lock"}),
+        target=f"{S3_PACKAGE}.s3_bucket_object_lock:S3BucketS3BucketObjectLock",
+    ),
+)
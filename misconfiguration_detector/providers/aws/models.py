@@ -2,4 +2,4 @@ from misconfiguration_detector.models import Resource
 
 
 class AwsResource(Resource):
-    pass
+    __slots__ = ()
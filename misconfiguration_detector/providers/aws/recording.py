@@ -0,0 +1,166 @@
+"""
+Record/replay of raw AWS API responses.
+
+In capture mode every API response (or non-retryable error) is appended to
+a gzip-compressed JSON-lines file. In replay mode the capture is served back
+through the same client interface with no network access, so new or changed
+checks can be re-evaluated offline and benchmarks run deterministically.
+
+Both modes plug into ``RegionalClientPool`` through its ``client_factory``
+hook, below the rate limiter and retry layer.
+"""
+import gzip
+import json
+import threading
+import typing
+
+import boto3
+from botocore.exceptions import ClientError
+
+from misconfiguration_detector.providers.aws.regional_clients import ClientFactoryFn
+from misconfiguration_detector.providers.aws.retry import RetryPolicy
+from misconfiguration_detector.utils.logging import logger
+
+REPLAY_MISS_ERROR_CODE = "NoRecordedResponse"
+
+
+def _request_key(operation: str, params: typing.Dict[str, typing.Any]) -> str:
+    return f"{operation} {json.dumps(params, sort_keys=True, default=str)}"
+
+
+class CaptureWriter:
+    """
+    Thread-safe, append-only writer of a gzip JSON-lines capture. Each run
+    appends a new gzip member, so captures of several runs can be combined.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = gzip.open(path, "at", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, record: typing.Dict[str, typing.Any]) -> None:
+        line = json.dumps(record, separators=(",", ":"), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class Capture:
+    """
+    In-memory index of a capture file: the last recorded outcome of every
+    (operation, parameters) pair.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._records: typing.Dict[str, typing.Dict[str, typing.Any]] = {}
+        with gzip.open(path, "rt", encoding="utf-8") as capture_file:
+            for line in capture_file:
+                record = json.loads(line)
+                self._records[_request_key(record["operation"], record["params"])] = record
+        logger.info(f"Replay - loaded {len(self._records)} recorded responses from {path}")
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def outcome(self, operation: str, params: typing.Dict[str, typing.Any]
+                ) -> typing.Optional[typing.Dict[str, typing.Any]]:
+        return self._records.get(_request_key(operation, params))
+
+
+class RecordingClient:
+    """
+    Proxies a boto3 client and records the outcome of every API call.
+    Retryable errors (throttling, transient failures) are not recorded, so a
+    capture holds the final outcome of each request.
+    """
+
+    def __init__(self, client, writer: CaptureWriter, region_name: str):
+        self._client = client
+        self._writer = writer
+        self._region_name = region_name
+        self._retry_policy = RetryPolicy()
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._client, name)
+        if not callable(attribute) or name.startswith("_") or name in ("close", "can_paginate"):
+            return attribute
+
+        def call(**kwargs):
+            record = {"operation": name, "region": self._region_name, "params": kwargs}
+            try:
+                response = attribute(**kwargs)
+            except ClientError as error:
+                if not self._retry_policy.is_retryable(error):
+                    record["error"] = {"Error": error.response.get("Error", {})}
+                    self._writer.write(record)
+                raise
+            record["response"] = {key: value for key, value in response.items()
+                                  if key != "ResponseMetadata"}
+            self._writer.write(record)
+            return response
+
+        return call
+
+
+class ReplayClient:
+    """
+    Serves recorded outcomes through the boto3 client interface. Requests
+    missing from the capture raise a ``NoRecordedResponse`` ClientError, so
+    the affected attributes are reported UNKNOWN.
+    """
+
+    def __init__(self, capture: Capture, region_name: str):
+        self._capture = capture
+        self._region_name = region_name
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def call(**kwargs):
+            record = self._capture.outcome(name, kwargs)
+            if record is None:
+                raise ClientError(
+                    {"Error": {"Code": REPLAY_MISS_ERROR_CODE,
+                               "Message": f"No recorded response for {name} {kwargs}"}},
+                    name)
+            if "error" in record:
+                raise ClientError(record["error"], name)
+            return record["response"]
+
+        return call
+
+    def close(self) -> None:
+        pass
+
+
+def recording_client_factory(writer: CaptureWriter,
+                             client_factory: typing.Optional[ClientFactoryFn] = None
+                             ) -> ClientFactoryFn:
+    """
+    Returns a ``RegionalClientPool`` client factory that records every
+    response of the clients created by ``client_factory``.
+    """
+    client_factory = client_factory or boto3.client
+
+    def create(service_name: str, region_name: str, **kwargs):
+        return RecordingClient(client_factory(service_name, region_name=region_name, **kwargs),
+                               writer, region_name)
+
+    return create
+
+
+def replay_client_factory(capture: Capture) -> ClientFactoryFn:
+    """
+    Returns a ``RegionalClientPool`` client factory serving ``capture``.
+    """
+
+    def create(service_name: str, region_name: str, **kwargs):
+        return ReplayClient(capture, region_name)
+
+    return create
@@ -0,0 +1,78 @@
+import threading
+import typing
+
+import boto3
+from botocore.config import Config
+
+from misconfiguration_detector.providers.aws.retry import NO_BOTOCORE_RETRIES, \
+    RateLimitedClient, RetryPolicy
+from misconfiguration_detector.scheduling import Deadline
+from misconfiguration_detector.utils.rate_limiter import AdaptiveRateLimiter
+
+ClientFactoryFn = typing.Callable[..., typing.Any]
+
+
+class RegionalClientPool:
+    """
+    Lazily creates and caches one boto3 client per region for a service.
+
+    Calling a bucket through a client of its own region avoids the
+    301/PermanentRedirect round-trips of a single cross-region client. Each
+    regional client has its own connection pool; all of them share the
+    pool's rate limiter and retry policy.
+    """
+
+    def __init__(self, service_name: str, *,
+                 max_pool_connections: int,
+                 rate_limiter: typing.Optional[AdaptiveRateLimiter] = None,
+                 retry_policy: typing.Optional[RetryPolicy] = None,
+                 session: typing.Optional[boto3.session.Session] = None,
+                 client_factory: typing.Optional[ClientFactoryFn] = None,
+                 deadline: typing.Optional[Deadline] = None):
+        self.service_name = service_name
+        self.max_pool_connections = max_pool_connections
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        self.retry_policy = retry_policy
+        # Calls are not retried past the deadline of the scan.
+        self.deadline = deadline
+        # boto3's default session is not safe to create clients from concurrently.
+        self._client_factory = client_factory or (session or boto3).client
+        self._clients: typing.Dict[str, RateLimitedClient] = {}
+        self._lock = threading.Lock()
+
+    def client_for(self, region_name: str) -> RateLimitedClient:
+        client = self._clients.get(region_name)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(region_name)
+                if client is None:
+                    client = RateLimitedClient(
+                        self._client_factory(
+                            self.service_name,
+                            region_name=region_name,
+                            config=Config(max_pool_connections=self.max_pool_connections,
+                                          retries=NO_BOTOCORE_RETRIES)
+                        ),
+                        rate_limiter=self.rate_limiter,
+                        retry_policy=self.retry_policy,
+                        service_name=self.service_name,
+                        region_name=region_name,
+                        deadline=self.deadline
+                    )
+                    self._clients[region_name] = client
+        return client
+
+    @property
+    def regions(self) -> typing.List[str]:
+        return list(self._clients)
+
+    def close(self) -> None:
+        """
+        Closes every regional client and releases its connection pool.
+        """
+        with self._lock:
+            clients, self._clients = self._clients, {}
+        for client in clients.values():
+            close = getattr(client, "close", None)
+            if close is not None:
+                close()
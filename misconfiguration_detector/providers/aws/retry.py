@@ -0,0 +1,154 @@
+"""
+Client-side throttling control for AWS API calls.
+
+``RateLimitedClient`` wraps a boto3 client so that every API call first
+acquires a token from a shared ``AdaptiveRateLimiter`` and throttled calls
+are retried with full-jitter exponential backoff. botocore's own retries
+are disabled on clients created with ``NO_BOTOCORE_RETRIES`` so this is the
+single retry layer. With a scan ``Deadline``, a call is not retried when
+the backoff would end past the deadline: the last error is raised instead.
+"""
+import random
+import time
+import typing
+
+from botocore.exceptions import ClientError, ConnectionError, HTTPClientError
+
+from misconfiguration_detector.scheduling import Deadline
+from misconfiguration_detector.utils.logging import logger
+from misconfiguration_detector.utils.metrics import Metrics, get_metrics
+from misconfiguration_detector.utils.rate_limiter import AdaptiveRateLimiter
+
+THROTTLING_ERROR_CODES = frozenset({
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+    "RequestThrottled",
+    "RequestThrottledException",
+    "RequestLimitExceeded",
+    "TooManyRequestsException",
+    "SlowDown",
+    "503",
+})
+TRANSIENT_ERROR_CODES = frozenset({
+    "InternalError",
+    "ServiceUnavailable",
+    "RequestTimeout",
+    "RequestTimeoutException",
+    "500",
+    "502",
+    "504",
+})
+NO_BOTOCORE_RETRIES = {"mode": "standard", "total_max_attempts": 1}
+
+DEFAULT_MAX_ATTEMPTS = 8
+DEFAULT_BASE_DELAY = 0.1
+DEFAULT_MAX_DELAY = 20.0
+
+
+def error_code(error: ClientError) -> str:
+    return error.response.get("Error", {}).get("Code", "")
+
+
+def error_name(error: Exception) -> str:
+    """
+    Returns the AWS error code of a ClientError, else the exception type name.
+    """
+    if isinstance(error, ClientError):
+        return error_code(error) or type(error).__name__
+    return type(error).__name__
+
+
+def is_throttling_error(error: Exception) -> bool:
+    return isinstance(error, ClientError) and error_code(error) in THROTTLING_ERROR_CODES
+
+
+class RetryPolicy:
+    """
+    Full-jitter exponential backoff for throttled and transient failures.
+    """
+
+    def __init__(self, max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 base_delay: float = DEFAULT_BASE_DELAY,
+                 max_delay: float = DEFAULT_MAX_DELAY):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def is_retryable(self, error: Exception) -> bool:
+        if isinstance(error, ClientError):
+            return error_code(error) in THROTTLING_ERROR_CODES | TRANSIENT_ERROR_CODES
+        return isinstance(error, (ConnectionError, HTTPClientError))
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class RateLimitedClient:
+    """
+    Proxies a boto3 client, routing every API call through the rate limiter
+    and the retry policy. Non-callable attributes are passed through.
+
+    Every attempt is reported to ``metrics`` (the process-wide registry by
+    default) under the client's service and region.
+    """
+
+    def __init__(self, client, rate_limiter: typing.Optional[AdaptiveRateLimiter] = None,
+                 retry_policy: typing.Optional[RetryPolicy] = None,
+                 service_name: str = "",
+                 region_name: str = "",
+                 metrics: typing.Optional[Metrics] = None,
+                 deadline: typing.Optional[Deadline] = None):
+        self._client = client
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.service_name = service_name
+        self.region_name = region_name
+        self.metrics = metrics or get_metrics()
+        self.deadline = deadline
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._client, name)
+        if not callable(attribute) or name.startswith("_") or name in ("close", "can_paginate"):
+            return attribute
+
+        def call(*args, **kwargs):
+            return self._call(name, attribute, *args, **kwargs)
+
+        return call
+
+    def _call(self, operation: str, method: typing.Callable, *args, **kwargs):
+        metrics = self.metrics
+        attempt = 0
+        while True:
+            wait = self.rate_limiter.acquire()
+            started = time.perf_counter()
+            try:
+                response = method(*args, **kwargs)
+            except Exception as error:
+                if metrics.enabled:
+                    metrics.observe_api_call(self.service_name, operation, self.region_name,
+                                             time.perf_counter() - started, wait,
+                                             error_name(error))
+                if is_throttling_error(error):
+                    self.rate_limiter.on_throttle()
+                attempt += 1
+                if attempt >= self.retry_policy.max_attempts \
+                        or not self.retry_policy.is_retryable(error):
+                    raise
+                delay = self.retry_policy.delay(attempt)
+                if self.deadline is not None and delay >= self.deadline.remaining:
+                    self.deadline.abandon_retry()
+                    logger.warning(f"AWS - deadline reached, not retrying {operation}: {error}")
+                    raise
+                metrics.observe_retry(self.service_name, operation, self.region_name, delay)
+                logger.info(
+                    f"AWS - retrying {operation} in {delay:.2f}s "
+                    f"(attempt {attempt + 1}/{self.retry_policy.max_attempts}): {error}")
+                time.sleep(delay)
+                continue
+            if metrics.enabled:
+                metrics.observe_api_call(self.service_name, operation, self.region_name,
+                                         time.perf_counter() - started, wait)
+            self.rate_limiter.on_success()
+            return response
@@ -0,0 +1,194 @@
+"""
+S3 configuration changes from CloudTrail log files.
+
+CloudTrail delivers gzip-compressed JSON files holding one ``Records`` array
+of events. The files of a local directory are read record by record, so a
+file is never loaded whole, and the S3 management events that change a
+bucket's configuration are folded into a ``BucketChanges`` set: which
+attributes of which buckets changed, and which buckets were created or
+deleted. Incremental scans refetch only those.
+
+CloudTrail delivers files late and per region, so a new file can hold events
+older than ones already applied. Progress is therefore tracked per file, not
+per event time: files already applied are skipped, and a file that could not
+be read is left unapplied and read again on the next run.
+"""
+import gzip
+import json
+import os
+import re
+import typing
+
+from misconfiguration_detector.utils.logging import logger
+
+S3_EVENT_SOURCE = "s3.amazonaws.com"
+CHUNK_SIZE = 64 * 1024
+RECORDS_START = re.compile(r'"Records"\s*:\s*\[')
+# Events changing bucket attributes -> the attributes to refetch.
+S3_EVENT_ATTRIBUTES: typing.Dict[str, typing.Tuple[str, ...]] = {
+    "PutBucketEncryption": ("encryption",),
+    "DeleteBucketEncryption": ("encryption",),
+    "PutBucketVersioning": ("versioning", "mfa_delete"),
+    "PutObjectLockConfiguration": ("object_lock",),
+    "PutBucketLogging": ("logging", "logging_target_bucket"),
+}
+CREATE_EVENTS = frozenset({"CreateBucket"})
+DELETE_EVENTS = frozenset({"DeleteBucket"})
+
+
+def iter_records(stream: typing.TextIO,
+                 chunk_size: int = CHUNK_SIZE) -> typing.Iterator[typing.Dict]:
+    """
+    Yields the elements of the top-level ``Records`` array of a CloudTrail
+    file, reading ``chunk_size`` characters at a time.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    while True:
+        chunk = stream.read(chunk_size)
+        buffer += chunk
+        match = RECORDS_START.search(buffer)
+        if match:
+            buffer = buffer[match.end():]
+            break
+        if not chunk:
+            return
+        # Keep enough of the tail to match a key split across two chunks.
+        buffer = buffer[-32:]
+
+    position = 0
+    while True:
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if position < len(buffer):
+            if buffer[position] == "]":
+                return
+            try:
+                record, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # The record continues in the next chunk.
+                pass
+            else:
+                yield record
+                continue
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            if buffer[position:].strip():
+                raise ValueError("Truncated CloudTrail file")
+            return
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+def iter_log_files(directory: str) -> typing.Iterator[str]:
+    """
+    Yields the CloudTrail files (``.json`` or ``.json.gz``) under ``directory``
+    in path order, which for the CloudTrail layout is delivery order.
+    """
+    for root, directories, files in os.walk(directory):
+        directories.sort()
+        for name in sorted(files):
+            if name.endswith((".json", ".json.gz")):
+                yield os.path.join(root, name)
+
+
+def read_log_file(path: str) -> typing.Iterator[typing.Dict]:
+    """
+    Yields the events of one CloudTrail file. Raises OSError or ValueError
+    when the file cannot be read.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as log_file:
+        yield from iter_records(log_file)
+
+
+class BucketChanges:
+    """
+    The bucket configuration changes recorded by a set of CloudTrail events.
+
+    Events may arrive in any order: a bucket's latest create or delete event
+    decides whether it exists, attribute changes accumulate.
+    """
+
+    def __init__(self):
+        self.attributes: typing.Dict[str, typing.Set[str]] = {}
+        # Bucket -> (event time, event name) of its latest create or delete event.
+        self._lifecycle: typing.Dict[str, typing.Tuple[str, str]] = {}
+        # Region of each bucket, as reported by its events.
+        self.regions: typing.Dict[str, str] = {}
+        self.events = 0
+        # Log files read in full, relative to the CloudTrail directory.
+        self.files: typing.List[str] = []
+
+    def add(self, event: typing.Dict) -> bool:
+        """
+        Records one CloudTrail event. Returns whether it changed a bucket.
+        """
+        name = event.get("eventName")
+        if event.get("eventSource") != S3_EVENT_SOURCE or event.get("errorCode"):
+            return False
+        if name not in S3_EVENT_ATTRIBUTES and name not in CREATE_EVENTS \
+                and name not in DELETE_EVENTS:
+            return False
+        bucket = (event.get("requestParameters") or {}).get("bucketName")
+        if not bucket:
+            return False
+        event_time = event.get("eventTime") or ""
+        if name in S3_EVENT_ATTRIBUTES:
+            self.attributes.setdefault(bucket, set()).update(S3_EVENT_ATTRIBUTES[name])
+        elif event_time >= self._lifecycle.get(bucket, ("", ""))[0]:
+            self._lifecycle[bucket] = (event_time, name)
+        if event.get("awsRegion"):
+            self.regions[bucket] = event["awsRegion"]
+        self.events += 1
+        return True
+
+    @property
+    def created(self) -> typing.Set[str]:
+        return {bucket for bucket, (_, name) in self._lifecycle.items() if name in CREATE_EVENTS}
+
+    @property
+    def deleted(self) -> typing.Set[str]:
+        return {bucket for bucket, (_, name) in self._lifecycle.items() if name in DELETE_EVENTS}
+
+    @property
+    def buckets(self) -> typing.List[str]:
+        return sorted(self.attributes.keys() | self._lifecycle.keys())
+
+    def __len__(self) -> int:
+        return len(self.buckets)
+
+
+def read_bucket_changes(directory: str, account_id: str,
+                        processed: typing.AbstractSet[str] = frozenset()) -> BucketChanges:
+    """
+    Returns the changes to the buckets of ``account_id`` recorded in the
+    CloudTrail files under ``directory``, skipping the files in ``processed``
+    (paths relative to ``directory``). The files read in full are listed in
+    ``BucketChanges.files``.
+
+    The events of a file that fails part way are kept: refetching a bucket
+    is harmless, missing a change is not.
+    """
+    changes = BucketChanges()
+    skipped = 0
+    for path in iter_log_files(directory):
+        relative_path = os.path.relpath(path, directory)
+        if relative_path in processed:
+            skipped += 1
+            continue
+        try:
+            for event in read_log_file(path):
+                recipient = event.get("recipientAccountId")
+                if recipient is not None and recipient != account_id:
+                    continue
+                changes.add(event)
+        except (OSError, ValueError) as error:
+            logger.warning(f"CloudTrail - unreadable log file {path}, "
+                           f"retried on the next run: {error}")
+            continue
+        changes.files.append(relative_path)
+    logger.info(f"CloudTrail - {changes.events} S3 configuration events in "
+                f"{len(changes.files)} new log files changed {len(changes)} buckets of "
+                f"account {account_id} ({skipped} files already applied)")
+    return changes
@@ -0,0 +1,233 @@
+"""
+Collection of S3 bucket configuration.
+
+``S3BucketCollector`` issues the per-bucket API calls and writes the results
+into ``S3Bucket`` records, so the records themselves hold no client and stay
+plain data.
+"""
+import sys
+import threading
+import typing
+
+from botocore.exceptions import ClientError
+from misconfiguration_detector.providers.aws.regional_clients import RegionalClientPool
+from misconfiguration_detector.providers.aws.retry import RateLimitedClient, \
+    is_throttling_error
+from misconfiguration_detector.providers.aws.services.s3.models import S3Bucket
+from misconfiguration_detector.scheduling import Deadline
+from misconfiguration_detector.utils.logging import logger
+
+
+class S3BucketCollector:
+    """
+    Fetches bucket attributes through the client of each bucket's region.
+
+    Each setter issues a single API call and writes a disjoint set of
+    attributes, so different setters may run concurrently for the same bucket.
+    """
+
+    # Maps every attribute to the setter (one API call) that populates it.
+    ATTRIBUTE_FETCHERS: typing.Dict[str, str] = {
+        "versioning": "_set_bucket_versioning",
+        "mfa_delete": "_set_bucket_versioning",
+        "encryption": "_set_bucket_encryption",
+        "logging": "_set_bucket_logging",
+        "logging_target_bucket": "_set_bucket_logging",
+        "object_lock": "_set_object_lock_configuration",
+    }
+
+    def __init__(self, clients: RegionalClientPool, region_name: str,
+                 deadline: typing.Optional[Deadline] = None):
+        self.clients = clients
+        # Buckets whose region is not known yet are called through this region's client.
+        self.region_name = region_name
+        # Past the deadline, setters mark their attributes unknown without calling the API.
+        self.deadline = deadline
+        self._lock = threading.Lock()
+
+    @classmethod
+    def fetchers_for(cls, attributes: typing.Optional[typing.Iterable[str]] = None
+                     ) -> typing.List[str]:
+        """
+        Returns the setter names needed to populate ``attributes``, each once.
+
+        Attributes served by the same API call share a setter, so requesting
+        ``versioning`` and ``mfa_delete`` results in a single call. ``None``
+        selects every attribute.
+        """
+        requested = set(cls.ATTRIBUTE_FETCHERS if attributes is None else attributes)
+        unknown = requested - cls.ATTRIBUTE_FETCHERS.keys()
+        if unknown:
+            raise ValueError(f"Unknown S3 bucket attributes: {sorted(unknown)}")
+        setters = []
+        for attribute, setter in cls.ATTRIBUTE_FETCHERS.items():
+            if attribute in requested and setter not in setters:
+                setters.append(setter)
+        return setters
+
+    @classmethod
+    def setter_attributes(cls, setter: str) -> typing.List[str]:
+        """
+        Returns the attributes populated by ``setter``.
+        """
+        return [attribute for attribute, attribute_setter in cls.ATTRIBUTE_FETCHERS.items()
+                if attribute_setter == setter]
+
+    @classmethod
+    def attribute_values(cls, bucket: S3Bucket, setter: str) -> typing.Dict[str, typing.Any]:
+        """
+        Returns the current values of the attributes populated by ``setter``.
+        """
+        return {attribute: getattr(bucket, attribute)
+                for attribute in cls.setter_attributes(setter)}
+
+    def client_for(self, bucket: S3Bucket) -> RateLimitedClient:
+        return self.clients.client_for(bucket.region or self.region_name)
+
+    def fetch(self, bucket: S3Bucket, setter: str) -> None:
+        """
+        Runs one setter for the bucket.
+        """
+        if self.deadline is not None and self.deadline.expired:
+            self.deadline.skip(self.setter_attributes(setter))
+            self._mark_unknown(bucket, setter)
+            return
+        getattr(self, setter)(bucket)
+
+    def fetch_attributes(self, bucket: S3Bucket,
+                         attributes: typing.Optional[typing.Iterable[str]] = None) -> None:
+        """
+        Populates the requested bucket attributes serially.
+        """
+        for setter in self.fetchers_for(attributes):
+            self.fetch(bucket, setter)
+
+    def _mark_unknown(self, bucket: S3Bucket, setter: str) -> None:
+        """
+        Marks every attribute populated by ``setter`` as unknown.
+        """
+        # Setters of the same bucket may fail concurrently.
+        with self._lock:
+            bucket.unknown_attributes = bucket.unknown_attributes.union(
+                self.setter_attributes(setter))
+
+    def _set_bucket_versioning(self, bucket: S3Bucket) -> None:
+        """
+        Sets bucket versioning and MFA Delete configuration.
+        """
+        logger.info(f"S3 - checking versioning for bucket: {bucket.name}")
+        try:
+            response = self.client_for(bucket).get_bucket_versioning(Bucket=bucket.name)
+            bucket.versioning = response.get("Status") == "Enabled"
+            bucket.mfa_delete = response.get("MFADelete") == "Enabled"
+
+        except ClientError as e:
+            code = e.response["Error"]["Code"]
+            if code == "AccessDenied":
+                logger.warning(f"S3 - access denied when reading versioning for {bucket.name}")
+                self._mark_unknown(bucket, "_set_bucket_versioning")
+            elif is_throttling_error(e):
+                logger.warning(f"S3 - throttled while reading versioning for {bucket.name}")
+                self._mark_unknown(bucket, "_set_bucket_versioning")
+            else:
+                logger.error(f"S3 - unexpected error getting versioning for {bucket.name}: {e}")
+                self._mark_unknown(bucket, "_set_bucket_versioning")
+        except Exception as e:
+            logger.error(f"S3 - unexpected response structure for versioning in {bucket.name}: {e}")
+            self._mark_unknown(bucket, "_set_bucket_versioning")
+
+    def _set_bucket_encryption(self, bucket: S3Bucket) -> None:
+        """
+        Sets default server-side encryption configuration for the bucket.
+        """
+        logger.info(f"S3 - checking encryption for bucket: {bucket.name}")
+        try:
+            response = self.client_for(bucket).get_bucket_encryption(Bucket=bucket.name)
+            bucket.encryption = sys.intern(
+                response["ServerSideEncryptionConfiguration"]["Rules"][0]
+                ["ApplyServerSideEncryptionByDefault"]["SSEAlgorithm"]
+            )
+
+        except ClientError as e:
+            code = e.response["Error"]["Code"]
+            if code == "ServerSideEncryptionConfigurationNotFoundError":
+                logger.info(f"S3 - encryption not enabled for bucket {bucket.name}")
+                bucket.encryption = None
+            elif code == "AccessDenied":
+                logger.warning(f"S3 - access denied when reading encryption for {bucket.name}")
+                self._mark_unknown(bucket, "_set_bucket_encryption")
+            elif is_throttling_error(e):
+                logger.warning(f"S3 - throttled while reading encryption for {bucket.name}")
+                self._mark_unknown(bucket, "_set_bucket_encryption")
+            else:
+                logger.error(f"S3 - unexpected error getting encryption for {bucket.name}: {e}")
+                self._mark_unknown(bucket, "_set_bucket_encryption")
+
+        except KeyError as e:
+            logger.error(
+                f"S3 - unexpected response structure for encryption in {bucket.name}: {e}"
+            )
+            self._mark_unknown(bucket, "_set_bucket_encryption")
+        except Exception as e:
+            logger.error(
+                f"S3 - unexpected response structure for encryption in {bucket.name}: {e}"
+            )
+            self._mark_unknown(bucket, "_set_bucket_encryption")
+
+    def _set_object_lock_configuration(self, bucket: S3Bucket) -> None:
+        """
+        Sets Object Lock configuration for the bucket.
+        """
+        logger.info(f"S3 - checking object lock for bucket: {bucket.name}")
+        try:
+            self.client_for(bucket).get_object_lock_configuration(Bucket=bucket.name)
+            bucket.object_lock = True
+
+        except ClientError as e:
+            code = e.response["Error"]["Code"]
+            if code in ("ObjectLockConfigurationNotFoundError", "InvalidRequest"):
+                bucket.object_lock = False
+            elif code == "AccessDenied":
+                logger.warning(f"S3 - access denied when reading object lock for {bucket.name}")
+                self._mark_unknown(bucket, "_set_object_lock_configuration")
+            elif is_throttling_error(e):
+                logger.warning(f"S3 - throttled while reading object lock for {bucket.name}")
+                self._mark_unknown(bucket, "_set_object_lock_configuration")
+            else:
+                logger.error(
+                    f"S3 - unexpected error getting object lock for {bucket.name}: {e}"
+                )
+                self._mark_unknown(bucket, "_set_object_lock_configuration")
+
+        except Exception as e:
+            logger.error(
+                f"S3 - unexpected response structure for object lock in {bucket.name}: {e}"
+            )
+            self._mark_unknown(bucket, "_set_object_lock_configuration")
+
+    def _set_bucket_logging(self, bucket: S3Bucket) -> None:
+        """
+        Sets access logging configuration for the bucket.
+        """
+        logger.info(f"S3 - checking access logging for bucket: {bucket.name}")
+        try:
+            response = self.client_for(bucket).get_bucket_logging(Bucket=bucket.name)
+            if "LoggingEnabled" in response:
+                bucket.logging = True
+                bucket.logging_target_bucket = response["LoggingEnabled"]["TargetBucket"]
+
+        except ClientError as e:
+            code = e.response["Error"]["Code"]
+            if code == "AccessDenied":
+                logger.warning(f"S3 - access denied when reading logging for {bucket.name}")
+                self._mark_unknown(bucket, "_set_bucket_logging")
+            elif is_throttling_error(e):
+                logger.warning(f"S3 - throttled while reading logging for {bucket.name}")
+                self._mark_unknown(bucket, "_set_bucket_logging")
+            else:
+                logger.error(f"S3 - unexpected error getting logging for {bucket.name}: {e}")
+                self._mark_unknown(bucket, "_set_bucket_logging")
+
+        except Exception as e:
+            logger.error(f"S3 - unexpected response structure for logging in {bucket.name}: {e}")
+            self._mark_unknown(bucket, "_set_bucket_logging")
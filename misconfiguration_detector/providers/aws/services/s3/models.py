@@ -1,16 +1,29 @@
 """
 AWS S3 Bucket Resource Model.
 
-This module defines the S3Bucket class, which represents an Amazon S3 bucket
-and encapsulates logic for retrieving security-relevant configuration using
-the AWS SDK (boto3).
+This module defines the S3Bucket record, which holds the security-relevant
+configuration of an Amazon S3 bucket, and S3BucketTable, a columnar store of
+many bucket records. Both are plain data: the configuration is fetched by
+``S3BucketCollector``, so records can be pickled, cached and sent to worker
+processes.
 
 """
+import array
+import collections.abc
+import sys
 import typing
 from typing import Optional
-from botocore.exceptions import ClientError
+
+from misconfiguration_detector.models import ResourceBitset
 from misconfiguration_detector.providers.aws.models import AwsResource
-from misconfiguration_detector.utils.logging import logger
+
+ARN_PREFIX = "arn:aws:s3:::"
+# Shared by every fully collected bucket; empty frozensets are not singletons.
+NO_UNKNOWN_ATTRIBUTES: typing.FrozenSet[str] = frozenset()
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return None if value is None else sys.intern(value)
 
 
 class S3Bucket(AwsResource):
@@ -21,130 +34,171 @@ class S3Bucket(AwsResource):
     Attributes:
         name (str): Bucket name.
         resource_id (str): Bucket ARN.
+        region (Optional[str]): Bucket region, when known.
         encryption (Optional[str]): Server-side encryption algorithm if enabled.
         versioning (bool): Whether bucket versioning is enabled.
         mfa_delete (bool): Whether MFA Delete is enabled.
         object_lock (bool): Whether Object Lock is enabled.
         logging (bool): Whether access logging is enabled.
         logging_target_bucket (Optional[str]): Target bucket for access logs.
+        unknown_attributes (FrozenSet[str]): Attributes that could not be read
+            (access denied, throttled after retries, unexpected errors).
+            Checks reading them report UNKNOWN rather than FAILED.
     """
-
-    encryption: Optional[str]
-    versioning: bool = False
-    mfa_delete: bool = False
-    object_lock: bool = False
-    logging: bool = False
-    logging_target_bucket: Optional[str] = None
-
-    def __init__(self, *, bucket_data: typing.Dict, aws_s3_client):
-        self.client = aws_s3_client
-        self.name = bucket_data.get("Name", "")
-        self.resource_id = bucket_data.get("BucketArn", "")
-        self._set_bucket_versioning()
-        self._set_bucket_encryption()
-        self._set_bucket_logging()
-        self._set_object_lock_configuration()
-
-    def _set_bucket_versioning(self):
+    # Configuration attributes, i.e. everything a check may read besides the identity.
+    ATTRIBUTES = ("encryption", "versioning", "mfa_delete", "object_lock",
+                  "logging", "logging_target_bucket")
+
+    __slots__ = ("name", "_arn", "region") + ATTRIBUTES + ("unknown_attributes",)
+
+    def __init__(self, name: str, resource_id: Optional[str] = None,
+                 region: Optional[str] = None):
+        self.name = name
+        # Only an ARN that differs from the one derived from the name is stored.
+        self._arn = None if not resource_id or resource_id == ARN_PREFIX + name else resource_id
+        self.region = _intern(region)
+        self.encryption: Optional[str] = None
+        self.versioning = False
+        self.mfa_delete = False
+        self.object_lock = False
+        self.logging = False
+        self.logging_target_bucket: Optional[str] = None
+        self.unknown_attributes = NO_UNKNOWN_ATTRIBUTES
+
+    @classmethod
+    def from_bucket_data(cls, bucket_data: typing.Dict,
+                         region: Optional[str] = None) -> "S3Bucket":
         """
-        Sets bucket versioning and MFA Delete configuration.
+        Creates the record of a bucket returned by list_buckets.
         """
-        logger.info(f"S3 - checking versioning for bucket: {self.name}")
-        try:
-            response = self.client.get_bucket_versioning(Bucket=self.name)
-            self.versioning = response.get("Status") == "Enabled"
-            self.mfa_delete = response.get("MFADelete") == "Enabled"
-
-        except ClientError as e:
-            code = e.response["Error"]["Code"]
-            if code == "AccessDenied":
-                logger.warning(f"S3 - access denied when reading versioning for {self.name}")
-            elif code == "Throttling":
-                logger.warning(f"S3 - throttled while reading versioning for {self.name}")
-            else:
-                logger.error(f"S3 - unexpected error getting versioning for {self.name}: {e}")
-        except Exception as e:
-            logger.error(f"S3 - unexpected response structure for versioning in {self.name}: {e}")
-
-    def _set_bucket_encryption(self):
-        """
-        Sets default server-side encryption configuration for the bucket.
-        """
-        logger.info(f"S3 - checking encryption for bucket: {self.name}")
+        return cls(bucket_data.get("Name", ""), bucket_data.get("BucketArn"),
+                   region or bucket_data.get("BucketRegion"))
+
+    @property
+    def resource_id(self) -> str:
+        return self._arn or ARN_PREFIX + self.name
+
+    def __getstate__(self) -> typing.Tuple:
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+    def __setstate__(self, state: typing.Tuple) -> None:
+        for slot, value in zip(self.__slots__, state):
+            setattr(self, slot, value)
+
+    def __repr__(self) -> str:
+        return f"S3Bucket(name={self.name!r}, region={self.region!r})"
+
+
+class S3BucketTable(collections.abc.Sequence):
+    """
+    Columnar, array-backed table of bucket records.
+
+    Names are kept in a list, regions and encryption algorithms as one-byte
+    codes, the boolean attributes as bit flags packed in one byte per
+    bucket, and the rarely set values (non-standard ARNs, logging targets,
+    unknown attributes) in sparse maps. Indexing materializes an
+    ``S3Bucket`` record on demand; ``column`` returns a whole attribute for
+    bulk evaluation.
+    """
+    BOOLEAN_ATTRIBUTES = ("versioning", "mfa_delete", "object_lock", "logging")
+    FLAGS = {attribute: 1 << bit for bit, attribute in enumerate(BOOLEAN_ATTRIBUTES)}
+
+    def __init__(self, buckets: typing.Iterable[S3Bucket] = ()):
+        self._names: typing.List[str] = []
+        self._arns: typing.Dict[int, str] = {}
+        self._regions = array.array("B")
+        self._region_values: typing.List[Optional[str]] = [None]
+        self._encryptions = array.array("B")
+        self._encryption_values: typing.List[Optional[str]] = [None]
+        self._flags = bytearray()
+        self._logging_targets: typing.Dict[int, str] = {}
+        self._unknown: typing.Dict[int, typing.FrozenSet[str]] = {}
+        for bucket in buckets:
+            self.append(bucket)
+
+    @staticmethod
+    def _code(values: typing.List[Optional[str]], value: Optional[str]) -> int:
         try:
-            response = self.client.get_bucket_encryption(Bucket=self.name)
-            self.encryption = (
-                response["ServerSideEncryptionConfiguration"]["Rules"][0]
-                ["ApplyServerSideEncryptionByDefault"]["SSEAlgorithm"]
-            )
-
-        except ClientError as e:
-            code = e.response["Error"]["Code"]
-            if code == "ServerSideEncryptionConfigurationNotFoundError":
-                logger.info(f"S3 - encryption not enabled for bucket {self.name}")
-                self.encryption = None
-            elif code == "AccessDenied":
-                logger.warning(f"S3 - access denied when reading encryption for {self.name}")
-            elif code == "Throttling":
-                logger.warning(f"S3 - throttled while reading encryption for {self.name}")
-            else:
-                logger.error(f"S3 - unexpected error getting encryption for {self.name}: {e}")
-
-        except KeyError as e:
-            logger.error(
-                f"S3 - unexpected response structure for encryption in {self.name}: {e}"
-            )
-        except Exception as e:
-            logger.error(
-                f"S3 - unexpected response structure for encryption in {self.name}: {e}"
-            )
-
-    def _set_object_lock_configuration(self):
+            return values.index(value)
+        except ValueError:
+            values.append(_intern(value))
+            return len(values) - 1
+
+    def append(self, bucket: S3Bucket) -> None:
+        index = len(self._names)
+        self._names.append(bucket.name)
+        if bucket._arn is not None:
+            self._arns[index] = bucket._arn
+        self._regions.append(self._code(self._region_values, bucket.region))
+        self._encryptions.append(self._code(self._encryption_values, bucket.encryption))
+        flags = 0
+        for attribute, flag in self.FLAGS.items():
+            if getattr(bucket, attribute):
+                flags |= flag
+        self._flags.append(flags)
+        if bucket.logging_target_bucket is not None:
+            self._logging_targets[index] = bucket.logging_target_bucket
+        if bucket.unknown_attributes:
+            self._unknown[index] = bucket.unknown_attributes
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def _record(self, index: int) -> S3Bucket:
+        bucket = S3Bucket.__new__(S3Bucket)
+        bucket.name = self._names[index]
+        bucket._arn = self._arns.get(index)
+        bucket.region = self._region_values[self._regions[index]]
+        bucket.encryption = self._encryption_values[self._encryptions[index]]
+        flags = self._flags[index]
+        # Bits follow BOOLEAN_ATTRIBUTES.
+        bucket.versioning = bool(flags & 1)
+        bucket.mfa_delete = bool(flags & 2)
+        bucket.object_lock = bool(flags & 4)
+        bucket.logging = bool(flags & 8)
+        bucket.logging_target_bucket = self._logging_targets.get(index)
+        bucket.unknown_attributes = self._unknown.get(index, NO_UNKNOWN_ATTRIBUTES)
+        return bucket
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._record(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("S3BucketTable index out of range")
+        return self._record(index)
+
+    def __iter__(self) -> typing.Iterator[S3Bucket]:
+        for index in range(len(self)):
+            yield self._record(index)
+
+    def column(self, attribute: str) -> typing.List[typing.Any]:
         """
-        Sets Object Lock configuration for the bucket.
+        Returns the values of ``attribute`` for every bucket, in table order.
         """
-        logger.info(f"S3 - checking object lock for bucket: {self.name}")
-        try:
-            self.client.get_object_lock_configuration(Bucket=self.name)
-            self.object_lock = True
-
-        except ClientError as e:
-            code = e.response["Error"]["Code"]
-            if code in ("ObjectLockConfigurationNotFoundError", "InvalidRequest"):
-                self.object_lock = False
-            elif code == "AccessDenied":
-                logger.warning(f"S3 - access denied when reading object lock for {self.name}")
-            elif code == "Throttling":
-                logger.warning(f"S3 - throttled while reading object lock for {self.name}")
-            else:
-                logger.error(
-                    f"S3 - unexpected error getting object lock for {self.name}: {e}"
-                )
-
-        except Exception as e:
-            logger.error(
-                f"S3 - unexpected response structure for object lock in {self.name}: {e}"
-            )
-
-    def _set_bucket_logging(self):
+        if attribute == "name":
+            return list(self._names)
+        if attribute == "resource_id":
+            return [self._arns.get(index) or ARN_PREFIX + name
+                    for index, name in enumerate(self._names)]
+        if attribute == "region":
+            return [self._region_values[code] for code in self._regions]
+        if attribute == "encryption":
+            return [self._encryption_values[code] for code in self._encryptions]
+        if attribute == "logging_target_bucket":
+            return [self._logging_targets.get(index) for index in range(len(self))]
+        if attribute in self.FLAGS:
+            flag = self.FLAGS[attribute]
+            return [bool(flags & flag) for flags in self._flags]
+        raise KeyError(f"Unknown S3 bucket attribute: {attribute}")
+
+    def unknown_indices(self, attribute: str) -> ResourceBitset:
         """
-        Sets access logging configuration for the bucket.
+        Returns the indices of the buckets whose ``attribute`` could not be read.
         """
-        logger.info(f"S3 - checking access logging for bucket: {self.name}")
-        try:
-            response = self.client.get_bucket_logging(Bucket=self.name)
-            if "LoggingEnabled" in response:
-                self.logging = True
-                self.logging_target_bucket = response["LoggingEnabled"]["TargetBucket"]
-
-        except ClientError as e:
-            code = e.response["Error"]["Code"]
-            if code == "AccessDenied":
-                logger.warning(f"S3 - access denied when reading logging for {self.name}")
-            elif code == "Throttling":
-                logger.warning(f"S3 - throttled while reading logging for {self.name}")
-            else:
-                logger.error(f"S3 - unexpected error getting logging for {self.name}: {e}")
-
-        except Exception as e:
-            logger.error(f"S3 - unexpected response structure for logging in {self.name}: {e}")
\ No newline at end of file
+        indices = ResourceBitset(len(self))
+        for index, attributes in self._unknown.items():
+            if attribute in attributes:
+                indices.add(index)
+        return indices
@@ -1,13 +1,15 @@
-from misconfiguration_detector.client_factory import ClientFactory
-from misconfiguration_detector.models import Misconfiguration, \
-    MisconfigurationSeverity
+from misconfiguration_detector.models import MisconfigurationSeverity
+from misconfiguration_detector.providers.aws.services.s3.models import S3Bucket
+from misconfiguration_detector.providers.aws.services.s3.s3_bucket_misconfiguration import \
+    S3BucketMisconfiguration
 
 
-class S3BucketDefaultEncryption(Misconfiguration):
+class S3BucketDefaultEncryption(S3BucketMisconfiguration):
     uid = "s3_bucket_default_encryption"
     title = "S3 Bucket Default Encryption Disabled"
     description = "S3 Bucket does not have default encryption enabled."
     severity = MisconfigurationSeverity.HIGH
+    required_attributes = frozenset({"encryption"})
     remediation_steps = (
         "Enable default server-side encryption on the S3 bucket to ensure that all "
         "objects are encrypted at rest. Enforcing encryption strengthens data "
@@ -21,10 +23,5 @@ class S3BucketDefaultEncryption(Misconfiguration):
         "https://aws.amazon.com/blogs/security/how-to-prevent-uploads-of-unencrypted-objects-to-amazon-s3/."
     )
 
-    def _evaluate(self) -> None:
-        s3_bucket = ClientFactory.get_s3_client(self.account_id)
-        for bucket in s3_bucket.buckets:
-            if not bucket.encryption:
-                self.misconfigured_resources.append(bucket)
-            else:
-                self.not_misconfigured_resources.append(bucket)
+    def is_misconfigured(self, bucket: S3Bucket) -> bool:
+        return not bucket.encryption
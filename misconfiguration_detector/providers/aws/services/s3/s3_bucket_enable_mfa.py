@@ -1,13 +1,15 @@
-from misconfiguration_detector.client_factory import ClientFactory
-from misconfiguration_detector.models import Misconfiguration, \
-    MisconfigurationSeverity
+from misconfiguration_detector.models import MisconfigurationSeverity
+from misconfiguration_detector.providers.aws.services.s3.models import S3Bucket
+from misconfiguration_detector.providers.aws.services.s3.s3_bucket_misconfiguration import \
+    S3BucketMisconfiguration
 
 
-class S3BucketEnableMfaDelete(Misconfiguration):
+class S3BucketEnableMfaDelete(S3BucketMisconfiguration):
     uid = "s3_bucket_enable_mfa_delete"
     title = "S3 Bucket MFA Delete Not Enabled"
     description = "S3 Bucket does not have MFA Delete enabled."
     severity = MisconfigurationSeverity.MEDIUM
+    required_attributes = frozenset({"mfa_delete"})
     remediation_steps = (
         "Enable MFA Delete on the S3 bucket to require multi-factor authentication "
         "when changing the bucket versioning state or deleting object versions. "
@@ -21,10 +23,5 @@ class S3BucketEnableMfaDelete(Misconfiguration):
         "https://docs.aws.amazon.com/AmazonS3/latest/userguide/MultiFactorAuthenticationDelete.html. "
     )
 
-    def _evaluate(self) -> None:
-        s3_bucket = ClientFactory.get_s3_client(account_id=self.account_id)
-        for bucket in s3_bucket.buckets:
-            if not bucket.mfa_delete:
-                self.misconfigured_resources.append(bucket)
-            else:
-                self.not_misconfigured_resources.append(bucket)
+    def is_misconfigured(self, bucket: S3Bucket) -> bool:
+        return not bucket.mfa_delete
@@ -0,0 +1,18 @@
+import typing
+
+from misconfiguration_detector.models import Misconfiguration
+from misconfiguration_detector.providers.aws.services.s3.models import S3Bucket
+from misconfiguration_detector.providers.aws.services.s3.s3_client import \
+    S3BucketClient
+from misconfiguration_detector.session import get_default_session
+
+
+class S3BucketMisconfiguration(Misconfiguration):
+    """
+    Base class for checks evaluated against the account's S3 bucket inventory.
+    """
+
+    def get_resources(self) -> typing.Sequence[S3Bucket]:
+        session = self.session or get_default_session()
+        return session.get_resources(S3BucketClient, account_id=self.account_id,
+                                     region_name=self.region)
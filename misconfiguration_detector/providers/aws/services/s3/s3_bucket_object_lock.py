@@ -1,15 +1,17 @@
 import typing
 
-from misconfiguration_detector.client_factory import ClientFactory
-from misconfiguration_detector.models import Misconfiguration, \
-    MisconfigurationSeverity
+from misconfiguration_detector.models import MisconfigurationSeverity
+from misconfiguration_detector.providers.aws.services.s3.models import S3Bucket
+from misconfiguration_detector.providers.aws.services.s3.s3_bucket_misconfiguration import \
+    S3BucketMisconfiguration
 
 
-class S3BucketS3BucketObjectLock(Misconfiguration):
+class S3BucketS3BucketObjectLock(S3BucketMisconfiguration):
     uid = "s3_bucket_object_lock"
     title = "S3 Bucket Object Lock Disabled"
     description = "S3 Bucket does not have Object Lock enabled."
     severity = MisconfigurationSeverity.MEDIUM
+    required_attributes = frozenset({"object_lock"})
     remediation_steps = (
         "Enable S3 Object Lock on the bucket to enforce write-once-read-many (WORM) "
         "protections. Object Lock prevents objects from being deleted or overwritten "
@@ -24,10 +26,5 @@ class S3BucketS3BucketObjectLock(Misconfiguration):
         "https://docs.aws.amazon.com/AmazonS3/latest/userguide/object-lock-overview.html. "
     )
 
-    def _evaluate(self) -> None:
-        s3_bucket = ClientFactory.get_s3_client(account_id=self.account_id)
-        for bucket in s3_bucket.buckets:
-            if not bucket.object_lock:
-                self.misconfigured_resources.append(bucket)
-            else:
-                self.not_misconfigured_resources.append(bucket)
+    def is_misconfigured(self, bucket: S3Bucket) -> bool:
+        return not bucket.object_lock
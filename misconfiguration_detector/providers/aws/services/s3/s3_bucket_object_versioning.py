@@ -1,12 +1,15 @@
-from misconfiguration_detector.client_factory import ClientFactory
-from misconfiguration_detector.models import Misconfiguration, MisconfigurationSeverity
+from misconfiguration_detector.models import MisconfigurationSeverity
+from misconfiguration_detector.providers.aws.services.s3.models import S3Bucket
+from misconfiguration_detector.providers.aws.services.s3.s3_bucket_misconfiguration import \
+    S3BucketMisconfiguration
 
 
-class S3BucketObjectVersioning(Misconfiguration):
+class S3BucketObjectVersioning(S3BucketMisconfiguration):
     uid = "s3_bucket_object_versioning"
     title = "S3 Bucket Object Versioning Disabled"
     description = "S3 Bucket does not have object versioning enabled."
     severity = MisconfigurationSeverity.HIGH
+    required_attributes = frozenset({"versioning"})
     remediation_steps = (
         "Enable S3 bucket versioning to retain previous versions of objects and "
         "protect against accidental overwrites, deletions, and malicious modifications. "
@@ -15,10 +18,6 @@ class S3BucketObjectVersioning(Misconfiguration):
         "AWS guidance is available at: "
         "https://docs.aws.amazon.com/AmazonS3/latest/userguide/Versioning.html. "
     )
-    def _evaluate(self) -> None:
-        s3_bucket = ClientFactory.get_s3_client(account_id=self.account_id)
-        for bucket in s3_bucket.buckets:
-            if not bucket.versioning:
-                self.misconfigured_resources.append(bucket)
-            else:
-                self.not_misconfigured_resources.append(bucket)
+
+    def is_misconfigured(self, bucket: S3Bucket) -> bool:
+        return not bucket.versioning
@@ -1,24 +1,463 @@
+import collections
+import time
 import typing
+from concurrent.futures import Future, ThreadPoolExecutor
+
 import boto3
 from misconfiguration_detector.providers.aws.aws_client import AwsClient
-from misconfiguration_detector.providers.aws.services.s3.models import S3Bucket
+from misconfiguration_detector.providers.aws.regional_clients import \
+    ClientFactoryFn, RegionalClientPool
+from misconfiguration_detector.providers.aws.retry import RetryPolicy
+from misconfiguration_detector.providers.aws.services.s3.cloudtrail import BucketChanges
+from misconfiguration_detector.providers.aws.services.s3.collector import \
+    S3BucketCollector
+from misconfiguration_detector.providers.aws.services.s3.models import S3Bucket, \
+    S3BucketTable
+from misconfiguration_detector.scheduling import Deadline, LOWEST_PRIORITY
+from misconfiguration_detector.snapshot import CachedAttributes, SnapshotStore
+from misconfiguration_detector.utils.concurrency import BoundedExecutor, \
+    DEFAULT_MAX_WORKERS
 from misconfiguration_detector.utils.logging import logger
+from misconfiguration_detector.utils.metrics import get_metrics
+from misconfiguration_detector.utils.rate_limiter import AdaptiveRateLimiter
+
+
+# get_bucket_location reports these legacy values for the oldest regions.
+LEGACY_LOCATION_CONSTRAINTS = {
+    None: "us-east-1",
+    "": "us-east-1",
+    "EU": "eu-west-1",
+}
+SNAPSHOT_RESOURCE_TYPE = "s3_bucket"
+# Buckets per list_buckets page (the API allows up to 10,000).
+LIST_BUCKETS_PAGE_SIZE = 1000
 
 
 class S3BucketClient(AwsClient):
-    def __init__(self, *, account_id: str, region_name: str = "eu-central-1"):
+    supported_attributes = frozenset(S3BucketCollector.ATTRIBUTE_FETCHERS)
+
+    def __init__(self, *, account_id: str, region_name: str = "eu-central-1",
+                 max_workers: int = DEFAULT_MAX_WORKERS,
+                 max_in_flight: typing.Optional[int] = None,
+                 attributes: typing.Optional[typing.Iterable[str]] = None,
+                 collect: bool = True,
+                 rate_limiter: typing.Optional[AdaptiveRateLimiter] = None,
+                 retry_policy: typing.Optional[RetryPolicy] = None,
+                 session: typing.Optional[boto3.session.Session] = None,
+                 client_factory: typing.Optional[ClientFactoryFn] = None,
+                 bucket_region: typing.Optional[str] = None,
+                 bucket_prefix: typing.Optional[str] = None,
+                 snapshot: typing.Optional[SnapshotStore] = None,
+                 max_age: typing.Optional[float] = None,
+                 attribute_priority: typing.Optional[typing.Dict[str, int]] = None,
+                 deadline: typing.Optional[Deadline] = None):
         super().__init__(account_id=account_id, region_name=region_name)
         self.account_id = account_id
         self.region_name = region_name
-        self.aws_s3_client = boto3.client("s3", region_name=self.region_name)
-        self.buckets = self.init_buckets()
+        self.max_workers = max(1, max_workers)
+        self.max_in_flight = max_in_flight
+        # None collects every attribute; otherwise only what the selected checks read.
+        self.attributes = None if attributes is None else frozenset(attributes)
+        # Only list buckets located in this region (None lists every bucket).
+        self.bucket_region = bucket_region
+        # Only list buckets whose name starts with this prefix.
+        self.bucket_prefix = bucket_prefix or None
+        # Attributes fetched less than max_age seconds ago are served from the snapshot.
+        self.snapshot = snapshot
+        self.max_age = max_age
+        # Attributes are fetched in ascending priority (see scheduling.attribute_priorities);
+        # with a deadline, no call is issued once it has passed.
+        self.attribute_priority = attribute_priority or {}
+        self.deadline = deadline
+        self.listing_complete = False
+        # Every S3 call goes through one adaptive rate limiter and retry policy.
+        # Buckets are called through a client of their own region, each with
+        # one pooled connection per worker so concurrent calls never wait on the pool.
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        self.clients = RegionalClientPool(
+            "s3",
+            max_pool_connections=self.max_workers,
+            rate_limiter=self.rate_limiter,
+            retry_policy=retry_policy,
+            session=session,
+            client_factory=client_factory,
+            deadline=deadline
+        )
+        self.aws_s3_client = self.clients.client_for(self.region_name)
+        self.collector = S3BucketCollector(self.clients, self.region_name, deadline)
+        self._bucket_regions: typing.Dict[str, str] = {}
+        # Error of the last failed inventory collection; get_resources raises it.
+        self.collection_error: typing.Optional[Exception] = None
+        # Streaming scans consume iter_buckets() instead of the collected inventory.
+        self.buckets = self.init_buckets() if collect else S3BucketTable()
 
-    def init_buckets(self) -> typing.List[S3Bucket]:
+    def init_buckets(self) -> typing.Optional[S3BucketTable]:
         try:
-            buckets = []
-            response = self.aws_s3_client.list_buckets()
-            for bucket in response.get('Buckets'):
-                buckets.append(S3Bucket(bucket_data=bucket, aws_s3_client=self.aws_s3_client))
-            return buckets
+            return self._collect_buckets()
         except Exception as error:
-            logger.error(f"Error initializing S3 buckets: {error}")
\ No newline at end of file
+            # A partial or missing listing is not an empty account: the
+            # inventory is marked failed rather than replaced by an empty table.
+            logger.error(f"Error initializing S3 buckets: {error}")
+            self.collection_error = error
+            return None
+
+    def _collect_buckets(self) -> S3BucketTable:
+        with get_metrics().phase("collection"):
+            if self.deadline is not None:
+                return S3BucketTable(self.collect_by_priority())
+            return S3BucketTable(self.iter_buckets())
+
+    def refresh(self) -> None:
+        self.buckets = self._collect_buckets()
+        self.collection_error = None
+
+    def get_resources(self) -> S3BucketTable:
+        error = self.collection_error
+        if error is not None:
+            raise RuntimeError(f"S3 bucket inventory of account {self.account_id} "
+                               f"could not be collected: {error}") from error
+        return self.buckets
+
+    def iter_resources(self) -> typing.Iterator[S3Bucket]:
+        # Severity tiers span every bucket, so with a deadline all the buckets
+        # are collected before the first one is yielded.
+        if self.deadline is not None:
+            return iter(self.collect_by_priority())
+        return self.iter_buckets()
+
+    def iter_buckets(self) -> typing.Iterator[S3Bucket]:
+        """
+        Lists the buckets page by page and yields each one, in listing order,
+        as soon as its attributes are collected.
+
+        The per-bucket calls are fanned out across buckets and attribute
+        types; with a single worker they run serially. At most
+        ``max_in_flight`` buckets are held between listing and yielding, so
+        memory stays bounded regardless of the number of buckets.
+
+        With a snapshot store, attributes fresher than ``max_age`` are served
+        from it, read bucket by bucket, fetched attributes are written back and
+        buckets that no longer exist are pruned once the listing is exhausted.
+        """
+        self._start_listing()
+        if self.max_workers == 1:
+            for bucket_data in self.iter_listed_buckets():
+                cached = self._load_listed(bucket_data.get("Name", ""))
+                bucket = self._new_bucket(bucket_data, cached)
+                setters = self._plan_fetch(bucket, cached)
+                self._resolve_and_fetch(bucket, setters)
+                yield self._collected(bucket, setters, [])
+        else:
+            with BoundedExecutor(max_workers=self.max_workers,
+                                 max_in_flight=self.max_in_flight) as executor:
+                pending = collections.deque()
+                for bucket_data in self.iter_listed_buckets():
+                    cached = self._load_listed(bucket_data.get("Name", ""))
+                    bucket = self._new_bucket(bucket_data, cached)
+                    setters = self._plan_fetch(bucket, cached)
+                    if bucket.region is None and setters:
+                        futures = [executor.submit(self._resolve_and_fetch, bucket, setters)]
+                    else:
+                        futures = [executor.submit(self.collector.fetch, bucket, setter)
+                                   for setter in setters]
+                    pending.append((bucket, setters, futures))
+                    while pending and (len(pending) >= executor.max_in_flight
+                                       or all(future.done() for future in pending[0][2])):
+                        yield self._collected(*pending.popleft())
+                while pending:
+                    yield self._collected(*pending.popleft())
+
+        self._prune_snapshot()
+
+    def collect_by_priority(self) -> typing.List[S3Bucket]:
+        """
+        Lists every bucket, then fetches attributes one priority tier at a
+        time across all buckets, so the attributes read by the most severe
+        checks are collected for every bucket before any other.
+
+        Used when the scan has a deadline: calls that would start after it
+        are skipped and their attributes reported unknown.
+        """
+        self._start_listing()
+        cached = self._load_snapshot()
+        buckets = [self._new_bucket(bucket, cached) for bucket in self.iter_listed_buckets()]
+        if self.snapshot is not None:
+            self.snapshot.mark_listed(self.account_id, SNAPSHOT_RESOURCE_TYPE,
+                                      (bucket.name for bucket in buckets))
+        plans = [self._plan_fetch(bucket, cached) for bucket in buckets]
+        tiers = sorted({self._setter_priority(setter) for setters in plans for setter in setters})
+        with BoundedExecutor(max_workers=self.max_workers,
+                             max_in_flight=self.max_in_flight) as executor:
+            for tier in tiers:
+                futures = []
+                for bucket, setters in zip(buckets, plans):
+                    tier_setters = [setter for setter in setters
+                                    if self._setter_priority(setter) == tier]
+                    if not tier_setters:
+                        continue
+                    if bucket.region is None:
+                        futures.append(executor.submit(self._resolve_and_fetch,
+                                                       bucket, tier_setters))
+                    else:
+                        futures.extend(executor.submit(self.collector.fetch, bucket, setter)
+                                       for setter in tier_setters)
+                for future in futures:
+                    future.result()
+        for bucket, setters in zip(buckets, plans):
+            self._collected(bucket, setters, [])
+        self._prune_snapshot()
+        return buckets
+
+    def collect_changes(self, changes: BucketChanges
+                        ) -> typing.Tuple[S3BucketTable, S3BucketTable]:
+        """
+        Refetches the buckets and attributes changed according to ``changes``
+        and returns the changed buckets as recorded in the snapshot and as
+        they are now. Nothing else is listed or fetched.
+
+        Created buckets, and buckets missing from the snapshot, are fetched in
+        full; attributes missing from a bucket's snapshot are fetched too.
+        Deleted buckets are dropped from the snapshot.
+        """
+        if self.snapshot is None:
+            raise ValueError("Incremental collection needs a snapshot of the previous scan")
+        cached = self._load_snapshot()
+        if not cached:
+            logger.warning(f"S3 - no snapshot of account {self.account_id}; only the changed "
+                           f"buckets are collected, run a full scan with a snapshot first")
+        created = changes.created
+        deleted = changes.deleted
+        before, after = S3BucketTable(), S3BucketTable()
+        pending = []
+        with BoundedExecutor(max_workers=self.max_workers,
+                             max_in_flight=self.max_in_flight) as executor:
+            for name in changes.buckets:
+                if self.bucket_prefix and not name.startswith(self.bucket_prefix):
+                    continue
+                bucket_cache = cached.get(name)
+                region = changes.regions.get(name)
+                if bucket_cache and "region" in bucket_cache:
+                    region = bucket_cache["region"][0]
+                if self.bucket_region and region and region != self.bucket_region:
+                    continue
+                if bucket_cache:
+                    before.append(self._snapshot_bucket(name, region, bucket_cache))
+                if name in deleted:
+                    self.snapshot.invalidate(self.account_id, SNAPSHOT_RESOURCE_TYPE, name)
+                    continue
+                if name in created:
+                    bucket_cache = None
+                bucket = S3Bucket(name, region=region)
+                if region:
+                    self._bucket_regions[name] = region
+                setters = self._plan_changes(bucket, bucket_cache,
+                                             changes.attributes.get(name, set()))
+                if bucket.region is None and setters:
+                    futures = [executor.submit(self._resolve_and_fetch, bucket, setters)]
+                else:
+                    futures = [executor.submit(self.collector.fetch, bucket, setter)
+                               for setter in setters]
+                pending.append((bucket, setters, futures))
+            for bucket, setters, futures in pending:
+                after.append(self._collected(bucket, setters, futures))
+        self.snapshot.commit()
+        logger.info(f"S3 - refetched {len(after)} changed buckets of account {self.account_id}, "
+                    f"{len(deleted)} deleted")
+        return before, after
+
+    @staticmethod
+    def _snapshot_bucket(name: str, region: typing.Optional[str],
+                         bucket_cache: CachedAttributes) -> S3Bucket:
+        """
+        Rebuilds a bucket record from the snapshot. Attributes missing from
+        the snapshot are unknown.
+        """
+        bucket = S3Bucket(name, region=region)
+        missing = []
+        for attribute in S3Bucket.ATTRIBUTES:
+            if attribute in bucket_cache:
+                setattr(bucket, attribute, bucket_cache[attribute][0])
+            else:
+                missing.append(attribute)
+        if missing:
+            bucket.unknown_attributes = frozenset(missing)
+        return bucket
+
+    def _plan_changes(self, bucket: S3Bucket, bucket_cache: typing.Optional[CachedAttributes],
+                      changed: typing.AbstractSet[str]) -> typing.List[str]:
+        """
+        Returns the setters that must call the API for a changed bucket and
+        applies the snapshot values of the other attributes.
+        """
+        to_fetch = []
+        for setter in sorted(S3BucketCollector.fetchers_for(self.attributes),
+                             key=self._setter_priority):
+            attributes = S3BucketCollector.setter_attributes(setter)
+            if bucket_cache is None or any(attribute in changed or attribute not in bucket_cache
+                                           for attribute in attributes):
+                to_fetch.append(setter)
+            else:
+                for attribute in attributes:
+                    setattr(bucket, attribute, bucket_cache[attribute][0])
+        return to_fetch
+
+    def _start_listing(self) -> None:
+        if self.snapshot is not None:
+            self.snapshot.start_listing(self.account_id, SNAPSHOT_RESOURCE_TYPE)
+
+    def _prune_snapshot(self) -> None:
+        # A region-filtered or truncated listing does not see every bucket of the account.
+        if self.snapshot is not None and not self.bucket_region and self.listing_complete:
+            self.snapshot.prune(self.account_id, SNAPSHOT_RESOURCE_TYPE,
+                                prefix=self.bucket_prefix or "")
+
+    def _setter_priority(self, setter: str) -> int:
+        return min((self.attribute_priority.get(attribute, LOWEST_PRIORITY)
+                    for attribute in S3BucketCollector.setter_attributes(setter)),
+                   default=LOWEST_PRIORITY)
+
+    def _list_buckets_page(self, continuation_token: typing.Optional[str]) -> typing.Dict:
+        list_kwargs: typing.Dict[str, typing.Any] = {"MaxBuckets": LIST_BUCKETS_PAGE_SIZE}
+        if self.bucket_region:
+            list_kwargs["BucketRegion"] = self.bucket_region
+        if self.bucket_prefix:
+            list_kwargs["Prefix"] = self.bucket_prefix
+        if continuation_token:
+            list_kwargs["ContinuationToken"] = continuation_token
+        return self.aws_s3_client.list_buckets(**list_kwargs)
+
+    def iter_listed_buckets(self) -> typing.Iterator[typing.Dict]:
+        """
+        Yields the ``list_buckets`` entries of every page, in listing order.
+
+        The next page is requested in the background as soon as a page
+        arrives, so its buckets are being processed while the following page
+        is still being listed. No page is requested past the deadline.
+        """
+        self.listing_complete = False
+        with ThreadPoolExecutor(max_workers=1) as lister:
+            page = lister.submit(self._list_buckets_page, None)
+            pages = 0
+            while page is not None:
+                try:
+                    response = page.result()
+                except Exception as error:
+                    # A page whose retries were cut short by the deadline ends the
+                    # listing; the pages already listed are kept.
+                    if not (pages and self.deadline is not None and self.deadline.expired):
+                        raise
+                    logger.warning(f"S3 - deadline reached, bucket listing of account "
+                                   f"{self.account_id} stopped after {pages} pages: {error}")
+                    self.deadline.listing_truncated = True
+                    break
+                pages += 1
+                token = response.get("ContinuationToken")
+                if token and self.deadline is not None and self.deadline.expired:
+                    logger.warning(f"S3 - deadline reached, bucket listing of account "
+                                   f"{self.account_id} stopped after {pages} pages")
+                    self.deadline.listing_truncated = True
+                    token = None
+                else:
+                    self.listing_complete = not token
+                page = lister.submit(self._list_buckets_page, token) if token else None
+                yield from response.get("Buckets") or []
+        logger.info(f"S3 - listed {pages} bucket pages for account {self.account_id}")
+
+    def _load_snapshot(self) -> typing.Dict[str, CachedAttributes]:
+        if self.snapshot is None:
+            return {}
+        return self.snapshot.load(self.account_id, SNAPSHOT_RESOURCE_TYPE)
+
+    def _load_listed(self, bucket_name: str) -> typing.Dict[str, CachedAttributes]:
+        """
+        Marks a listed bucket for pruning and returns its cached attributes
+        only, so streaming never holds the whole snapshot in memory.
+        """
+        if self.snapshot is None:
+            return {}
+        self.snapshot.mark_listed(self.account_id, SNAPSHOT_RESOURCE_TYPE, [bucket_name])
+        bucket_cache = self.snapshot.load_resource(self.account_id, SNAPSHOT_RESOURCE_TYPE,
+                                                   bucket_name)
+        return {bucket_name: bucket_cache} if bucket_cache else {}
+
+    def _new_bucket(self, bucket_data: typing.Dict,
+                    cached: typing.Dict[str, CachedAttributes]) -> S3Bucket:
+        """
+        Creates the bucket record with its region when it is known from
+        list_buckets (``BucketRegion``) or an earlier lookup; otherwise the
+        region is resolved later.
+        """
+        name = bucket_data.get("Name", "")
+        region = bucket_data.get("BucketRegion") or self._bucket_regions.get(name)
+        if region is None and "region" in cached.get(name, {}):
+            region = self._bucket_regions[name] = cached[name]["region"][0]
+        return S3Bucket.from_bucket_data(bucket_data, region=region)
+
+    def _plan_fetch(self, bucket: S3Bucket,
+                    cached: typing.Dict[str, CachedAttributes]) -> typing.List[str]:
+        """
+        Returns the setters that must call the API for the bucket. Attributes
+        cached within ``max_age`` are applied to the bucket directly.
+        """
+        setters = sorted(S3BucketCollector.fetchers_for(self.attributes),
+                         key=self._setter_priority)
+        bucket_cache = cached.get(bucket.name)
+        if not bucket_cache or self.max_age is None:
+            return setters
+        oldest = time.time() - self.max_age
+        to_fetch = []
+        for setter in setters:
+            entries = [bucket_cache.get(attribute)
+                       for attribute in S3BucketCollector.setter_attributes(setter)]
+            if all(entry is not None and entry[1] >= oldest for entry in entries):
+                for attribute, (value, _) in zip(S3BucketCollector.setter_attributes(setter),
+                                                 entries):
+                    setattr(bucket, attribute, value)
+            else:
+                to_fetch.append(setter)
+        return to_fetch
+
+    def _resolve_and_fetch(self, bucket: S3Bucket, setters: typing.List[str]) -> None:
+        expired = self.deadline is not None and self.deadline.expired
+        if bucket.region is None and setters and not expired:
+            bucket.region = self.get_bucket_region(bucket.name)
+        for setter in setters:
+            self.collector.fetch(bucket, setter)
+
+    def get_bucket_region(self, bucket_name: str) -> str:
+        """
+        Returns the bucket's region from get_bucket_location, cached per bucket.
+        Falls back to the client's region when the location cannot be read.
+        """
+        region = self._bucket_regions.get(bucket_name)
+        if region is None:
+            try:
+                response = self.aws_s3_client.get_bucket_location(Bucket=bucket_name)
+                constraint = response.get("LocationConstraint")
+                region = LEGACY_LOCATION_CONSTRAINTS.get(constraint, constraint)
+            except Exception as error:
+                logger.warning(
+                    f"S3 - could not resolve region for bucket {bucket_name}, "
+                    f"using {self.region_name}: {error}")
+                return self.region_name
+            self._bucket_regions[bucket_name] = region
+        return region
+
+    def close(self) -> None:
+        """
+        Releases every regional client and its connection pool.
+        """
+        self.clients.close()
+
+    def _collected(self, bucket: S3Bucket, setters: typing.List[str],
+                   futures: typing.List[Future]) -> S3Bucket:
+        for future in futures:
+            future.result()
+        if self.snapshot is not None and setters:
+            values = {"region": bucket.region} if bucket.region else {}
+            for setter in setters:
+                values.update(S3BucketCollector.attribute_values(bucket, setter))
+            for attribute in bucket.unknown_attributes:
+                values.pop(attribute, None)
+            self.snapshot.store(self.account_id, SNAPSHOT_RESOURCE_TYPE, bucket.name, values)
+        return bucket
@@ -0,0 +1,194 @@
+"""
+Check and client registry.
+
+Checks and the clients collecting their resources are declared in manifests
+of lightweight specs: uid, severity and required attributes of a check, the
+supported attributes of a client, and the ``module:Class`` implementing
+each. Checks can therefore be listed, validated and selected without being
+imported; a check's module, its client and the SDK behind it are imported
+only when a selected check is loaded.
+
+The built-in manifests are listed in ``BUILTIN_MANIFESTS``. Other packages
+register checks and clients through the ``misconfiguration_detector.plugins``
+entry point group, each entry point naming a manifest (an iterable of specs).
+"""
+import importlib
+import threading
+import typing
+
+from misconfiguration_detector.models import BaseClient, Misconfiguration, \
+    MisconfigurationSeverity, SupportedProviders
+from misconfiguration_detector.utils.logging import logger
+
+ENTRY_POINT_GROUP = "misconfiguration_detector.plugins"
+BUILTIN_MANIFESTS = (
+    "misconfiguration_detector.providers.aws.manifest:MANIFEST",
+)
+
+
+class CheckSpec(typing.NamedTuple):
+    uid: str
+    provider: SupportedProviders
+    severity: MisconfigurationSeverity
+    required_attributes: typing.FrozenSet[str]
+    # "package.module:ClassName" of the Misconfiguration subclass.
+    target: str
+    # Builds the class instead of importing ``target`` (e.g. declarative rules).
+    factory: typing.Optional[typing.Callable[[], type]] = None
+
+
+class ClientSpec(typing.NamedTuple):
+    name: str
+    provider: SupportedProviders
+    supported_attributes: typing.FrozenSet[str]
+    # "package.module:ClassName" of the BaseClient subclass.
+    target: str
+
+
+Spec = typing.Union[CheckSpec, ClientSpec]
+
+
+def resolve(target: str) -> typing.Any:
+    """
+    Imports the module of a ``module:attribute`` target and returns the attribute.
+    """
+    module_name, _, attribute = target.partition(":")
+    value = importlib.import_module(module_name)
+    for name in filter(None, attribute.split(".")):
+        value = getattr(value, name)
+    return value
+
+
+class Registry:
+    """
+    Thread-safe registry of check and client specs, loading their classes on demand.
+    """
+
+    def __init__(self):
+        self._checks: typing.Dict[str, CheckSpec] = {}
+        self._clients: typing.Dict[str, ClientSpec] = {}
+        self._classes: typing.Dict[str, type] = {}
+        self._lock = threading.RLock()
+
+    def register(self, spec: Spec) -> None:
+        with self._lock:
+            if isinstance(spec, CheckSpec):
+                if spec.uid in self._checks and self._checks[spec.uid] != spec:
+                    raise ValueError(f"Check {spec.uid} is already registered "
+                                     f"by {self._checks[spec.uid].target}")
+                self._checks[spec.uid] = spec
+            elif isinstance(spec, ClientSpec):
+                if spec.name in self._clients and self._clients[spec.name] != spec:
+                    raise ValueError(f"Client {spec.name} is already registered "
+                                     f"by {self._clients[spec.name].target}")
+                self._clients[spec.name] = spec
+            else:
+                raise TypeError(f"Not a check or client spec: {spec!r}")
+
+    def register_manifest(self, manifest: typing.Iterable[Spec]) -> None:
+        for spec in manifest:
+            self.register(spec)
+
+    def discover_plugins(self, group: str = ENTRY_POINT_GROUP) -> None:
+        """
+        Registers the manifests of the installed ``group`` entry points. A
+        plugin that fails to load is logged and skipped.
+        """
+        # Scanning the installed distributions is slow; only done when checks are needed.
+        import importlib.metadata
+        for entry_point in importlib.metadata.entry_points(group=group):
+            try:
+                self.register_manifest(entry_point.load())
+            except Exception as error:
+                logger.error(f"Error loading plugin {entry_point.name} "
+                             f"({entry_point.value}): {error}")
+
+    @property
+    def checks(self) -> typing.List[CheckSpec]:
+        with self._lock:
+            return list(self._checks.values())
+
+    @property
+    def clients(self) -> typing.List[ClientSpec]:
+        with self._lock:
+            return list(self._clients.values())
+
+    def select(self, check_uids: typing.Optional[typing.Iterable[str]] = None
+               ) -> typing.Dict[SupportedProviders, typing.List[CheckSpec]]:
+        """
+        Returns the specs of the checks whose uid is in ``check_uids`` (every
+        check when no filter is given) per provider, without importing them.
+        """
+        checks = self.checks
+        if check_uids is not None:
+            check_uids = set(check_uids)
+            known_uids = {spec.uid for spec in checks}
+            unknown_uids = check_uids - known_uids
+            if unknown_uids:
+                raise ValueError(
+                    f"Unknown checks: {', '.join(sorted(unknown_uids))}. "
+                    f"Available checks: {', '.join(sorted(known_uids))}")
+            checks = [spec for spec in checks if spec.uid in check_uids]
+        return {provider: [spec for spec in checks if spec.provider == provider]
+                for provider in SupportedProviders}
+
+    def client_specs(self, provider: SupportedProviders,
+                     attributes: typing.AbstractSet[str]) -> typing.List[ClientSpec]:
+        """
+        Returns the specs of the ``provider`` clients collecting any of ``attributes``.
+        """
+        return [spec for spec in self.clients
+                if spec.provider == provider and spec.supported_attributes & attributes]
+
+    def _load(self, spec: Spec, base: type) -> type:
+        with self._lock:
+            cls = self._classes.get(spec.target)
+            if cls is None:
+                factory = getattr(spec, "factory", None)
+                cls = factory() if factory is not None else resolve(spec.target)
+                if not (isinstance(cls, type) and issubclass(cls, base)):
+                    raise TypeError(f"{spec.target} is not a {base.__name__} subclass")
+                self._classes[spec.target] = cls
+            return cls
+
+    def load_check(self, spec: CheckSpec) -> typing.Type[Misconfiguration]:
+        """
+        Imports and returns the check class of ``spec``, checking it matches the spec.
+        """
+        cls = self._load(spec, Misconfiguration)
+        if (cls.uid, cls.severity, cls.required_attributes) != \
+                (spec.uid, spec.severity, spec.required_attributes):
+            raise ValueError(f"{spec.target} does not match its manifest entry {spec.uid}")
+        return cls
+
+    def load_client(self, spec: ClientSpec) -> typing.Type[BaseClient]:
+        cls = self._load(spec, BaseClient)
+        if cls.supported_attributes != spec.supported_attributes:
+            raise ValueError(f"{spec.target} does not match its manifest entry {spec.name}")
+        return cls
+
+    def load_clients(self, provider: SupportedProviders,
+                     attributes: typing.AbstractSet[str]) -> typing.List[typing.Type[BaseClient]]:
+        """
+        Imports and returns the ``provider`` clients collecting any of ``attributes``.
+        """
+        return [self.load_client(spec) for spec in self.client_specs(provider, attributes)]
+
+
+_registry: typing.Optional[Registry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> Registry:
+    """
+    Returns the process-wide registry holding the built-in and plugin manifests.
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            registry = Registry()
+            for target in BUILTIN_MANIFESTS:
+                registry.register_manifest(resolve(target))
+            registry.discover_plugins()
+            _registry = registry
+        return _registry
@@ -0,0 +1,406 @@
+"""
+Declarative rules.
+
+A rule defines a check without code: its uid, title, severity, remediation
+and a condition over resource attributes that compliant resources satisfy.
+Rules are read from JSON or YAML files (YAML needs PyYAML):
+
+    {"rules": [{
+        "uid": "s3_bucket_kms_encryption",
+        "title": "S3 Bucket Not Encrypted With KMS",
+        "severity": "MEDIUM",
+        "resource": "s3_bucket",
+        "condition": "encryption in {aws:kms, aws:kms:dsse}",
+        "remediation_steps": "..."
+    }]}
+
+Conditions combine attributes, quoted strings, ``true``/``false``/``null``
+and sets of bare or quoted values (``{aws:kms, 'aws:kms:dsse'}``) with
+``==``, ``!=``, ``in``, ``not in``, ``and``, ``or``, ``not`` and parentheses,
+e.g. ``logging and logging_target_bucket != name``. ``in`` and ``not in``
+take a set on the right. A bare attribute is true when it is set.
+
+Each condition is compiled once, when the rule is loaded, into two Python
+functions: a per-resource ``is_misconfigured`` predicate and a column
+predicate evaluating a whole resource table from its attribute columns in a
+single comprehension. The compiler also reports the attributes the rule
+reads, so collection fetches only those.
+"""
+import os
+import re
+import typing
+
+from misconfiguration_detector.models import Misconfiguration, MisconfigurationSeverity, \
+    SupportedProviders
+from misconfiguration_detector.registry import CheckSpec, get_registry, resolve
+
+RULE_FILE_EXTENSIONS = (".json", ".yaml", ".yml")
+UID_PATTERN = re.compile(r"[a-z0-9_]+")
+IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+TOKEN_PATTERN = re.compile(r"""
+    \s*(?:
+        (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+      | (?P<operator>==|!=|[(){},])
+      | (?P<word>[A-Za-z0-9_:.\-/*]+)
+    )""", re.VERBOSE)
+KEYWORDS = frozenset({"and", "or", "not", "in", "true", "false", "null"})
+KEYWORD_CONSTANTS = {"true": True, "false": False, "null": None}
+
+
+class RuleError(ValueError):
+    pass
+
+
+class ResourceType(typing.NamedTuple):
+    provider: SupportedProviders
+    # "module:Class" of the Misconfiguration subclass rules of this type extend.
+    base: str
+    # Attributes known without collection.
+    identity_attributes: typing.FrozenSet[str]
+    # Attributes collected by the resource's client.
+    collected_attributes: typing.FrozenSet[str]
+
+    @property
+    def attributes(self) -> typing.FrozenSet[str]:
+        return self.identity_attributes | self.collected_attributes
+
+
+RESOURCE_TYPES: typing.Dict[str, ResourceType] = {
+    "s3_bucket": ResourceType(
+        provider=SupportedProviders.AWS,
+        base="misconfiguration_detector.providers.aws.services.s3.s3_bucket_misconfiguration:"
+             "S3BucketMisconfiguration",
+        identity_attributes=frozenset({"name", "resource_id", "region"}),
+        collected_attributes=frozenset({"encryption", "versioning", "mfa_delete", "object_lock",
+                                        "logging", "logging_target_bucket"}),
+    ),
+}
+
+
+class _Tokens:
+    def __init__(self, condition: str):
+        self.tokens: typing.List[typing.Tuple[str, str]] = []
+        position = 0
+        condition = condition.rstrip()
+        while position < len(condition):
+            match = TOKEN_PATTERN.match(condition, position)
+            if match is None:
+                raise RuleError(f"Unexpected character at {position + 1}: "
+                                f"{condition[position:position + 10]!r}")
+            kind = match.lastgroup
+            self.tokens.append((kind, match.group(kind)))
+            position = match.end()
+        self.index = 0
+
+    def peek(self) -> typing.Optional[str]:
+        return self.tokens[self.index][1] if self.index < len(self.tokens) else None
+
+    def next(self) -> typing.Tuple[str, str]:
+        if self.index >= len(self.tokens):
+            raise RuleError("Unexpected end of condition")
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def expect(self, value: str) -> None:
+        kind, token = self.next()
+        if token != value:
+            raise RuleError(f"Expected {value!r}, got {token!r}")
+
+
+def _unquote(token: str) -> str:
+    return re.sub(r"\\(.)", r"\1", token[1:-1])
+
+
+class _Compiler:
+    """
+    Recursive-descent parser emitting a Python expression. Attributes are
+    emitted through ``reference`` and literals as named constants, so the
+    generated source only ever contains names the compiler chose.
+    """
+
+    def __init__(self, condition: str, attributes: typing.AbstractSet[str]):
+        self.tokens = _Tokens(condition)
+        self.known_attributes = attributes
+        self.attributes: typing.List[str] = []
+        self.constants: typing.Dict[str, typing.Any] = {}
+
+    def compile(self) -> str:
+        expression = self.parse_or()
+        if self.tokens.peek() is not None:
+            raise RuleError(f"Unexpected {self.tokens.peek()!r}")
+        return expression
+
+    def constant(self, value: typing.Any) -> str:
+        name = f"_k{len(self.constants)}"
+        self.constants[name] = value
+        return name
+
+    def attribute(self, name: str) -> str:
+        if name not in self.known_attributes:
+            raise RuleError(f"Unknown attribute {name!r}; "
+                            f"available: {', '.join(sorted(self.known_attributes))}")
+        if name not in self.attributes:
+            self.attributes.append(name)
+        return f"_a{self.attributes.index(name)}"
+
+    def parse_or(self) -> str:
+        terms = [self.parse_and()]
+        while self.tokens.peek() == "or":
+            self.tokens.next()
+            terms.append(self.parse_and())
+        return terms[0] if len(terms) == 1 else "(" + " or ".join(terms) + ")"
+
+    def parse_and(self) -> str:
+        terms = [self.parse_not()]
+        while self.tokens.peek() == "and":
+            self.tokens.next()
+            terms.append(self.parse_not())
+        return terms[0] if len(terms) == 1 else "(" + " and ".join(terms) + ")"
+
+    def parse_not(self) -> str:
+        if self.tokens.peek() == "not":
+            self.tokens.next()
+            return f"(not {self.parse_not()})"
+        return self.parse_comparison()
+
+    def parse_comparison(self) -> str:
+        left = self.parse_operand()
+        token = self.tokens.peek()
+        if token in ("==", "!="):
+            self.tokens.next()
+            return f"({left} {token} {self.parse_operand()})"
+        if token == "not":
+            # "not" after an operand can only start "not in".
+            self.tokens.next()
+            self.tokens.expect("in")
+            return f"({left} not in {self.parse_collection()})"
+        if token == "in":
+            self.tokens.next()
+            return f"({left} in {self.parse_collection()})"
+        return left
+
+    def parse_collection(self) -> str:
+        # Only set literals: an attribute here would fail on every resource, not at load time.
+        if self.tokens.peek() != "{":
+            raise RuleError(f"Expected a set {{...}} after 'in', got {self.tokens.peek()!r}")
+        self.tokens.next()
+        values = []
+        while self.tokens.peek() != "}":
+            kind, token = self.tokens.next()
+            if kind == "string":
+                values.append(_unquote(token))
+            elif kind == "word":
+                values.append(KEYWORD_CONSTANTS.get(token, token))
+            else:
+                raise RuleError(f"Unexpected {token!r} in set")
+            if self.tokens.peek() == ",":
+                self.tokens.next()
+            elif self.tokens.peek() != "}":
+                raise RuleError(f"Expected ',' or '}}' in set, got {self.tokens.peek()!r}")
+        self.tokens.next()
+        return self.constant(frozenset(values))
+
+    def parse_operand(self) -> str:
+        kind, token = self.tokens.next()
+        if token == "(":
+            expression = self.parse_or()
+            self.tokens.expect(")")
+            return expression
+        if kind == "string":
+            return self.constant(_unquote(token))
+        if kind == "word":
+            if token in KEYWORD_CONSTANTS:
+                return self.constant(KEYWORD_CONSTANTS[token])
+            if token in KEYWORDS:
+                raise RuleError(f"Unexpected {token!r}")
+            if re.fullmatch(r"-?[0-9]+", token):
+                return self.constant(int(token))
+            if IDENTIFIER_PATTERN.fullmatch(token):
+                return self.attribute(token)
+            raise RuleError(f"Unquoted value {token!r} outside a set; quote it")
+        raise RuleError(f"Unexpected {token!r}")
+
+
+class CompiledCondition(typing.NamedTuple):
+    source: str
+    # Attributes read, in column order of ``column_predicate``.
+    attributes: typing.Tuple[str, ...]
+    # (self, resource) -> whether the resource is misconfigured.
+    is_misconfigured: typing.Callable[[typing.Any, typing.Any], bool]
+    # [column per attribute] -> misconfigured flag per resource.
+    column_predicate: typing.Callable[[typing.Sequence[typing.Sequence]], typing.List[bool]]
+
+
+def compile_condition(condition: str,
+                      attributes: typing.AbstractSet[str]) -> CompiledCondition:
+    """
+    Compiles a rule condition over ``attributes``. The resulting predicates
+    report resources that do NOT satisfy the condition as misconfigured.
+    """
+    if not isinstance(condition, str) or not condition.strip():
+        raise RuleError("Condition must be a non-empty string")
+    compiler = _Compiler(condition, attributes)
+    expression = compiler.compile()
+    if not compiler.attributes:
+        raise RuleError("Condition reads no attribute")
+    names = [f"_a{index}" for index in range(len(compiler.attributes))]
+    row_bindings = "".join(f"{name} = resource.{attribute}; "
+                           for name, attribute in zip(names, compiler.attributes))
+    source = (f"def is_misconfigured(self, resource):\n"
+              f"    {row_bindings}return not {expression}\n"
+              f"def column_predicate(columns):\n"
+              f"    return [not {expression} for ({', '.join(names)},) in zip(*columns)]\n")
+    namespace = {"__builtins__": {"zip": zip}, **compiler.constants}
+    exec(compile(source, f"<rule: {condition}>", "exec"), namespace)
+    return CompiledCondition(condition, tuple(compiler.attributes),
+                             namespace["is_misconfigured"], namespace["column_predicate"])
+
+
+class Rule(typing.NamedTuple):
+    uid: str
+    title: str
+    description: str
+    severity: MisconfigurationSeverity
+    remediation_steps: str
+    resource: str
+    condition: CompiledCondition
+    required_attributes: typing.FrozenSet[str]
+    source: str
+
+
+def compile_rule(definition: typing.Dict[str, typing.Any], source: str = "<rules>") -> Rule:
+    """
+    Validates a rule definition and compiles its condition.
+    """
+    if not isinstance(definition, dict):
+        raise RuleError(f"{source}: a rule must be a mapping, got {definition!r}")
+    uid = definition.get("uid")
+    if not isinstance(uid, str) or not UID_PATTERN.fullmatch(uid):
+        raise RuleError(f"{source}: rule uid must match {UID_PATTERN.pattern}, got {uid!r}")
+    unknown = set(definition) - {"uid", "title", "description", "severity", "resource",
+                                 "condition", "remediation_steps"}
+    if unknown:
+        raise RuleError(f"{source}: rule {uid}: unknown fields {', '.join(sorted(unknown))}")
+    for field in ("title", "severity", "condition"):
+        if not definition.get(field):
+            raise RuleError(f"{source}: rule {uid}: missing {field}")
+    try:
+        severity = MisconfigurationSeverity[str(definition["severity"]).upper()]
+    except KeyError:
+        raise RuleError(f"{source}: rule {uid}: unknown severity {definition['severity']!r}") \
+            from None
+    resource = definition.get("resource", "s3_bucket")
+    if resource not in RESOURCE_TYPES:
+        raise RuleError(f"{source}: rule {uid}: unknown resource {resource!r}")
+    resource_type = RESOURCE_TYPES[resource]
+    try:
+        condition = compile_condition(definition["condition"], resource_type.attributes)
+    except RuleError as error:
+        raise RuleError(f"{source}: rule {uid}: {error}") from None
+    required_attributes = frozenset(condition.attributes) - resource_type.identity_attributes
+    if not required_attributes:
+        # The resources of a check are collected for the attributes it reads.
+        raise RuleError(f"{source}: rule {uid}: condition reads no collected attribute "
+                        f"({', '.join(sorted(resource_type.collected_attributes))})")
+    return Rule(
+        uid=uid,
+        title=definition["title"],
+        description=definition.get("description") or definition["title"],
+        severity=severity,
+        remediation_steps=definition.get("remediation_steps", ""),
+        resource=resource,
+        condition=condition,
+        required_attributes=required_attributes,
+        source=source,
+    )
+
+
+def build_misconfiguration(rule: Rule) -> typing.Type[Misconfiguration]:
+    """
+    Returns the Misconfiguration subclass evaluating ``rule``.
+    """
+    base = resolve(RESOURCE_TYPES[rule.resource].base)
+    class_name = "".join(part.capitalize() for part in rule.uid.split("_")) + "Rule"
+    return type(class_name, (base,), {
+        "__module__": __name__,
+        "__doc__": f"Rule {rule.uid} ({rule.source}): {rule.condition.source}",
+        "uid": rule.uid,
+        "title": rule.title,
+        "description": rule.description,
+        "severity": rule.severity,
+        "remediation_steps": rule.remediation_steps,
+        "required_attributes": rule.required_attributes,
+        "is_misconfigured": rule.condition.is_misconfigured,
+        "column_attributes": rule.condition.attributes,
+        "column_predicate": staticmethod(rule.condition.column_predicate),
+    })
+
+
+def _read_definitions(path: str) -> typing.List[typing.Dict[str, typing.Any]]:
+    with open(path, encoding="utf-8") as rules_file:
+        if path.endswith(".json"):
+            import json
+            document = json.load(rules_file)
+        else:
+            try:
+                import yaml
+            except ImportError:
+                raise RuleError(f"{path}: reading YAML rules requires PyYAML "
+                                f"(pip install pyyaml)") from None
+            try:
+                document = yaml.safe_load(rules_file)
+            except yaml.YAMLError as error:
+                raise RuleError(f"{path}: {error}") from error
+    if isinstance(document, dict):
+        document = document.get("rules")
+    if not isinstance(document, list):
+        raise RuleError(f"{path}: expected a list of rules or a mapping with a 'rules' list")
+    return document
+
+
+def iter_rule_files(path: str) -> typing.Iterator[str]:
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            if name.endswith(RULE_FILE_EXTENSIONS):
+                yield os.path.join(path, name)
+    else:
+        yield path
+
+
+def load_rules(path: str) -> typing.List[Rule]:
+    """
+    Compiles the rules of a rule file, or of every rule file in a directory.
+    """
+    rules = []
+    for rules_path in iter_rule_files(path):
+        for index, definition in enumerate(_read_definitions(rules_path)):
+            rules.append(compile_rule(definition, f"{rules_path}[{index}]"))
+    return rules
+
+
+def rule_manifest(path: str) -> typing.List[CheckSpec]:
+    """
+    Returns the registry specs of the rules under ``path``. The check class of
+    a rule is built when the rule is selected.
+    """
+    specs = []
+    for rule in load_rules(path):
+        specs.append(CheckSpec(
+            uid=rule.uid,
+            provider=RESOURCE_TYPES[rule.resource].provider,
+            severity=rule.severity,
+            required_attributes=rule.required_attributes,
+            target=rule.source,
+            factory=lambda rule=rule: build_misconfiguration(rule),
+        ))
+    return specs
+
+
+def register_rules(path: str) -> typing.List[CheckSpec]:
+    """
+    Registers the rules under ``path`` as checks of the process-wide registry.
+    """
+    specs = rule_manifest(path)
+    get_registry().register_manifest(specs)
+    return specs
@@ -0,0 +1,126 @@
+"""
+Scan time budget and severity-based scheduling.
+
+Attribute fetches are ordered by the severity of the checks that read them,
+so CRITICAL and HIGH checks are covered first. Once the ``Deadline`` of the
+scan has passed no further API call is issued: the attributes left unfetched
+are reported UNKNOWN and recorded on the deadline for the coverage summary.
+"""
+import collections
+import sys
+import threading
+import time
+import typing
+
+from misconfiguration_detector.models import Misconfiguration, MisconfigurationSeverity
+from misconfiguration_detector.pipeline import CheckSummary
+from misconfiguration_detector.utils.logging import logger
+
+SEVERITY_RANK: typing.Dict[MisconfigurationSeverity, int] = {
+    MisconfigurationSeverity.CRITICAL: 0,
+    MisconfigurationSeverity.HIGH: 1,
+    MisconfigurationSeverity.MEDIUM: 2,
+    MisconfigurationSeverity.LOW: 3,
+    MisconfigurationSeverity.INFO: 4,
+}
+# Priority of attributes no selected check reads.
+LOWEST_PRIORITY = len(SEVERITY_RANK)
+
+
+def attribute_priorities(misconfigs: typing.Iterable[typing.Union[
+        Misconfiguration, typing.Type[Misconfiguration]]]) -> typing.Dict[str, int]:
+    """
+    Maps every attribute read by ``misconfigs`` to the rank (0 = CRITICAL)
+    of the most severe check reading it.
+    """
+    priorities: typing.Dict[str, int] = {}
+    for misconfig in misconfigs:
+        rank = SEVERITY_RANK[misconfig.severity]
+        for attribute in misconfig.required_attributes:
+            priorities[attribute] = min(priorities.get(attribute, LOWEST_PRIORITY), rank)
+    return priorities
+
+
+class Deadline:
+    """
+    Wall-clock budget of a scan, measured from its creation.
+
+    Collectors check ``expired`` before every API call and record what they
+    skipped, so the deadline also carries what was left uncollected.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + seconds
+        self.skipped: typing.Counter[str] = collections.Counter()
+        self.listing_truncated = False
+        # Failed calls not retried because the backoff would end past the deadline.
+        self.abandoned_retries = 0
+        self._reported = False
+        self._lock = threading.Lock()
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    @property
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def abandon_retry(self) -> None:
+        with self._lock:
+            self.abandoned_retries += 1
+
+    def skip(self, attributes: typing.Iterable[str]) -> None:
+        """
+        Records attributes of one resource left unfetched because of the deadline.
+        """
+        with self._lock:
+            self.skipped.update(attributes)
+            first = not self._reported
+            self._reported = True
+        if first:
+            logger.warning(f"Deadline of {self.seconds:g}s reached, "
+                           f"skipping the remaining API calls")
+
+
+def write_coverage(summaries: typing.Iterable[CheckSummary], deadline: Deadline,
+                   stream: typing.Optional[typing.TextIO] = None) -> None:
+    """
+    Writes which checks could be evaluated within the deadline and which
+    attributes were left unfetched.
+    """
+    stream = stream or sys.stderr
+    reached = deadline.expired or deadline.skipped or deadline.listing_truncated \
+        or deadline.abandoned_retries
+    state = "reached" if reached else "not reached"
+    stream.write("=" * 80 + "\n")
+    stream.write(f"Coverage (deadline {deadline.seconds:g}s {state}, "
+                 f"elapsed {deadline.elapsed:.1f}s)\n")
+    stream.write("=" * 80 + "\n")
+    stream.write(f"{'Check':<32} {'Severity':<9} {'Evaluated':>10} {'Unknown':>10} "
+                 f"{'Coverage':>9}\n")
+    for summary in sorted(summaries,
+                          key=lambda s: SEVERITY_RANK[s.misconfiguration.severity]):
+        evaluated = summary.failed + summary.passed
+        total = evaluated + summary.unknown
+        coverage = f"{100 * evaluated / total:.1f}%" if total else "-"
+        stream.write(f"{summary.misconfiguration.uid:<32} "
+                     f"{summary.misconfiguration.severity.name:<9} "
+                     f"{evaluated:>10} {summary.unknown:>10} {coverage:>9}\n")
+    if deadline.skipped:
+        skipped = ", ".join(f"{attribute}={count}"
+                            for attribute, count in sorted(deadline.skipped.items()))
+        stream.write(f"Attributes not fetched: {skipped}\n")
+    if deadline.abandoned_retries:
+        stream.write(f"Failed calls not retried past the deadline: "
+                     f"{deadline.abandoned_retries}\n")
+    if deadline.listing_truncated:
+        stream.write("Bucket listing incomplete: buckets beyond the last listed page "
+                     "were not scanned\n")
+    stream.flush()
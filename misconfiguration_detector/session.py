@@ -0,0 +1,142 @@
+"""
+Scan session: the registry of the clients and collected inventories of a scan.
+
+A session creates one client per (client class, account, region) on first
+request - which collects that inventory - and serves every later request for
+the same key from the registry, so setup and all checks share a single
+inventory. Closing the session closes every client and releases its
+connection pools.
+"""
+import threading
+import typing
+
+from misconfiguration_detector.models import BaseClient, Resource
+from misconfiguration_detector.utils.logging import logger
+
+ClientKey = typing.Tuple[typing.Type[BaseClient], str, str]
+
+
+class ScanSession:
+    """
+    Thread-safe registry of clients keyed by (client class, account, region).
+
+    ``client_kwargs`` are passed to every client the session creates; the
+    keyword arguments of ``get_client`` take precedence over them.
+    """
+
+    def __init__(self, **client_kwargs: typing.Any):
+        self.client_kwargs = client_kwargs
+        self.hits = 0
+        self.misses = 0
+        self._clients: typing.Dict[ClientKey, BaseClient] = {}
+        self._creating: typing.Dict[ClientKey, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _cached(self, key: ClientKey) -> typing.Optional[BaseClient]:
+        client = self._clients.get(key)
+        if client is not None:
+            self.hits += 1
+        return client
+
+    def get_client(self, client_cls: typing.Type[BaseClient], account_id: str,
+                   region_name: str = "eu-central-1", **client_kwargs: typing.Any):
+        """
+        Returns the client of ``client_cls`` for the account and region,
+        creating it (and collecting its inventory) on first use.
+        """
+        key = (client_cls, account_id, region_name)
+        with self._lock:
+            client = self._cached(key)
+            if client is not None:
+                return client
+            creating = self._creating.setdefault(key, threading.Lock())
+        # Concurrent requests for the same key wait for a single collection.
+        with creating:
+            with self._lock:
+                client = self._cached(key)
+                if client is not None:
+                    return client
+            logger.info(f"Scan session - collecting {client_cls.__name__} inventory of "
+                        f"account {account_id} in {region_name}")
+            try:
+                client = client_cls(account_id=account_id, region_name=region_name,
+                                    **{**self.client_kwargs, **client_kwargs})
+                with self._lock:
+                    self._clients[key] = client
+                    self.misses += 1
+            finally:
+                # Also on failure, so failed keys do not accumulate locks.
+                with self._lock:
+                    self._creating.pop(key, None)
+        return client
+
+    def refresh(self, client_cls: typing.Type[BaseClient], account_id: str,
+                region_name: str = "eu-central-1", **client_kwargs: typing.Any):
+        """
+        Collects the inventory of ``client_cls`` for the account and region
+        again. A client already in the session is refreshed in place and
+        keeps its connections; otherwise it is created. Raises when the
+        collection fails.
+        """
+        with self._lock:
+            client = self._clients.get((client_cls, account_id, region_name))
+        if client is None:
+            client = self.get_client(client_cls, account_id=account_id,
+                                     region_name=region_name, **client_kwargs)
+            # The first collection runs in the constructor; raise its failure
+            # as refresh() would.
+            client.get_resources()
+            return client
+        client.refresh()
+        return client
+
+    def get_resources(self, client_cls: typing.Type[BaseClient], account_id: str,
+                      region_name: str = "eu-central-1") -> typing.Sequence[Resource]:
+        """
+        Returns the collected inventory of ``client_cls`` for the account and region.
+        """
+        return self.get_client(client_cls, account_id=account_id,
+                               region_name=region_name).get_resources()
+
+    @property
+    def stats(self) -> typing.Dict[str, int]:
+        with self._lock:
+            return {"clients": len(self._clients), "hits": self.hits, "misses": self.misses}
+
+    def close(self) -> None:
+        """
+        Closes every client of the session and drops the collected inventories.
+        """
+        with self._lock:
+            clients, self._clients = self._clients, {}
+        if clients:
+            stats = self.stats
+            logger.info(f"Scan session - closing {len(clients)} clients "
+                        f"({stats['misses']} inventories collected, "
+                        f"{stats['hits']} served from the session)")
+        for client in clients.values():
+            try:
+                client.close()
+            except Exception as error:
+                logger.warning(f"Scan session - error closing {type(client).__name__}: {error}")
+
+    def __enter__(self) -> "ScanSession":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+_default_session: typing.Optional[ScanSession] = None
+_default_session_lock = threading.Lock()
+
+
+def get_default_session() -> ScanSession:
+    """
+    Returns the process-wide session used when no session is passed explicitly.
+    """
+    global _default_session
+    with _default_session_lock:
+        if _default_session is None:
+            _default_session = ScanSession()
+        return _default_session
@@ -0,0 +1,178 @@
+"""
+Persistent on-disk snapshot of collected resource attributes.
+
+Attributes are stored in SQLite keyed by (account, resource type, resource
+name, attribute) together with the time they were fetched. Clients serve
+attributes younger than the configured max age from the snapshot and only
+call the API for new resources and expired entries.
+"""
+import json
+import sqlite3
+import time
+import typing
+
+from misconfiguration_detector.utils.logging import logger
+
+DEFAULT_SNAPSHOT_PATH = "misconfiguration_snapshot.db"
+COMMIT_EVERY = 500
+
+CachedAttributes = typing.Dict[str, typing.Tuple[typing.Any, float]]
+
+
+class SnapshotStore:
+    """
+    SQLite-backed attribute snapshot.
+
+    The store is not thread-safe; clients read and write it from the thread
+    consuming their collected resources, never from API worker threads.
+    """
+
+    def __init__(self, path: str = DEFAULT_SNAPSHOT_PATH):
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS attributes ("
+            " account_id TEXT NOT NULL,"
+            " resource_type TEXT NOT NULL,"
+            " resource_name TEXT NOT NULL,"
+            " attribute TEXT NOT NULL,"
+            " value TEXT,"
+            " fetched_at REAL NOT NULL,"
+            " PRIMARY KEY (account_id, resource_type, resource_name, attribute))"
+        )
+        # Input files already applied per account and source, e.g. CloudTrail log files.
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS processed_files ("
+            " account_id TEXT NOT NULL,"
+            " source TEXT NOT NULL,"
+            " path TEXT NOT NULL,"
+            " processed_at REAL NOT NULL,"
+            " PRIMARY KEY (account_id, source, path))"
+        )
+        # Resources seen by the listing in progress, kept out of Python memory until pruning.
+        self._connection.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS listed ("
+            " account_id TEXT NOT NULL,"
+            " resource_type TEXT NOT NULL,"
+            " resource_name TEXT NOT NULL,"
+            " PRIMARY KEY (account_id, resource_type, resource_name))"
+        )
+        self._connection.commit()
+        self._uncommitted = 0
+
+    def load(self, account_id: str, resource_type: str
+             ) -> typing.Dict[str, CachedAttributes]:
+        """
+        Returns every cached attribute of the account's resources of the
+        given type as ``{resource_name: {attribute: (value, fetched_at)}}``.
+        """
+        snapshot: typing.Dict[str, CachedAttributes] = {}
+        rows = self._connection.execute(
+            "SELECT resource_name, attribute, value, fetched_at FROM attributes"
+            " WHERE account_id = ? AND resource_type = ?",
+            (account_id, resource_type))
+        for resource_name, attribute, value, fetched_at in rows:
+            snapshot.setdefault(resource_name, {})[attribute] = (json.loads(value), fetched_at)
+        return snapshot
+
+    def load_resource(self, account_id: str, resource_type: str, resource_name: str
+                      ) -> CachedAttributes:
+        """
+        Returns the cached attributes of a single resource.
+        """
+        rows = self._connection.execute(
+            "SELECT attribute, value, fetched_at FROM attributes"
+            " WHERE account_id = ? AND resource_type = ? AND resource_name = ?",
+            (account_id, resource_type, resource_name))
+        return {attribute: (json.loads(value), fetched_at) for attribute, value, fetched_at in rows}
+
+    def store(self, account_id: str, resource_type: str, resource_name: str,
+              attributes: typing.Dict[str, typing.Any],
+              fetched_at: typing.Optional[float] = None) -> None:
+        if not attributes:
+            return
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO attributes VALUES (?, ?, ?, ?, ?, ?)",
+            [(account_id, resource_type, resource_name, attribute, json.dumps(value), fetched_at)
+             for attribute, value in attributes.items()])
+        self._uncommitted += len(attributes)
+        if self._uncommitted >= COMMIT_EVERY:
+            self.commit()
+
+    def invalidate(self, account_id: str, resource_type: str, resource_name: str,
+                   attributes: typing.Optional[typing.Iterable[str]] = None) -> None:
+        """
+        Drops the cached attributes of a resource (all of them by default).
+        """
+        if attributes is None:
+            self._connection.execute(
+                "DELETE FROM attributes WHERE account_id = ? AND resource_type = ?"
+                " AND resource_name = ?", (account_id, resource_type, resource_name))
+        else:
+            self._connection.executemany(
+                "DELETE FROM attributes WHERE account_id = ? AND resource_type = ?"
+                " AND resource_name = ? AND attribute = ?",
+                [(account_id, resource_type, resource_name, attribute)
+                 for attribute in attributes])
+        self._uncommitted += 1
+
+    def start_listing(self, account_id: str, resource_type: str) -> None:
+        """
+        Forgets the resources marked listed by an earlier, unfinished listing.
+        """
+        self._connection.execute(
+            "DELETE FROM listed WHERE account_id = ? AND resource_type = ?",
+            (account_id, resource_type))
+
+    def mark_listed(self, account_id: str, resource_type: str,
+                    resource_names: typing.Iterable[str]) -> None:
+        self._connection.executemany(
+            "INSERT OR IGNORE INTO listed VALUES (?, ?, ?)",
+            [(account_id, resource_type, name) for name in resource_names])
+
+    def prune(self, account_id: str, resource_type: str, prefix: str = "") -> int:
+        """
+        Deletes resources whose name starts with ``prefix`` and that were
+        not marked listed since ``start_listing``, i.e. resources that no
+        longer exist. Returns their number.
+        """
+        # Names are compared by prefix in Python: LIKE would treat "_" and "%" as wildcards.
+        deleted = [name for (name,) in self._connection.execute(
+            "SELECT DISTINCT resource_name FROM attributes"
+            " WHERE account_id = ? AND resource_type = ? AND resource_name NOT IN"
+            " (SELECT resource_name FROM listed WHERE account_id = ? AND resource_type = ?)",
+            (account_id, resource_type, account_id, resource_type))
+            if name.startswith(prefix)]
+        for name in deleted:
+            self.invalidate(account_id, resource_type, name)
+        self.start_listing(account_id, resource_type)
+        self.commit()
+        if deleted:
+            logger.info(f"Snapshot - pruned {len(deleted)} deleted {resource_type} resources "
+                        f"of account {account_id}")
+        return len(deleted)
+
+    def processed_files(self, account_id: str, source: str) -> typing.Set[str]:
+        """
+        Returns the paths of the ``source`` files already applied for the account.
+        """
+        return {path for (path,) in self._connection.execute(
+            "SELECT path FROM processed_files WHERE account_id = ? AND source = ?",
+            (account_id, source))}
+
+    def mark_processed(self, account_id: str, source: str, paths: typing.Iterable[str]) -> None:
+        processed_at = time.time()
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO processed_files VALUES (?, ?, ?, ?)",
+            [(account_id, source, path, processed_at) for path in paths])
+        self.commit()
+
+    def commit(self) -> None:
+        self._connection.commit()
+        self._uncommitted = 0
+
+    def close(self) -> None:
+        self.commit()
+        self._connection.close()
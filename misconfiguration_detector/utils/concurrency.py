@@ -0,0 +1,42 @@
+import threading
+import typing
+from concurrent.futures import Future, ThreadPoolExecutor
+
+DEFAULT_MAX_WORKERS = 16
+IN_FLIGHT_PER_WORKER = 4
+
+
+class BoundedExecutor:
+    """
+    Thread pool that caps the number of submitted-but-unfinished tasks.
+
+    ``submit`` blocks once ``max_in_flight`` tasks are pending, so producers
+    that fan out thousands of API calls never queue more than the limit.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS,
+                 max_in_flight: typing.Optional[int] = None):
+        self.max_workers = max(1, max_workers)
+        self.max_in_flight = max(self.max_workers,
+                                 max_in_flight or self.max_workers * IN_FLIGHT_PER_WORKER)
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+
+    def submit(self, fn: typing.Callable, *args, **kwargs) -> Future:
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self) -> "BoundedExecutor":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown(wait=True)
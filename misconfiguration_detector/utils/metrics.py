@@ -0,0 +1,303 @@
+"""
+Run metrics.
+
+Records every API call attempt (count, error codes, retries, time spent
+waiting on the rate limiter and backoff, latency histogram) per service,
+operation and region, the time spent in each check's predicate and the
+duration of the scan phases. The collected metrics are exported at the end
+of the run as JSON or in the Prometheus text exposition format.
+
+Metrics are disabled by default: ``get_metrics()`` returns a registry whose
+methods do nothing until ``enable_metrics()`` installs a recording one.
+"""
+import contextlib
+import json
+import threading
+import time
+import typing
+
+# Upper bounds, in seconds, of the API call latency histogram buckets.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRICS_FORMATS = ("json", "prometheus")
+PROMETHEUS_PREFIX = "misconfiguration_detector"
+
+ApiCallKey = typing.Tuple[str, str, str]
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram; ``counts[i]`` counts observations in
+    ``(bounds[i - 1], bounds[i]]``, the last slot those above every bound.
+    """
+    __slots__ = ("bounds", "counts", "count", "sum")
+
+    def __init__(self, bounds: typing.Sequence[float] = LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = 0
+        for bound in self.bounds:
+            if value <= bound:
+                break
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> typing.List[typing.Tuple[str, int]]:
+        """
+        Returns ``(upper bound, observations <= bound)`` pairs ending with +Inf.
+        """
+        total = 0
+        buckets = []
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            total += count
+            buckets.append(("+Inf" if bound == float("inf") else repr(bound), total))
+        return buckets
+
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        return {"count": self.count, "sum": round(self.sum, 6),
+                "buckets": dict(self.cumulative())}
+
+
+class ApiCallStats:
+    __slots__ = ("calls", "errors", "retries", "wait_seconds", "latency")
+
+    def __init__(self, latency_buckets: typing.Sequence[float]):
+        self.calls = 0
+        self.errors: typing.Dict[str, int] = {}
+        self.retries = 0
+        # Time blocked on the rate limiter and in retry backoff.
+        self.wait_seconds = 0.0
+        self.latency = Histogram(latency_buckets)
+
+
+class CheckTimer:
+    """
+    Wraps a check predicate and accumulates the time spent in it. Each timer
+    is driven by a single thread, so no locking is needed.
+    """
+    __slots__ = ("uid", "predicate", "calls", "seconds")
+
+    def __init__(self, uid: str, predicate: typing.Callable[[typing.Any], bool]):
+        self.uid = uid
+        self.predicate = predicate
+        self.calls = 0
+        self.seconds = 0.0
+
+    def __call__(self, resource) -> bool:
+        started = time.perf_counter()
+        try:
+            return self.predicate(resource)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.calls += 1
+
+
+class Metrics:
+    """
+    Thread-safe registry of the metrics of one run.
+    """
+    enabled = True
+
+    def __init__(self, latency_buckets: typing.Sequence[float] = LATENCY_BUCKETS):
+        self.latency_buckets = tuple(latency_buckets)
+        self._api_calls: typing.Dict[ApiCallKey, ApiCallStats] = {}
+        self._check_timers: typing.List[CheckTimer] = []
+        self._checks: typing.Dict[str, typing.List[float]] = {}
+        self._phases: typing.Dict[str, typing.List[float]] = {}
+        self._lock = threading.Lock()
+
+    def _api_stats(self, key: ApiCallKey) -> ApiCallStats:
+        stats = self._api_calls.get(key)
+        if stats is None:
+            stats = self._api_calls.setdefault(key, ApiCallStats(self.latency_buckets))
+        return stats
+
+    def observe_api_call(self, service: str, operation: str, region: str,
+                         duration: float, wait: float = 0.0,
+                         error_code: typing.Optional[str] = None) -> None:
+        """
+        Records one API call attempt, the time it waited for the rate limiter
+        and, when it failed, its error code.
+        """
+        with self._lock:
+            stats = self._api_stats((service, operation, region))
+            stats.calls += 1
+            stats.wait_seconds += wait
+            stats.latency.observe(duration)
+            if error_code is not None:
+                stats.errors[error_code] = stats.errors.get(error_code, 0) + 1
+
+    def observe_retry(self, service: str, operation: str, region: str,
+                      delay: float) -> None:
+        with self._lock:
+            stats = self._api_stats((service, operation, region))
+            stats.retries += 1
+            stats.wait_seconds += delay
+
+    def observe_check(self, uid: str, resources: int, seconds: float) -> None:
+        """
+        Records one evaluation of a check over ``resources`` resources.
+        """
+        with self._lock:
+            totals = self._checks.setdefault(uid, [0, 0.0])
+            totals[0] += resources
+            totals[1] += seconds
+
+    def time_check(self, uid: str, predicate: typing.Callable[[typing.Any], bool]
+                   ) -> typing.Callable[[typing.Any], bool]:
+        """
+        Returns ``predicate`` wrapped in a timer reported under the check uid.
+        """
+        timer = CheckTimer(uid, predicate)
+        with self._lock:
+            self._check_timers.append(timer)
+        return timer
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> typing.Iterator[None]:
+        """
+        Times the enclosed block as one run of the named phase.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._phases.setdefault(name, []).append(elapsed)
+
+    def to_dict(self) -> typing.Dict[str, typing.Any]:
+        with self._lock:
+            api_calls = [
+                {"service": service, "operation": operation, "region": region,
+                 "calls": stats.calls, "errors": dict(stats.errors),
+                 "retries": stats.retries,
+                 "wait_seconds": round(stats.wait_seconds, 6),
+                 "latency_seconds": stats.latency.to_dict()}
+                for (service, operation, region), stats in sorted(self._api_calls.items())
+            ]
+            checks = {uid: {"resources": resources, "seconds": seconds}
+                      for uid, (resources, seconds) in self._checks.items()}
+            for timer in self._check_timers:
+                check = checks.setdefault(timer.uid, {"resources": 0, "seconds": 0.0})
+                check["resources"] += timer.calls
+                check["seconds"] += timer.seconds
+            phases = {name: {"runs": len(durations), "seconds": round(sum(durations), 6)}
+                      for name, durations in self._phases.items()}
+        for check in checks.values():
+            check["seconds"] = round(check["seconds"], 6)
+        return {"api_calls": api_calls, "checks": checks, "phases": phases}
+
+    def to_prometheus(self) -> str:
+        data = self.to_dict()
+        lines: typing.List[str] = []
+
+        def family(name: str, metric_type: str, help_text: str) -> str:
+            name = f"{PROMETHEUS_PREFIX}_{name}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            return name
+
+        def sample(name: str, labels: typing.Dict[str, str], value: typing.Any) -> None:
+            label_text = ",".join(f'{key}="{_escape_label(str(label))}"'
+                                  for key, label in labels.items())
+            lines.append(f"{name}{{{label_text}}} {value}")
+
+        def api_labels(call: typing.Dict[str, typing.Any]) -> typing.Dict[str, str]:
+            return {"service": call["service"], "operation": call["operation"],
+                    "region": call["region"]}
+
+        name = family("api_calls_total", "counter", "API call attempts.")
+        for call in data["api_calls"]:
+            sample(name, api_labels(call), call["calls"])
+        name = family("api_errors_total", "counter", "Failed API call attempts by error code.")
+        for call in data["api_calls"]:
+            for code, count in sorted(call["errors"].items()):
+                sample(name, {**api_labels(call), "code": code}, count)
+        name = family("api_retries_total", "counter", "Retried API calls.")
+        for call in data["api_calls"]:
+            sample(name, api_labels(call), call["retries"])
+        name = family("api_wait_seconds_total", "counter",
+                      "Time API calls spent waiting on the rate limiter and retry backoff.")
+        for call in data["api_calls"]:
+            sample(name, api_labels(call), call["wait_seconds"])
+        name = family("api_call_duration_seconds", "histogram", "API call attempt latency.")
+        for call in data["api_calls"]:
+            latency = call["latency_seconds"]
+            for bound, count in latency["buckets"].items():
+                sample(f"{name}_bucket", {**api_labels(call), "le": bound}, count)
+            sample(f"{name}_sum", api_labels(call), latency["sum"])
+            sample(f"{name}_count", api_labels(call), latency["count"])
+        name = family("check_evaluations_total", "counter", "Resources evaluated per check.")
+        for uid, check in sorted(data["checks"].items()):
+            sample(name, {"check": uid}, check["resources"])
+        name = family("check_evaluation_seconds_total", "counter",
+                      "Time spent evaluating each check.")
+        for uid, check in sorted(data["checks"].items()):
+            sample(name, {"check": uid}, check["seconds"])
+        name = family("phase_duration_seconds", "gauge", "Duration of each scan phase.")
+        for phase, timing in data["phases"].items():
+            sample(name, {"phase": phase}, timing["seconds"])
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str, metrics_format: str = "json") -> None:
+        if metrics_format not in METRICS_FORMATS:
+            raise ValueError(f"Unknown metrics format: {metrics_format}")
+        with open(path, "w") as metrics_file:
+            if metrics_format == "prometheus":
+                metrics_file.write(self.to_prometheus())
+            else:
+                json.dump(self.to_dict(), metrics_file, indent=2)
+                metrics_file.write("\n")
+
+
+class NullMetrics(Metrics):
+    """
+    Registry used while metrics are disabled; records nothing.
+    """
+    enabled = False
+
+    def observe_api_call(self, service: str, operation: str, region: str,
+                         duration: float, wait: float = 0.0,
+                         error_code: typing.Optional[str] = None) -> None:
+        pass
+
+    def observe_retry(self, service: str, operation: str, region: str,
+                      delay: float) -> None:
+        pass
+
+    def observe_check(self, uid: str, resources: int, seconds: float) -> None:
+        pass
+
+    def time_check(self, uid: str, predicate: typing.Callable[[typing.Any], bool]
+                   ) -> typing.Callable[[typing.Any], bool]:
+        return predicate
+
+    def phase(self, name: str) -> typing.ContextManager[None]:
+        return contextlib.nullcontext()
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+_metrics: Metrics = NullMetrics()
+
+
+def get_metrics() -> Metrics:
+    return _metrics
+
+
+def enable_metrics(metrics: typing.Optional[Metrics] = None) -> Metrics:
+    """
+    Installs ``metrics`` (a new registry by default) as the process-wide
+    registry and returns it.
+    """
+    global _metrics
+    _metrics = metrics or Metrics()
+    return _metrics
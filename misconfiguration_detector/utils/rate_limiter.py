@@ -0,0 +1,97 @@
+import threading
+import time
+import typing
+
+DEFAULT_MAX_RATE = 1000.0
+# Start unthrottled: the limiter only slows callers down once the service pushes back.
+DEFAULT_RATE = DEFAULT_MAX_RATE
+DEFAULT_MIN_RATE = 1.0
+
+
+class AdaptiveRateLimiter:
+    """
+    Thread-safe token bucket whose fill rate adapts to throttling.
+
+    The rate is cut multiplicatively when the service throttles and raised
+    additively on every success (AIMD). Throttle responses that arrive
+    together from concurrent workers only back off once per cooldown, so a
+    burst of in-flight failures does not collapse the rate to the minimum.
+    """
+
+    def __init__(self, rate: float = DEFAULT_RATE,
+                 min_rate: float = DEFAULT_MIN_RATE,
+                 max_rate: float = DEFAULT_MAX_RATE,
+                 burst: typing.Optional[float] = None,
+                 backoff_factor: float = 0.5,
+                 ramp_up: float = 1.0,
+                 cooldown: float = 1.0):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.backoff_factor = backoff_factor
+        self.ramp_up = ramp_up
+        self.cooldown = cooldown
+        self.burst = burst
+        self._rate = min(max(rate, min_rate), max_rate)
+        self._tokens = self._capacity()
+        self._updated_at = time.monotonic()
+        self._throttled_at = float("-inf")
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    def _capacity(self) -> float:
+        return self.burst if self.burst is not None else max(1.0, self._rate)
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self._capacity(),
+                           self._tokens + (now - self._updated_at) * self._rate)
+        self._updated_at = now
+
+    def acquire(self) -> float:
+        """
+        Blocks until the caller may issue one request and returns the time
+        spent waiting.
+
+        Callers reserve a token up front and sleep outside the lock, so
+        waiting workers are released in arrival order at the current rate.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= 1
+            wait = -self._tokens / self._rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def on_success(self) -> None:
+        with self._lock:
+            self._rate = min(self.max_rate, self._rate + self.ramp_up)
+
+    def on_throttle(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if now - self._throttled_at < self.cooldown:
+                return
+            self._throttled_at = now
+            self._refill(now)
+            self._rate = max(self.min_rate, self._rate * self.backoff_factor)
+            # Drop the accumulated burst so the new rate applies immediately.
+            self._tokens = min(self._tokens, 0.0)
+
+
+class UnlimitedRateLimiter(AdaptiveRateLimiter):
+    """
+    Rate limiter that never blocks, for sources without a request quota
+    such as replayed captures or local stand-ins.
+    """
+
+    def acquire(self) -> float:
+        return 0.0
+
+    def on_success(self) -> None:
+        pass
+
+    def on_throttle(self) -> None:
+        pass
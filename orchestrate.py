@@ -0,0 +1,76 @@
+import argparse
+import json
+import sys
+
+from main import DEFAULT_REGION, select_clients, select_misconfigurations
+from misconfiguration_detector.models import SupportedProviders
+from misconfiguration_detector.orchestrator import DEFAULT_MAX_CONCURRENCY, \
+    DEFAULT_PROCESSES, orchestrate
+from misconfiguration_detector.utils.logging import logger, set_logging_config
+
+parser = argparse.ArgumentParser(
+    description="Scan many AWS accounts (and regions) in parallel")
+
+
+def read_account_ids(args) -> list:
+    account_ids = list(args.account_ids or [])
+    if args.accounts_file:
+        with open(args.accounts_file) as accounts_file:
+            account_ids.extend(line.strip() for line in accounts_file
+                               if line.strip() and not line.startswith("#"))
+    return list(dict.fromkeys(account_ids))
+
+
+def get_sys_args():
+    parser.add_argument('--account_ids', nargs='+', default=None, metavar='ACCOUNT_ID',
+                        help='AWS Account IDs to evaluate')
+    parser.add_argument('--accounts-file', default=None,
+                        help='File with one AWS Account ID per line')
+    parser.add_argument('--regions', nargs='+', default=None, metavar='REGION',
+                        help='Only scan buckets in these regions, one task per region '
+                             '(default: every bucket of the account in one task)')
+    parser.add_argument('--role-name', default=None,
+                        help='IAM role to assume in every account '
+                             '(default: use the current credentials)')
+    parser.add_argument('--processes', type=int, default=DEFAULT_PROCESSES,
+                        help='Number of accounts/regions scanned in parallel')
+    parser.add_argument('--max-concurrency', type=int, default=DEFAULT_MAX_CONCURRENCY,
+                        help='Total number of concurrent API workers across all processes')
+    parser.add_argument('--checks', nargs='+', default=None, metavar='CHECK_UID',
+                        help='Only run the given checks (default: all checks)')
+    parser.add_argument('--output', default=None,
+                        help='Write the JSON report to this file (default: stdout)')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    set_logging_config()
+    args = get_sys_args()
+    account_ids = read_account_ids(args)
+    if not account_ids:
+        parser.error("at least one account is required (--account_ids or --accounts-file)")
+    try:
+        misconfigs = select_misconfigurations(args.checks)
+    except ValueError as error:
+        parser.error(str(error))
+
+    report = {}
+    for provider in SupportedProviders:
+        logger.info(f"Starting {provider.value} scan of {len(account_ids)} accounts")
+        report[provider.value] = orchestrate(
+            account_ids,
+            client_classes=select_clients(provider, misconfigs[provider]),
+            misconfig_classes=misconfigs[provider],
+            regions=args.regions,
+            role_name=args.role_name,
+            default_region=DEFAULT_REGION,
+            processes=args.processes,
+            max_concurrency=args.max_concurrency,
+        )
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+    else:
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write("\n")
@@ -0,0 +1,85 @@
+import argparse
+
+from main import DEFAULT_REGION, select_clients, select_misconfigurations
+from misconfiguration_detector.daemon import DEFAULT_CONCURRENT_SCANS, DEFAULT_HOST, \
+    DEFAULT_INTERVAL, DEFAULT_JITTER, DEFAULT_PORT, FindingsIndex, FindingsServer, \
+    ScannerDaemon
+from misconfiguration_detector.models import SupportedProviders
+from misconfiguration_detector.rules import register_rules
+from misconfiguration_detector.utils.concurrency import DEFAULT_MAX_WORKERS
+from misconfiguration_detector.utils.logging import logger, set_logging_config
+from orchestrate import read_account_ids
+
+parser = argparse.ArgumentParser(
+    description="Rescan AWS accounts periodically and serve the latest findings over HTTP")
+
+
+def get_sys_args():
+    parser.add_argument('--account_ids', nargs='+', default=None, metavar='ACCOUNT_ID',
+                        help='AWS Account IDs to evaluate')
+    parser.add_argument('--accounts-file', default=None,
+                        help='File with one AWS Account ID per line')
+    parser.add_argument('--region', default=DEFAULT_REGION,
+                        help='AWS Region to evaluate')
+    parser.add_argument('--role-name', default=None,
+                        help='IAM role to assume in every account '
+                             '(default: use the current credentials)')
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL, metavar='SECONDS',
+                        help='Time between two scans of an account')
+    parser.add_argument('--jitter', type=float, default=DEFAULT_JITTER,
+                        help='Random spread of the scan interval, as a fraction of it')
+    parser.add_argument('--concurrent-scans', type=int, default=DEFAULT_CONCURRENT_SCANS,
+                        help='Number of accounts scanned at the same time')
+    parser.add_argument('--max-workers', type=int, default=DEFAULT_MAX_WORKERS,
+                        help='Number of concurrent API workers per scan')
+    parser.add_argument('--checks', nargs='+', default=None, metavar='CHECK_UID',
+                        help='Only run the given checks (default: all checks)')
+    parser.add_argument('--rules', nargs='+', default=[], metavar='RULES_PATH',
+                        help='Also run the declarative rules of these JSON/YAML files '
+                             'or directories')
+    parser.add_argument('--host', default=DEFAULT_HOST,
+                        help='Address the query API listens on')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                        help='Port the query API listens on')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    set_logging_config()
+    args = get_sys_args()
+    account_ids = read_account_ids(args)
+    if not account_ids:
+        parser.error("at least one account is required (--account_ids or --accounts-file)")
+    try:
+        for rules_path in args.rules:
+            register_rules(rules_path)
+        misconfigs = select_misconfigurations(args.checks)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+
+    index = FindingsIndex()
+    daemons = [
+        ScannerDaemon(account_ids,
+                      client_classes=select_clients(provider, misconfigs[provider]),
+                      misconfig_classes=misconfigs[provider],
+                      region=args.region,
+                      interval=args.interval,
+                      jitter=args.jitter,
+                      role_name=args.role_name,
+                      max_workers=args.max_workers,
+                      concurrent_scans=args.concurrent_scans,
+                      index=index)
+        for provider in SupportedProviders
+    ]
+    server = FindingsServer(index, daemons[0], host=args.host, port=args.port)
+    for daemon in daemons:
+        daemon.start()
+    logger.info(f"Serving findings on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Shutting down")
+    finally:
+        server.server_close()
+        for daemon in daemons:
+            daemon.stop()